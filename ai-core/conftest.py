@@ -0,0 +1,151 @@
+"""
+Shared pytest fixtures
+Tests import modules the way the server does, from the ai-core directory
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+AI_CORE = Path(__file__).resolve().parent
+sys.path.insert(0, str(AI_CORE))
+
+
+@pytest.fixture
+def game_master():
+    from orchestration.game_master import GameMaster
+
+    return GameMaster(config_path=str(AI_CORE / "config" / "settings.example.json"),
+                      agents_path=str(AI_CORE / "config" / "agents.yaml"))
+
+
+@pytest.fixture
+def make_request():
+    """GenerationRequest factory; waited_s backdates the enqueue time"""
+    from models.batch_scheduler import GenerationRequest
+
+    def make(prompt="Hello", waited_s=0.0, **fields):
+        return GenerationRequest(prompt=prompt, enqueued_at=time.monotonic() - waited_s,
+                                 **fields)
+
+    return make
+
+
+@pytest.fixture
+def synthetic_speech():
+    """
+    16 kHz float32 audio factory: a low noise floor with 220 Hz tones over
+    the (start, end) second ranges in tones, which the VAD takes as speech.
+    pcm=True returns 16-bit little-endian PCM bytes instead
+    """
+    import numpy as np
+
+    rate = 16000
+
+    def make(seconds, tones=(), level=0.001, seed=0, pcm=False):
+        rng = np.random.default_rng(seed)
+        samples = (rng.standard_normal(int(seconds * rate)) * level).astype(np.float32)
+        for start, end in tones:
+            first, last = int(start * rate), int(end * rate)
+            t = np.arange(last - first) / rate
+            samples[first:last] += 0.3 * np.sin(2 * np.pi * 220.0 * t)
+        if pcm:
+            return (np.clip(samples, -1.0, 1.0) * 32767).astype("<i2").tobytes()
+        return samples
+
+    return make
+
+
+@pytest.fixture
+def lora_dir(tmp_path):
+    """Adapter directory holding a.lora, b.lora and c.lora, 100 bytes each"""
+    for name in ("a", "b", "c"):
+        (tmp_path / f"{name}.lora").write_bytes(b"\0" * 100)
+    return tmp_path
+
+
+@pytest.fixture
+def make_switcher(lora_dir):
+    """LoRASwitcher factory over lora_dir; kwargs go to the constructor"""
+    from orchestration.lora_switcher import LoRASwitcher
+
+    def make(**kwargs):
+        return LoRASwitcher(base_model_path="", lora_directory=str(lora_dir), **kwargs)
+
+    return make
+
+
+class RecordingSwitcher:
+    """Switcher stand-in that records prefetches instead of loading adapters"""
+
+    def __init__(self, loaded=()):
+        self.loaded = set(loaded)
+        self.prefetched = []
+
+    def is_adapter_loaded(self, adapter_name):
+        return adapter_name in self.loaded
+
+    def prefetch(self, adapter_name):
+        self.prefetched.append(adapter_name)
+        return True
+
+
+@pytest.fixture
+def make_prefetcher(game_master):
+    """AdapterPrefetcher factory; returns (prefetcher, RecordingSwitcher)"""
+    from orchestration.adapter_prefetcher import AdapterPrefetcher
+
+    def make(loaded=(), **kwargs):
+        switcher = RecordingSwitcher(loaded)
+        return AdapterPrefetcher(switcher, game_master, **kwargs), switcher
+
+    return make
+
+
+class StubGameMaster:
+    """Game Master with no world, for tests that only move sessions around"""
+
+    def __init__(self):
+        self.event_history = []
+
+    def get_state(self):
+        return {}
+
+    def load_state(self, state):
+        pass
+
+
+class StubRAG:
+    def __init__(self, db_path, template_db=None):
+        self.db_path = db_path
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def session_template(tmp_path):
+    """Empty memory database with the production schema"""
+    import sqlite3
+
+    path = tmp_path / "template.db"
+    conn = sqlite3.connect(path)
+    conn.executescript((AI_CORE / "memory" / "schema.sql").read_text())
+    conn.close()
+    return str(path)
+
+
+@pytest.fixture
+def make_manager(tmp_path, session_template):
+    """SessionManager factory over stub worlds; override the factories as needed"""
+    from orchestration.session_manager import SessionManager
+
+    def make(**kwargs):
+        kwargs.setdefault('game_master_factory', StubGameMaster)
+        kwargs.setdefault('rag_factory', StubRAG)
+        return SessionManager(str(tmp_path / "sessions"), session_template,
+                              default_game_master=StubGameMaster(), **kwargs)
+
+    return make
@@ -3,18 +3,42 @@ FastAPI Backend - Main Entry Point
 Provides REST API for Unreal Engine to communicate with AI services
 """
 
-from fastapi import FastAPI, HTTPException
+from fastapi import Depends, FastAPI, HTTPException, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import List, Dict, Any, Optional
+from fastapi.responses import JSONResponse, PlainTextResponse
+from pydantic import BaseModel, Field, ValidationError
+from typing import List, Dict, Any, Optional, Tuple
+import asyncio
+import contextlib
 import json
 import logging
+import os
 import uvicorn
 
-from orchestration.game_master import GameMaster
+from models.batch_scheduler import BatchScheduler
+from models.canned_responses import CannedResponses
+from models.generation_cache import GenerationCache
+from models.llm_engine import LLMEngine
+from models.model_client import ModelClient
+from models.simulator import LatencySimulator
+from monitoring import tracing
+from monitoring.metrics import metrics, span
+from monitoring.profiler import ProfilerBusy, profiler
+from orchestration.adapter_catalog import adapter_for
+from orchestration.adapter_prefetcher import AdapterPrefetcher
+from orchestration.adapter_queue import AdapterGroupedQueue
+from orchestration.event_channel import ChannelCodec, EventChannel
+from orchestration.game_master import CLOCK_PATTERN, GameMaster
 from orchestration.lora_switcher import LoRASwitcher
+from orchestration.priority_queue import AMBIENT, DIALOGUE, PriorityRequestQueue
 from orchestration.rag_engine import RAGEngine
+from orchestration.service_registry import ServiceRegistry, ServiceUnavailable
+from orchestration.session_manager import (SessionLimitReached, SessionManager,
+                                           SessionQuotaExceeded, WorldSession)
+from voice.stt_batch import BatchedSTT
+from voice.stt_stream import StreamingTranscriber
 from voice.stt_whisper import WhisperSTT
+from voice.voice_pipeline import VoicePipeline, dialogue_prompt
 from voice.tts_piper import PiperTTS
 
 logging.basicConfig(level=logging.INFO)
@@ -35,19 +59,221 @@ app.add_middleware(
 
 logger = logging.getLogger(__name__)
 
-try:
-    game_master = GameMaster()
+services = ServiceRegistry()
+
+# Set SPECTOR_GENERATION_CACHE to a file path to memoize completions
+# across restarts (useful for QA scenario replays)
+cache_path = os.environ.get("SPECTOR_GENERATION_CACHE")
+generation_cache = GenerationCache(persist_path=cache_path) if cache_path else None
+
+# An NPC's ambient reaction to the same event is worth reusing (replays,
+# every session reacting to a scripted beat); player dialogue is not
+CACHE_REACTIONS = os.environ.get("SPECTOR_CACHE_REACTIONS", "1") == "1"
+
+# Mock backends can replay a latency profile captured on real hardware
+# (tools/bench/capture_profile.py), so capacity tests queue like production
+latency_profile = os.environ.get("SPECTOR_LATENCY_PROFILE")
+simulator = LatencySimulator.load(latency_profile) if latency_profile else None
+
+# Ambient NPC reactions still queued after this long get a canned line
+AMBIENT_DEADLINE_MS = float(os.environ.get("SPECTOR_AMBIENT_DEADLINE_MS", "3000"))
+
+
+def _budget(variable: str, default: str) -> Optional[float]:
+    value = float(os.environ.get(variable, default))
+    return value if value > 0 else None
+
+
+# Latency budgets: when the scheduler predicts a request would take longer,
+# it is answered with a canned in-character line instead (0 disables)
+DIALOGUE_BUDGET_MS = _budget("SPECTOR_DIALOGUE_BUDGET_MS", "3000")
+AMBIENT_BUDGET_MS = _budget("SPECTOR_AMBIENT_BUDGET_MS", "1500")
+
+
+def build_llm_scheduler() -> BatchScheduler:
+    # SPECTOR_LLM_WORKERS engine instances share the memory-mapped model
+    # weights; cores are split evenly between them
+    llm_workers = int(os.environ.get("SPECTOR_LLM_WORKERS", "1"))
+    model_socket = os.environ.get("SPECTOR_MODEL_SOCKET")
+    # Shed and expired requests degrade to lines from the LoRA training
+    # set, or the mock backend's stock lines for unknown archetypes
+    canned_lines = CannedResponses(os.environ.get("SPECTOR_CANNED_RESPONSES"))
+    canned = LLMEngine()
+    
+    def canned_line(request) -> str:
+        return (canned_lines.pick(request.archetype, request.prompt)
+                or canned.canned_response(request.prompt, request.adapter))
+    
+    if model_socket:
+        # A shared model server (python -m models.model_server) owns the
+        # model and adapter cache; this worker only forwards requests
+        llm_engines = [ModelClient(model_socket) for _ in range(llm_workers)]
+    else:
+        llm_engines = [
+            LLMEngine(
+                model_path=os.environ.get("SPECTOR_MODEL_PATH"),
+                n_threads=max(1, (os.cpu_count() or 1) // llm_workers),
+                cache=generation_cache,
+                cache_nondeterministic=os.environ.get("SPECTOR_CACHE_ALL_GENERATIONS") == "1",
+                mock_token_latency_ms=float(os.environ.get("SPECTOR_MOCK_TOKEN_MS", "0")),
+                simulator=simulator
+            )
+            for _ in range(llm_workers)
+        ]
+    
+    # Player dialogue is served before ambient reactions; within each class
+    # pending generations are grouped by LoRA adapter to avoid cache thrash,
+    # and batches mix adapters when the backend applies them per sequence
+    # Ambient work waiting half its deadline is promoted ahead of dialogue,
+    # leaving it time to run before it expires
+    mixed_batches = llm_engines[0].supports_per_sequence_lora()
+    request_queue = PriorityRequestQueue(
+        queue_factory=lambda: AdapterGroupedQueue(mixed_batches=mixed_batches),
+        max_age_ms={AMBIENT: AMBIENT_DEADLINE_MS / 2})
+    return BatchScheduler(llm_engines, request_queue=request_queue,
+                          adapter_context=contextlib.nullcontext if model_socket else None,
+                          fallback=canned_line)
+
+
+def build_lora_switcher() -> LoRASwitcher:
+    llm_scheduler = services.get("llm_scheduler")
+    # Cache limits from the "models" section of config/settings.json
+    models_config = services.get("game_master").config.get('models', {})
     lora_switcher = LoRASwitcher(
         base_model_path="models/base/llama-3-8b-quantized",
-        lora_directory="models/loras"
+        lora_directory=os.environ.get("SPECTOR_LORA_DIR", "models/loras"),
+        max_cache_size=models_config.get('lora_cache_size'),
+        max_cache_bytes=models_config.get('lora_cache_bytes') or 1024 * 1024 * 1024,
+        llm_engine=llm_scheduler.engines[0],
+        scheduler=llm_scheduler,
+        simulator=simulator if getattr(llm_scheduler.engines[0], "use_mock", False) else None
     )
-    rag_engine = RAGEngine()
-    stt_service = WhisperSTT()
-    tts_service = PiperTTS()
-    logger.info("All services initialized")
-except Exception as e:
-    logger.error(f"Service initialization failed: {e}")
-    raise
+    llm_scheduler.queue.is_hot = lora_switcher.is_adapter_loaded
+    return lora_switcher
+
+
+def build_session_manager() -> SessionManager:
+    rag_engine = services.get("rag_engine")
+    generations_per_minute = float(os.environ.get("SPECTOR_SESSION_GENERATIONS_PER_MIN", "0"))
+    max_inflight = int(os.environ.get("SPECTOR_SESSION_MAX_INFLIGHT", "32"))
+    session_manager = SessionManager(
+        root_dir=os.environ.get("SPECTOR_SESSION_DIR", "memory/sessions"),
+        template_db=rag_engine.db_path,
+        default_game_master=services.get("game_master"),
+        default_rag_engine=rag_engine,
+        max_sessions=int(os.environ.get("SPECTOR_MAX_SESSIONS", "64")),
+        idle_timeout_s=float(os.environ.get("SPECTOR_SESSION_IDLE_S", "900")),
+        max_inflight_generations=max_inflight if max_inflight > 0 else None,
+        generations_per_minute=generations_per_minute or None
+    )
+    session_manager.start()
+    return session_manager
+
+
+def warmup_llm(llm_scheduler: BatchScheduler) -> None:
+    """Fault in model pages and kernels on every engine"""
+    for engine in llm_scheduler.engines:
+        engine.generate("Warmup.", max_tokens=1, temperature=0, use_cache=False)
+
+
+services.register("game_master", GameMaster)
+services.register("rag_engine", RAGEngine)
+services.register("llm_scheduler", build_llm_scheduler, warmup=warmup_llm)
+services.register("lora_switcher", build_lora_switcher)
+services.register("adapter_prefetcher", lambda: AdapterPrefetcher(
+    services.get("lora_switcher"), services.get("game_master")))
+# Per-match worlds (Game Master state and memory database) on the shared
+# model runtime; requests without a session use the default world
+services.register("sessions", build_session_manager)
+services.register("tts", lambda: PiperTTS(simulator=simulator), warmup=lambda tts: tts.synthesize("Warmup."))
+# Whisper is slow to load and most traffic never uses STT
+services.register("stt", lambda: WhisperSTT(simulator=simulator), eager=os.environ.get("SPECTOR_EAGER_STT") == "1")
+# Utterances from concurrent players share one Whisper pass
+services.register("stt_batch", lambda: BatchedSTT(
+    services.get("stt"),
+    max_batch_size=int(os.environ.get("SPECTOR_STT_BATCH_SIZE", "8")),
+    max_wait_ms=float(os.environ.get("SPECTOR_STT_MAX_WAIT_MS", "20"))
+), eager=os.environ.get("SPECTOR_EAGER_STT") == "1")
+
+
+def _scheduler_queue_depth():
+    llm_scheduler = services.peek("llm_scheduler")
+    if llm_scheduler is None:
+        return 0
+    queue = llm_scheduler.queue
+    return {metrics.gauge_series(priority=name): queue.depth(name)
+            for name in queue.classes}
+
+
+def _adapter_cache_bytes() -> float:
+    lora_switcher = services.peek("lora_switcher")
+    return lora_switcher.cache_bytes if lora_switcher is not None else 0
+
+
+metrics.register_gauge("spector_scheduler_queue_depth",
+                       "Generations waiting for an LLM worker, by priority class",
+                       _scheduler_queue_depth)
+metrics.register_gauge("spector_adapter_cache_bytes",
+                       "Bytes of LoRA adapters resident in the cache", _adapter_cache_bytes)
+
+
+async def service(name: str):
+    """Fetch a service without blocking the event loop while it builds"""
+    instance = services.peek(name)
+    if instance is not None:
+        return instance
+    try:
+        return await asyncio.to_thread(services.get, name)
+    except ServiceUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+
+def _session_error(e: Exception) -> HTTPException:
+    if isinstance(e, SessionQuotaExceeded):
+        return HTTPException(status_code=429, detail=str(e))
+    if isinstance(e, SessionLimitReached):
+        return HTTPException(status_code=503, detail=str(e))
+    return HTTPException(status_code=400, detail=str(e))
+
+
+async def world_session(request: Request, session: Optional[str] = None):
+    """
+    The world a request belongs to, from the X-Spector-Session header or
+    the session query parameter; pinned for the length of the request
+    """
+    sessions = await service("sessions")
+    try:
+        world = await asyncio.to_thread(
+            sessions.acquire, request.headers.get("X-Spector-Session") or session)
+    except (ValueError, SessionLimitReached) as e:
+        raise _session_error(e)
+    try:
+        yield world
+    finally:
+        sessions.release(world)
+
+
+@app.on_event("startup")
+def start_services():
+    # Services build in the background; /ready reports when they are done
+    services.start(warmup=os.environ.get("SPECTOR_WARMUP") == "1")
+
+
+@app.middleware("http")
+async def capture_trace(request: Request, call_next):
+    """
+    Send X-Spector-Trace: 1 to capture this request's span tree. The
+    response carries its id in X-Spector-Trace-Id; the tree itself is
+    served from /admin/traces/{trace_id}, since a deep tree outgrows the
+    header size limits of proxies and clients
+    """
+    if request.headers.get("X-Spector-Trace") != "1":
+        return await call_next(request)
+    
+    with tracing.start_trace(f"{request.method} {request.url.path}") as trace:
+        response = await call_next(request)
+    response.headers["X-Spector-Trace-Id"] = trace.trace_id
+    return response
 
 
 # Pydantic models for request/response
@@ -66,6 +292,12 @@ class NPCDialogueRequest(BaseModel):
     context: Optional[Dict[str, Any]] = None
 
 
+class PlayerProximityUpdate(BaseModel):
+    location: Optional[str] = None
+    game_time: Optional[str] = Field(None, pattern=CLOCK_PATTERN)
+    agent_distances: Optional[Dict[str, float]] = None
+
+
 @app.get("/")
 async def root():
     return {
@@ -75,54 +307,134 @@ async def root():
     }
 
 
+@app.get("/ready")
+async def ready():
+    """Readiness: 200 once every eager service is built, 503 until then"""
+    body = {"ready": services.is_ready(), "services": services.status()}
+    return JSONResponse(body, status_code=200 if body["ready"] else 503)
+
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Per-stage latency, cache and fallback metrics in Prometheus text format"""
+    return PlainTextResponse(metrics.render_prometheus(),
+                             media_type="text/plain; version=0.0.4")
+
+
+@app.post("/admin/profile")
+async def capture_profile(seconds: float = 5.0, interval_ms: float = 5.0):
+    """Sample all thread stacks for a window; returns collapsed stacks for a flamegraph"""
+    if seconds <= 0 or interval_ms <= 0:
+        raise HTTPException(status_code=400, detail="seconds and interval_ms must be positive")
+    try:
+        stacks = await asyncio.to_thread(profiler.profile, seconds, interval_ms / 1000.0)
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return PlainTextResponse(stacks, headers={
+        "X-Profile-Samples": str(profiler.last_run['samples'])
+    })
+
+
+@app.get("/admin/traces")
+async def list_traces():
+    """Ids of the most recently captured request traces"""
+    return {"traces": tracing.traces.list_ids()}
+
+
+@app.get("/admin/traces/{trace_id}")
+async def get_trace(trace_id: str):
+    trace = tracing.traces.get(trace_id)
+    if trace is None:
+        raise HTTPException(status_code=404, detail=f"Trace {trace_id} not found")
+    return trace.to_dict()
+
+
+def submit_reactions(lora_switcher: LoRASwitcher, reactions: List[Dict[str, Any]]) -> list:
+    """Queue an ambient reaction for each agent the Game Master woke"""
+    return [
+        lora_switcher.submit_response(
+            adapter_name=reaction['lora_adapter'],
+            prompt=reaction['prompt'],
+            priority=AMBIENT,
+            deadline_ms=AMBIENT_DEADLINE_MS,
+            on_expire="degrade",
+            budget_ms=AMBIENT_BUDGET_MS,
+            archetype=reaction['archetype'],
+            use_cache=CACHE_REACTIONS or None
+        )
+        for reaction in reactions
+    ]
+
+
+async def npc_reply(world: WorldSession, sessions: SessionManager, lora_switcher: LoRASwitcher,
+                    npc_id: str, player_message: str) -> Tuple[Dict[str, Any], str]:
+    """The NPC's agent record and its in-character reply to the player"""
+    # Get agent context from RAG
+    context = world.rag_engine.get_agent_context(
+        agent_id=npc_id,
+        current_event=player_message
+    )
+    
+    # Build prompt
+    agent = context['agent']
+    with span("prompt_build"):
+        prompt = dialogue_prompt(agent, player_message)
+    
+    # Generate response with appropriate LoRA
+    lora_adapter = adapter_for(agent)
+    with sessions.generations(world):
+        response_text = await asyncio.wrap_future(
+            lora_switcher.submit_response(lora_adapter, prompt, priority=DIALOGUE,
+                                          budget_ms=DIALOGUE_BUDGET_MS,
+                                          archetype=agent['archetype'])
+        )
+    return agent, response_text
+
+
 @app.post("/event")
-async def process_event(event: GameEvent):
+async def process_event(event: GameEvent, world: WorldSession = Depends(world_session)):
     """
     Process a game event from Unreal Engine
     Returns affected agents and their reactions
     """
+    sessions = await service("sessions")
+    lora_switcher = await service("lora_switcher")
     try:
-        response = game_master.process_event(event.dict())
+        response = world.game_master.process_event(event.dict())
         
-        # Generate actual LLM responses for each agent
-        for reaction in response['agent_reactions']:
-            lora_response = lora_switcher.generate_response(
-                adapter_name=reaction['lora_adapter'],
-                prompt=reaction['prompt']
-            )
+        # Generate actual LLM responses for each agent concurrently
+        reactions = response['agent_reactions']
+        with sessions.generations(world, len(reactions)):
+            futures = submit_reactions(lora_switcher, reactions)
+            results = await asyncio.gather(*(asyncio.wrap_future(f) for f in futures))
+        
+        for reaction, lora_response in zip(reactions, results):
             reaction['generated_response'] = lora_response
         
         return response
     
+    except SessionQuotaExceeded as e:
+        raise _session_error(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.post("/dialogue")
-async def npc_dialogue(request: NPCDialogueRequest):
+async def npc_dialogue(request: NPCDialogueRequest,
+                       world: WorldSession = Depends(world_session)):
     """
     Handle player-NPC conversation
     """
+    sessions = await service("sessions")
+    lora_switcher = await service("lora_switcher")
+    tts_service = await service("tts")
     try:
-        # Get agent context from RAG
-        context = rag_engine.get_agent_context(
-            agent_id=request.npc_id,
-            current_event=request.player_message
-        )
-        
-        # Build prompt
-        agent = context['agent']
-        prompt = f"""You are {agent['name']}.
-Player says: "{request.player_message}"
-
-Respond naturally in character (1-2 sentences)."""
-        
-        # Generate response with appropriate LoRA
-        lora_adapter = f"{agent['archetype']}.lora"
-        response_text = lora_switcher.generate_response(lora_adapter, prompt)
+        agent, response_text = await npc_reply(world, sessions, lora_switcher,
+                                               request.npc_id, request.player_message)
         
         # Convert to speech
-        audio = tts_service.synthesize(
+        audio = await asyncio.to_thread(
+            tts_service.synthesize,
             text=response_text,
             voice_id=agent.get('voice_id', 'default')
         )
@@ -134,23 +446,283 @@ Respond naturally in character (1-2 sentences)."""
             "emotional_state": agent['emotional_state']
         }
     
+    except SessionQuotaExceeded as e:
+        raise _session_error(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.websocket("/ws/stt")
+async def stream_stt(websocket: WebSocket, language: Optional[str] = "en",
+                     session_id: Optional[str] = None):
+    """
+    Streaming transcription
+    Send binary frames of 16 kHz mono 16-bit PCM and a text frame "end" to
+    flush; receives JSON speech_start / partial / final events. An empty
+    language auto-detects once per session_id
+    """
+    await websocket.accept()
+    try:
+        stt_batch = await service("stt_batch")
+    except HTTPException as e:
+        await websocket.close(code=1011, reason=e.detail)
+        return
+    
+    transcriber = StreamingTranscriber(stt_batch, language=language or None,
+                                       session_id=session_id)
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            if message.get("bytes"):
+                events = await asyncio.to_thread(transcriber.feed, message["bytes"])
+            elif message.get("text") == "end":
+                events = await asyncio.to_thread(transcriber.flush)
+                events.append({"type": "end", "stats": transcriber.get_stats()})
+            else:
+                continue
+            for event in events:
+                await websocket.send_json(event)
+    except WebSocketDisconnect:
+        pass
+
+
+@app.websocket("/ws/voice")
+async def voice_session(websocket: WebSocket, npc_id: str, language: Optional[str] = "en",
+                        session_id: Optional[str] = None, session: Optional[str] = None):
+    """
+    Spoken conversation with one NPC
+    Send 16 kHz mono 16-bit PCM as binary frames and "end" to finish;
+    receives transcript / reply / timing JSON events, each "audio" event
+    followed by a binary WAV frame, and "barge_in" when the player
+    interrupts the NPC. session_id identifies the speaker (language
+    cache); the world comes from X-Spector-Session or session
+    """
+    await websocket.accept()
+    try:
+        stt_batch = await service("stt_batch")
+        sessions = await service("sessions")
+        lora_switcher = await service("lora_switcher")
+        tts_service = await service("tts")
+        world = await asyncio.to_thread(
+            sessions.acquire, websocket.headers.get("X-Spector-Session") or session)
+    except HTTPException as e:
+        await websocket.close(code=1011, reason=e.detail)
+        return
+    except (ValueError, SessionLimitReached) as e:
+        await websocket.close(code=1008 if isinstance(e, ValueError) else 1013, reason=str(e))
+        return
+    
+    pipeline = VoicePipeline(
+        npc_id,
+        StreamingTranscriber(stt_batch, language=language or None, session_id=session_id),
+        world.rag_engine, lora_switcher, tts_service,
+        send_event=websocket.send_json,
+        send_audio=websocket.send_bytes,
+        priority=DIALOGUE,
+        budget_ms=DIALOGUE_BUDGET_MS,
+        generation_slot=lambda: sessions.generations(world)
+    )
+    pipeline.start()
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            if message.get("bytes"):
+                await pipeline.feed(message["bytes"])
+            elif message.get("text") == "end":
+                await pipeline.finish()
+                await websocket.send_json({"type": "end", "stats": pipeline.get_stats()})
+                break
+    except WebSocketDisconnect:
+        pass
+    finally:
+        await pipeline.close()
+        sessions.release(world)
+
+
+def _parse(model, data: Dict[str, Any]):
+    try:
+        return model(**data)
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+
+@app.websocket("/ws/channel")
+async def event_channel(websocket: WebSocket, session: Optional[str] = None):
+    """
+    Persistent channel for the game client: events, dialogue and
+    proximity updates with request ids, NPC reactions pushed as they are
+    generated. Offer the "spector.msgpack" subprotocol for binary msgpack
+    frames, otherwise messages are JSON text frames
+    """
+    offered = websocket.scope.get("subprotocols") or []
+    codec = ChannelCodec.negotiate(offered)
+    await websocket.accept(subprotocol=codec.name if codec.name in offered else None)
+    try:
+        sessions = await service("sessions")
+        lora_switcher = await service("lora_switcher")
+        world = await asyncio.to_thread(
+            sessions.acquire, websocket.headers.get("X-Spector-Session") or session)
+    except HTTPException as e:
+        await websocket.close(code=1011, reason=e.detail)
+        return
+    except (ValueError, SessionLimitReached) as e:
+        await websocket.close(code=1008 if isinstance(e, ValueError) else 1013, reason=str(e))
+        return
+    
+    async def on_event(data, push):
+        event = _parse(GameEvent, data)
+        response = world.game_master.process_event(event.dict())
+        reactions = response['agent_reactions']
+        
+        async def react(reaction, future):
+            pushed = {'event_id': response['event_id'], 'agent_id': reaction['agent_id'],
+                      'agent_name': reaction['agent_name']}
+            try:
+                pushed['text'] = await asyncio.wrap_future(future)
+            except Exception as e:
+                pushed['error'] = str(e)
+            await push("reaction", pushed)
+        
+        try:
+            with sessions.generations(world, len(reactions)):
+                futures = submit_reactions(lora_switcher, reactions)
+                await push("ack", {'event_id': response['event_id'],
+                                   'affected_agents': response['affected_agents']})
+                await asyncio.gather(*(react(r, f) for r, f in zip(reactions, futures)))
+        except SessionQuotaExceeded as e:
+            raise _session_error(e)
+    
+    async def on_dialogue(data, push):
+        request = _parse(NPCDialogueRequest, data)
+        try:
+            agent, text = await npc_reply(world, sessions, lora_switcher,
+                                          request.npc_id, request.player_message)
+        except SessionQuotaExceeded as e:
+            raise _session_error(e)
+        await push("reply", {'npc_id': request.npc_id, 'text': text,
+                             'emotional_state': agent['emotional_state']})
+        if data.get('audio'):
+            tts_service = await service("tts")
+            audio = await asyncio.to_thread(tts_service.synthesize, text=text,
+                                            voice_id=agent.get('voice_id', 'default'))
+            await push("audio", {'npc_id': request.npc_id, 'format': 'wav', 'audio': audio})
+    
+    async def on_proximity(data, push):
+        return await prefetch_nearby(_parse(PlayerProximityUpdate, data), world)
+    
+    async def on_stats(data, push):
+        return channel.get_stats()
+    
+    async def receive():
+        message = await websocket.receive()
+        if message["type"] == "websocket.disconnect":
+            return None
+        return message.get("bytes") or message.get("text")
+    
+    send = websocket.send_bytes if codec.binary else websocket.send_text
+    channel = EventChannel(codec, send, {
+        "event": on_event,
+        "dialogue": on_dialogue,
+        "proximity": on_proximity,
+        "stats": on_stats
+    })
+    try:
+        await channel.run(receive)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        sessions.release(world)
+
+
+@app.on_event("shutdown")
+def shutdown_services():
+    llm_scheduler = services.peek("llm_scheduler")
+    if llm_scheduler is not None:
+        llm_scheduler.shutdown(wait=False)
+    adapter_prefetcher = services.peek("adapter_prefetcher")
+    if adapter_prefetcher is not None:
+        adapter_prefetcher.stop()
+    stt_batch = services.peek("stt_batch")
+    if stt_batch is not None:
+        stt_batch.shutdown(wait=False)
+    sessions = services.peek("sessions")
+    if sessions is not None:
+        sessions.stop()
+    services.shutdown()
+    if generation_cache is not None:
+        generation_cache.save()
+
+
+@app.post("/player/proximity")
+async def player_proximity(update: PlayerProximityUpdate,
+                           world: WorldSession = Depends(world_session)):
+    """
+    Report the player's position so nearby NPC adapters can be prefetched
+    Send either agent_distances (from the client) or a location
+    """
+    return await prefetch_nearby(update, world)
+
+
+async def prefetch_nearby(update: PlayerProximityUpdate, world: WorldSession) -> Dict[str, Any]:
+    adapter_prefetcher = await service("adapter_prefetcher")
+    if update.agent_distances:
+        predicted = adapter_prefetcher.update_proximity(update.agent_distances,
+                                                        world.game_master)
+    elif update.location:
+        predicted = adapter_prefetcher.update_player_location(
+            update.location, update.game_time, world.game_master)
+    else:
+        raise HTTPException(status_code=400,
+                            detail="Provide location or agent_distances")
+    
+    return {"prefetching": predicted, "stats": adapter_prefetcher.get_stats()}
+
+
+@app.get("/scheduler")
+async def scheduler_status():
+    """Generation queue, batching and adapter swap statistics"""
+    llm_scheduler = await service("llm_scheduler")
+    return llm_scheduler.get_stats()
+
+
 @app.get("/agents")
-async def list_agents():
+async def list_agents(world: WorldSession = Depends(world_session)):
     """List all available NPC agents"""
-    return {"agents": game_master.agents_config['agents']}
+    return {"agents": world.game_master.agents_config['agents']}
 
 
 @app.get("/agent/{agent_id}")
-async def get_agent_info(agent_id: str):
+async def get_agent_info(agent_id: str, world: WorldSession = Depends(world_session)):
     """Get detailed information about a specific agent"""
-    context = rag_engine.get_agent_context(agent_id, "current state")
+    context = world.rag_engine.get_agent_context(agent_id, "current state")
     return context
 
 
+@app.get("/admin/sessions")
+async def list_sessions():
+    """Open session worlds, their quotas and usage"""
+    sessions = await service("sessions")
+    return sessions.get_stats()
+
+
+@app.delete("/admin/sessions/{session_id}")
+async def evict_session(session_id: str):
+    """Persist and close an idle session now (it is restored on next use)"""
+    sessions = await service("sessions")
+    try:
+        evicted = await asyncio.to_thread(sessions.evict, session_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not evicted:
+        raise HTTPException(status_code=409,
+                            detail=f"Session {session_id} is not open or is in use")
+    return {"evicted": session_id}
+
+
 if __name__ == "__main__":
     print("Starting Project Spector AI Backend...")
     uvicorn.run(app, host="0.0.0.0", port=8000)
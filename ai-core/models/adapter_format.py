@@ -0,0 +1,185 @@
+"""
+Memory-Mapped Adapter Format
+On-disk layout for LoRA weights that loads as zero-copy NumPy views
+
+Layout (little-endian):
+    bytes 0-7     magic b"SPLORA\\0\\0"
+    bytes 8-11    uint32 format version
+    bytes 12-15   uint32 length of the JSON header
+    bytes 16-     UTF-8 JSON header:
+                    {"metadata": {...},
+                     "tensors": {name: {"dtype", "shape", "offset", "nbytes"}}}
+    tensor data, each tensor starting on an ALIGNMENT-byte file offset
+
+Because tensors are read straight out of a read-only mmap, "loading" an
+adapter only maps the file; pages are faulted in on first use and shared
+through the OS page cache by every server process that maps the same file.
+"""
+
+import json
+import logging
+import mmap
+import struct
+from typing import Dict, Optional, Any
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"SPLORA\0\0"
+VERSION = 1
+ALIGNMENT = 64
+_PREAMBLE = struct.Struct("<8sII")
+
+
+def _align(offset: int) -> int:
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def is_mapped_adapter(path: str) -> bool:
+    """Check whether a file starts with the mapped adapter magic"""
+    try:
+        with open(path, 'rb') as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+
+def write_adapter(path: str, tensors: Dict[str, Any],
+                  metadata: Optional[Dict[str, Any]] = None) -> None:
+    """Write NumPy arrays to the mapped adapter layout"""
+    import numpy as np
+
+    arrays = {name: np.ascontiguousarray(t) for name, t in tensors.items()}
+
+    # Offsets depend on the header length, which depends on the offsets;
+    # iterate until the header size settles
+    header_len = 0
+    while True:
+        offset = _align(_PREAMBLE.size + header_len)
+        table = {}
+        for name, array in arrays.items():
+            table[name] = {
+                'dtype': array.dtype.str,
+                'shape': list(array.shape),
+                'offset': offset,
+                'nbytes': array.nbytes
+            }
+            offset = _align(offset + array.nbytes)
+
+        header = json.dumps({'metadata': metadata or {}, 'tensors': table}).encode('utf-8')
+        if len(header) == header_len:
+            break
+        header_len = len(header)
+
+    with open(path, 'wb') as f:
+        f.write(_PREAMBLE.pack(MAGIC, VERSION, len(header)))
+        f.write(header)
+        for name, array in arrays.items():
+            f.seek(table[name]['offset'])
+            f.write(array.tobytes())
+        # Pad the final tensor so the file size is aligned too
+        f.truncate(_align(f.tell()))
+
+
+class MappedAdapter:
+    """
+    Read-only view of a mapped adapter file
+
+    tensors maps names to NumPy arrays backed directly by the mmap (no copy).
+    The mapping stays open while any view is referenced, so evicting an
+    adapter just drops the reference instead of calling close().
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._views: Dict[str, Any] = {}
+
+        try:
+            self._read_header()
+        except Exception:
+            self._mmap.close()
+            raise
+
+    def _read_header(self) -> None:
+        """Parse and check the preamble, header and tensor table"""
+        if len(self._mmap) < _PREAMBLE.size:
+            raise ValueError(f"Truncated adapter file: {self.path}")
+        magic, version, header_len = _PREAMBLE.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            raise ValueError(f"Not a mapped adapter file: {self.path}")
+        if version != VERSION:
+            raise ValueError(f"Unsupported adapter format version {version}: {self.path}")
+
+        start = _PREAMBLE.size
+        try:
+            header = json.loads(self._mmap[start:start + header_len].decode('utf-8'))
+            self.metadata: Dict[str, Any] = header.get('metadata', {})
+            self.tensor_table: Dict[str, Dict[str, Any]] = header['tensors']
+        except (ValueError, KeyError, AttributeError) as e:
+            raise ValueError(f"Corrupt adapter header in {self.path}: {e}") from e
+
+        for name, spec in self.tensor_table.items():
+            if spec['offset'] + spec['nbytes'] > len(self._mmap):
+                raise ValueError(f"Tensor {name} runs past the end of {self.path}")
+
+    @property
+    def tensors(self) -> Dict[str, Any]:
+        """All tensors as zero-copy NumPy views"""
+        return {name: self.tensor(name) for name in self.tensor_table}
+
+    def tensor(self, name: str):
+        """Zero-copy view of one tensor"""
+        view = self._views.get(name)
+        if view is None:
+            import numpy as np
+
+            spec = self.tensor_table[name]
+            dtype = np.dtype(spec['dtype'])
+            count = spec['nbytes'] // dtype.itemsize
+            view = np.frombuffer(self._mmap, dtype=dtype, count=count,
+                                 offset=spec['offset']).reshape(spec['shape'])
+            self._views[name] = view
+        return view
+
+    @property
+    def nbytes(self) -> int:
+        return sum(spec['nbytes'] for spec in self.tensor_table.values())
+
+    def close(self) -> None:
+        """Unmap the file; only valid once no tensor views are referenced"""
+        self._views.clear()
+        self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Pack LoRA weights into the mapped adapter format')
+    parser.add_argument('weights', help='.npz file of LoRA tensors')
+    parser.add_argument('output', help='Output .lora path')
+    parser.add_argument('--metadata', help='Sidecar JSON to embed in the header')
+    args = parser.parse_args()
+
+    import numpy as np
+
+    with np.load(args.weights) as npz:
+        weights = {name: npz[name] for name in npz.files}
+
+    meta = None
+    if args.metadata:
+        with open(args.metadata) as f:
+            meta = json.load(f)
+
+    write_adapter(args.output, weights, meta)
+
+    with MappedAdapter(args.output) as adapter:
+        print(f"Wrote {len(adapter.tensor_table)} tensors "
+              f"({adapter.nbytes / 1e6:.1f} MB) to {args.output}")
@@ -0,0 +1,480 @@
+"""
+Batch Scheduler - Concurrent Generation Front-End
+Collects generation requests from many callers and serves them in batches
+across a pool of LLMEngine instances
+"""
+
+import contextlib
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Callable, Optional, List, Dict, Any
+
+from monitoring import tracing
+from monitoring.metrics import inc, observe, span
+
+logger = logging.getLogger(__name__)
+
+
+class DeadlineExceeded(TimeoutError):
+    """A queued request expired before a worker reached it"""
+
+
+@dataclass
+class GenerationRequest:
+    """A single queued completion with its own sampling parameters"""
+    prompt: str
+    max_tokens: int = 100
+    temperature: float = 0.7
+    stop: Optional[list] = None
+    adapter: Optional[str] = None
+    # Scheduling class for priority-aware queues; None means the lowest
+    priority: Optional[str] = None
+    # Monotonic time after which the request is no longer worth running,
+    # and what to do then: "drop" fails it, "degrade" serves the fallback
+    deadline: Optional[float] = None
+    on_expire: str = "drop"
+    # Seconds the caller can wait; if the estimated latency is higher the
+    # request is answered by the fallback instead of being queued
+    budget: Optional[float] = None
+    # Character archetype, used to pick an in-character fallback line
+    archetype: Optional[str] = None
+    # Generation cache policy for this request (LLMEngine.generate)
+    use_cache: Optional[bool] = None
+    future: Future = field(default_factory=Future)
+    enqueued_at: float = field(default_factory=time.monotonic)
+    # Open trace span of the submitting request (None unless tracing)
+    trace_parent: Optional[tracing.TraceSpan] = field(default_factory=tracing.current_span)
+
+
+class FifoRequestQueue:
+    """Arrival-order request queue (the default scheduling policy)"""
+
+    def __init__(self):
+        self._items: deque = deque()
+
+    def push(self, request: GenerationRequest) -> None:
+        self._items.append(request)
+
+    def pop_batch(self, max_size: int) -> List[GenerationRequest]:
+        batch = []
+        while self._items and len(batch) < max_size:
+            batch.append(self._items.popleft())
+        return batch
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def oldest_enqueued_at(self) -> Optional[float]:
+        return self._items[0].enqueued_at if self._items else None
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {'policy': 'fifo', 'depth': len(self._items)}
+
+
+class BatchScheduler:
+    """
+    Continuous-batching scheduler in front of LLMEngine
+
+    Each engine in the pool gets a worker thread. A free worker takes the
+    next batch as soon as one is available, waiting at most max_wait_ms for
+    the batch to fill, and hands it to LLMEngine.generate_batch. A batch
+    runs its sequences one after another on its engine (grouped by
+    adapter), so batching saves queueing and adapter swaps, not decode
+    time; requests only decode in parallel across engines. With a single
+    engine (the SPECTOR_LLM_WORKERS default) the five agents woken by one
+    event are generated strictly in turn.
+
+    llama.cpp memory-maps GGUF weights, so engines in one process share the
+    model pages; pass n_threads to each engine to split cores between them.
+
+    Requests may name a LoRA adapter. adapter_context (typically
+    LoRASwitcher.use_adapter) is entered just before the request runs and
+    held until it finishes, so the queue policy decides the order in which
+    adapters are swapped in and the adapter cannot be evicted mid-generation.
+
+    Requests past their deadline are not run. Those submitted with
+    on_expire="degrade" resolve to fallback(request) (e.g. a canned line)
+    when a fallback is configured; the rest fail with DeadlineExceeded.
+    A request with a latency budget is shed to the fallback at submit time
+    when estimate_latency() says it would not finish within the budget.
+    """
+
+    SERVICE_TIME_ALPHA = 0.2
+
+    def __init__(self, engines: list, max_batch_size: int = 8,
+                 max_wait_ms: float = 5.0, request_queue=None,
+                 adapter_context=None,
+                 fallback: Optional[Callable[[GenerationRequest], str]] = None):
+        if not engines:
+            raise ValueError("BatchScheduler needs at least one engine")
+
+        self.engines = list(engines)
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.queue = request_queue if request_queue is not None else FifoRequestQueue()
+        self.adapter_context = adapter_context
+        self.fallback = fallback
+
+        self._cond = threading.Condition()
+        self._running = False
+        self._workers: List[threading.Thread] = []
+
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.batches = 0
+        self.expired_dropped = 0
+        self.expired_degraded = 0
+        self.shed = 0
+        # EWMA of worker seconds per completed request
+        self.service_time: Optional[float] = None
+        # Adapter changes serving queued requests in arrival order would take
+        self.arrival_swaps = 0
+        self._last_arrival: Optional[str] = None
+
+    def start(self) -> None:
+        """Spawn one worker thread per engine"""
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+
+        for index, engine in enumerate(self.engines):
+            worker = threading.Thread(
+                target=self._worker_loop,
+                args=(engine,),
+                name=f"llm-worker-{index}",
+                daemon=True
+            )
+            worker.start()
+            self._workers.append(worker)
+
+        logger.info(f"Batch scheduler started with {len(self.engines)} engine(s)")
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop workers; queued requests are cancelled"""
+        with self._cond:
+            self._running = False
+            pending = self.queue.pop_batch(len(self.queue))
+            self._cond.notify_all()
+
+        for request in pending:
+            request.future.cancel()
+
+        if wait:
+            for worker in self._workers:
+                worker.join()
+        self._workers.clear()
+
+    def submit(self, prompt: str, max_tokens: int = 100,
+               temperature: float = 0.7, stop: list = None,
+               adapter: str = None, priority: Optional[str] = None,
+               deadline_ms: Optional[float] = None,
+               on_expire: str = "drop", budget_ms: Optional[float] = None,
+               archetype: Optional[str] = None,
+               use_cache: Optional[bool] = None) -> Future:
+        """Queue a completion and return a Future resolving to its text"""
+        return self.submit_request(GenerationRequest(
+            prompt=prompt,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            stop=stop,
+            adapter=adapter,
+            priority=priority,
+            deadline=(time.monotonic() + deadline_ms / 1000.0
+                      if deadline_ms is not None else None),
+            on_expire=on_expire,
+            budget=budget_ms / 1000.0 if budget_ms is not None else None,
+            archetype=archetype,
+            use_cache=use_cache
+        ))
+
+    def submit_request(self, request: GenerationRequest) -> Future:
+        """Queue a prepared GenerationRequest"""
+        if not self._running:
+            self.start()
+
+        if request.budget is not None and self.fallback is not None:
+            estimate = self.estimate_latency(request.priority)
+            if estimate > request.budget and self._shed(request, estimate):
+                return request.future
+
+        with self._cond:
+            self.queue.push(request)
+            self.submitted += 1
+            if request.adapter != self._last_arrival:
+                self.arrival_swaps += 1
+                self._last_arrival = request.adapter
+            self._cond.notify()
+
+        return request.future
+
+    def estimate_latency(self, priority: Optional[str] = None) -> float:
+        """
+        Predicted seconds until a new request of this priority completes:
+        the work queued ahead of it spread across the pool, plus its own
+        generation. 0.0 until a batch has completed
+        """
+        with self._cond:
+            per_request = self.service_time
+            if hasattr(self.queue, 'depth_ahead'):
+                ahead = self.queue.depth_ahead(priority)
+            else:
+                ahead = len(self.queue)
+
+        if per_request is None:
+            return 0.0
+        return self.max_wait + per_request * (ahead / len(self.engines) + 1)
+
+    def _shed(self, request: GenerationRequest, estimate: float) -> bool:
+        """Answer a request with the fallback instead of queueing it"""
+        try:
+            text = self.fallback(request)
+        except Exception as e:
+            logger.error(f"Fallback failed, queueing instead: {e}")
+            return False
+
+        with self._cond:
+            self.submitted += 1
+            self.shed += 1
+        inc("spector_load_shed_total", priority=request.priority or "default")
+        now = time.perf_counter()
+        self._trace(request, now, now, now, 0, estimate_ms=round(estimate * 1000.0, 1),
+                    outcome="shed")
+        request.future.set_running_or_notify_cancel()
+        request.future.set_result(text)
+        return True
+
+    def generate(self, prompt: str, max_tokens: int = 100,
+                 temperature: float = 0.7, stop: list = None) -> str:
+        """Blocking convenience wrapper with the LLMEngine.generate signature"""
+        return self.submit(prompt, max_tokens, temperature, stop).result()
+
+    def _next_batch(self) -> List[GenerationRequest]:
+        """Block until work is available, then let the batch fill briefly"""
+        with self._cond:
+            while self._running and not len(self.queue):
+                self._cond.wait()
+
+            if not self._running:
+                return []
+
+            deadline = time.monotonic() + self.max_wait
+            while len(self.queue) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+            # Split the backlog across the pool so one worker does not
+            # drain every queued request while the others sit idle
+            share = -(-len(self.queue) // len(self.engines))
+            return self.queue.pop_batch(min(self.max_batch_size, share))
+
+    def _worker_loop(self, engine) -> None:
+        while True:
+            batch = self._next_batch()
+            if not batch:
+                if not self._running:
+                    return
+                continue
+
+            start = time.perf_counter()
+            completed, failed = self._run_batch(engine, batch)
+            elapsed = time.perf_counter() - start
+            with self._cond:
+                self.batches += 1
+                self.completed += completed
+                self.failed += failed
+                if completed:
+                    sample = elapsed / completed
+                    if self.service_time is None:
+                        self.service_time = sample
+                    else:
+                        self.service_time += self.SERVICE_TIME_ALPHA * (sample - self.service_time)
+
+    def _run_batch(self, engine, batch: List[GenerationRequest]) -> tuple:
+        """
+        Execute a batch on one engine, resolving each request's future
+        Every distinct adapter in the batch stays pinned for the whole pass;
+        a request whose adapter cannot be loaded fails on its own.
+        Returns (completed, failed) counts
+        """
+        live = [r for r in batch if r.future.set_running_or_notify_cancel()]
+        failed = 0
+
+        now = time.monotonic()
+        batch_start = time.perf_counter()
+        for request in live:
+            observe("spector_stage_seconds", now - request.enqueued_at,
+                    stage="queue_wait", priority=request.priority or "default")
+        live = [r for r in live if not self._expire(r, now, batch_start)]
+
+        with contextlib.ExitStack() as stack:
+            adapters: Dict[Optional[str], Any] = {}
+            runnable = []
+            for request in live:
+                if request.adapter not in adapters:
+                    try:
+                        adapters[request.adapter] = stack.enter_context(
+                            self._adapter_scope(request.adapter))
+                    except Exception as e:
+                        logger.error(f"Adapter {request.adapter} unavailable: {e}")
+                        adapters[request.adapter] = e
+
+                adapter = adapters[request.adapter]
+                if isinstance(adapter, Exception):
+                    failed += 1
+                    self._trace(request, batch_start - (now - request.enqueued_at),
+                                batch_start, time.perf_counter(), len(live), str(adapter))
+                    request.future.set_exception(adapter)
+                    continue
+                runnable.append((request, adapter or request.adapter))
+
+            if not runnable:
+                return 0, failed
+
+            try:
+                with span("llm_batch"):
+                    texts = engine.generate_batch([
+                        (adapter, request.prompt, {
+                            'max_tokens': request.max_tokens,
+                            'temperature': request.temperature,
+                            'stop': request.stop,
+                            'use_cache': request.use_cache
+                        })
+                        for request, adapter in runnable
+                    ])
+            except Exception as e:
+                logger.error(f"Batched generation failed: {e}")
+                batch_end = time.perf_counter()
+                for request, _ in runnable:
+                    self._trace(request, batch_start - (now - request.enqueued_at),
+                                batch_start, batch_end, len(runnable), str(e))
+                    request.future.set_exception(e)
+                return 0, failed + len(runnable)
+
+        batch_end = time.perf_counter()
+        for (request, _), text in zip(runnable, texts):
+            # Record before resolving so the caller's trace is complete
+            self._trace(request, batch_start - (now - request.enqueued_at),
+                        batch_start, batch_end, len(runnable))
+            request.future.set_result(text)
+
+        return len(runnable), failed
+
+    def _expire(self, request: GenerationRequest, now: float, batch_start: float) -> bool:
+        """Resolve a request whose deadline has passed; True if it expired"""
+        if request.deadline is None or now <= request.deadline:
+            return False
+
+        enqueued = batch_start - (now - request.enqueued_at)
+        priority = request.priority or "default"
+        if request.on_expire == "degrade" and self.fallback is not None:
+            try:
+                text = self.fallback(request)
+            except Exception as e:
+                logger.error(f"Fallback failed: {e}")
+            else:
+                with self._cond:
+                    self.expired_degraded += 1
+                inc("spector_deadline_expired_total", priority=priority, action="degrade")
+                self._trace(request, enqueued, batch_start, batch_start, 0,
+                            outcome="degraded")
+                request.future.set_result(text)
+                return True
+
+        with self._cond:
+            self.expired_dropped += 1
+        inc("spector_deadline_expired_total", priority=priority, action="drop")
+        error = DeadlineExceeded(
+            f"Request waited {(now - request.enqueued_at) * 1000.0:.0f}ms, past its deadline")
+        self._trace(request, enqueued, batch_start, batch_start, 0, str(error))
+        request.future.set_exception(error)
+        return True
+
+    @staticmethod
+    def _trace(request: GenerationRequest, enqueued: float, batch_start: float,
+               batch_end: float, batch_size: int, error: Optional[str] = None,
+               **attrs) -> None:
+        """Attach this request's queue wait and batch to the submitter's trace"""
+        if request.trace_parent is None:
+            return
+        generation = tracing.record(request.trace_parent, "generate_response",
+                                    enqueued, batch_end, error=error,
+                                    adapter=request.adapter,
+                                    priority=request.priority, **attrs)
+        tracing.record(generation, "queue_wait", enqueued, batch_start)
+        if batch_size:
+            tracing.record(generation, "llm_batch", batch_start, batch_end,
+                           error=error, batch_size=batch_size,
+                           worker=threading.current_thread().name)
+
+    def _adapter_scope(self, adapter: Optional[str]):
+        if adapter and self.adapter_context:
+            return self.adapter_context(adapter)
+        return contextlib.nullcontext()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Throughput counters and queue state"""
+        return {
+            'engines': len(self.engines),
+            'running': self._running,
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': self.max_wait * 1000.0,
+            'submitted': self.submitted,
+            'completed': self.completed,
+            'failed': self.failed,
+            'batches': self.batches,
+            'expired_dropped': self.expired_dropped,
+            'expired_degraded': self.expired_degraded,
+            'shed': self.shed,
+            'degradation_rate': ((self.shed + self.expired_degraded) / self.submitted
+                                 if self.submitted else 0.0),
+            'service_time_ms': (self.service_time * 1000.0
+                                if self.service_time is not None else None),
+            'avg_batch_size': self.completed / self.batches if self.batches else 0.0,
+            'adapter_swaps': self._adapter_swaps(),
+            'queue': self.queue.get_stats()
+        }
+
+    def _adapter_swaps(self) -> Dict[str, Any]:
+        """
+        Adapter switches the engines actually made, against the switches
+        serving every request in arrival order would have taken. Engines
+        that do not report switches (model server clients) leave actual
+        unknown
+        """
+        switches = [getattr(engine, 'batch_stats', {}).get('adapter_switches')
+                    for engine in self.engines]
+        actual = None if None in switches else sum(switches)
+        return {
+            'arrival_order': self.arrival_swaps,
+            'actual': actual,
+            'saved': self.arrival_swaps - actual if actual is not None else None
+        }
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+
+    from models.llm_engine import LLMEngine
+
+    scheduler = BatchScheduler([LLMEngine() for _ in range(2)])
+    prompts = [
+        "You are a grumpy baker.",
+        "You are an opportunistic cop.",
+        "You are an anxious student.",
+        "You are a vigilante landlord.",
+    ]
+
+    futures = [scheduler.submit(p, max_tokens=50) for p in prompts]
+    for prompt, future in zip(prompts, futures):
+        print(f"{prompt} -> {future.result()}")
+
+    print(scheduler.get_stats())
+    scheduler.shutdown()
@@ -0,0 +1,96 @@
+"""
+Canned Responses - Archetype Stock Lines
+Serves pre-written in-character lines when there is no time to generate
+"""
+
+import json
+import logging
+import re
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple, Any
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PATH = Path(__file__).resolve().parents[2] / "tools" / "training_data" / "character_responses.json"
+
+_WORD = re.compile(r"[a-z']+")
+
+
+def _words(text: str) -> Set[str]:
+    return set(_WORD.findall(text.lower()))
+
+
+class CannedResponses:
+    """
+    Lines from the LoRA training set, keyed by character archetype
+
+    pick() prefers lines whose training situation shares the most words
+    with the prompt, and rotates through equally good lines so a crowd of
+    degraded NPCs does not all say the same thing.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = str(path or DEFAULT_PATH)
+        self._lines: Dict[str, List[Tuple[Set[str], str]]] = {}
+        self._cursor: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.served: Dict[str, int] = {}
+        self.misses = 0
+        self.load(self.path)
+
+    def load(self, path: str) -> None:
+        try:
+            with open(path, 'r') as f:
+                examples = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"No canned responses loaded from {path}: {e}")
+            return
+
+        lines: Dict[str, List[Tuple[Set[str], str]]] = {}
+        for example in examples:
+            character = example.get('character')
+            output = example.get('output')
+            if character and output:
+                lines.setdefault(character, []).append((_words(example.get('input', '')), output))
+
+        self._lines = lines
+        logger.info(f"Loaded canned responses for {len(lines)} archetypes")
+
+    def pick(self, archetype: Optional[str], situation: str = "") -> Optional[str]:
+        """A stock line for the archetype, or None if it has none"""
+        candidates = self._lines.get(archetype) if archetype else None
+        if not candidates:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        words = _words(situation)
+        scores = [len(words & situation_words) for situation_words, _ in candidates]
+        best = max(scores)
+        matching = [line for score, (_, line) in zip(scores, candidates) if score == best]
+
+        with self._lock:
+            cursor = self._cursor.get(archetype, 0)
+            self._cursor[archetype] = cursor + 1
+            self.served[archetype] = self.served.get(archetype, 0) + 1
+        return matching[cursor % len(matching)]
+
+    def archetypes(self) -> List[str]:
+        return sorted(self._lines)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'archetypes': len(self._lines),
+            'served': dict(self.served),
+            'misses': self.misses
+        }
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+
+    canned = CannedResponses()
+    for archetype in canned.archetypes():
+        print(f"{archetype}: {canned.pick(archetype, 'A loud noise disturbs you')}")
+    print(canned.get_stats())
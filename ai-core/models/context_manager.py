@@ -0,0 +1,252 @@
+"""
+Chat Context Manager
+Fits chat history into the model's context window and sizes the reply
+"""
+
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple, Any
+
+logger = logging.getLogger(__name__)
+
+# (previous summary or None, turns to fold in) -> new summary
+Summarizer = Callable[[Optional[str], List[Dict[str, str]]], str]
+
+
+def approx_token_count(text: str) -> int:
+    """Rough count for backends without a tokenizer (~4 chars per token)"""
+    return max(1, (len(text) + 3) // 4)
+
+
+def render_message(message: Dict[str, str]) -> str:
+    """One message in the prompt format the models were tuned on"""
+    role = message.get('role', 'user')
+    content = message.get('content', '')
+    if role == 'system':
+        return f"{content}\n\n"
+    if role == 'assistant':
+        return f"Assistant: {content}\n"
+    return f"Human: {content}\n"
+
+
+REPLY_PREFIX = "Assistant:"
+
+
+@dataclass
+class ChatPlan:
+    """A prompt that fits the window plus the reply length to request"""
+    prompt: str
+    max_tokens: int
+    prompt_tokens: int
+    kept_turns: int
+    dropped_turns: int
+    summarized: bool = False
+    limits: List[str] = field(default_factory=list)
+
+
+class ChatContextManager:
+    """
+    Token-aware history window for LLMEngine.chat
+
+    System messages are always kept. The remaining turns are kept newest
+    first while they fit in n_ctx minus the reply reserve (and under
+    max_history_tokens, which bounds prompt-eval time). Turns that fall
+    out of the window can be folded into a rolling summary; summaries are
+    cached by conversation prefix, so each turn is summarized only once as
+    it scrolls out. Per-message token counts are cached as well, so a long
+    conversation is not re-tokenized on every turn.
+
+    The reply's max_tokens is capped by the context left after the prompt
+    and, given a latency target and measured throughput, by what can be
+    decoded in time.
+    """
+
+    def __init__(self, count_tokens: Callable[[str], int] = approx_token_count,
+                 n_ctx: int = 2048,
+                 max_history_tokens: Optional[int] = None,
+                 min_reply_tokens: int = 16,
+                 summarizer: Optional[Summarizer] = None,
+                 summary_max_tokens: int = 96,
+                 cache_size: int = 4096):
+        self.count_tokens = count_tokens
+        self.n_ctx = n_ctx
+        self.max_history_tokens = max_history_tokens
+        self.min_reply_tokens = min_reply_tokens
+        self.summarizer = summarizer
+        self.summary_max_tokens = summary_max_tokens
+        self.cache_size = cache_size
+
+        self._token_cache: "OrderedDict[str, int]" = OrderedDict()
+        self._summaries: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._reply_prefix_tokens = count_tokens(REPLY_PREFIX)
+
+        self.token_cache_hits = 0
+        self.token_cache_misses = 0
+        self.summaries_built = 0
+
+    def _cache_get(self, cache: OrderedDict, key: str):
+        with self._lock:
+            value = cache.get(key)
+            if value is not None:
+                cache.move_to_end(key)
+            return value
+
+    def _cache_put(self, cache: OrderedDict, key: str, value) -> None:
+        with self._lock:
+            cache[key] = value
+            cache.move_to_end(key)
+            while len(cache) > self.cache_size:
+                cache.popitem(last=False)
+
+    def tokens(self, text: str) -> int:
+        """Token count of a rendered message, cached by content"""
+        key = hashlib.sha1(text.encode('utf-8')).hexdigest()
+        count = self._cache_get(self._token_cache, key)
+        if count is not None:
+            self.token_cache_hits += 1
+            return count
+
+        self.token_cache_misses += 1
+        count = self.count_tokens(text)
+        self._cache_put(self._token_cache, key, count)
+        return count
+
+    def plan(self, messages: List[Dict[str, str]], max_tokens: int = 100,
+             latency_target_ms: Optional[float] = None,
+             prompt_tokens_per_second: Optional[float] = None,
+             decode_tokens_per_second: Optional[float] = None) -> ChatPlan:
+        """Choose the turns to send and the reply length to request"""
+        system = [m for m in messages if m.get('role') == 'system']
+        turns = [m for m in messages if m.get('role') != 'system']
+
+        fixed = [render_message(m) for m in system]
+        fixed_tokens = sum(self.tokens(text) for text in fixed) + self._reply_prefix_tokens
+
+        reply_reserve = max(self.min_reply_tokens, max_tokens)
+        budget = self.n_ctx - fixed_tokens - reply_reserve
+        if self.max_history_tokens is not None:
+            budget = min(budget, self.max_history_tokens)
+
+        rendered = [render_message(m) for m in turns]
+        counts = [self.tokens(text) for text in rendered]
+
+        kept, used = self._fit(counts, budget)
+        first_kept = len(turns) - kept
+
+        summary_text = None
+        if first_kept and self.summarizer is not None:
+            # Overflowing: reserve room for the summary, then summarize
+            # everything that no longer fits
+            reserve = min(self.summary_max_tokens, budget // 2)
+            kept, used = self._fit(counts, budget - reserve)
+            first_kept = len(turns) - kept
+            summary_text = self._summary_for(turns, first_kept)
+            summary_tokens = self.tokens(summary_text)
+            if used + summary_tokens <= budget:
+                used += summary_tokens
+            else:
+                logger.warning(f"Summary of {first_kept} turns is {summary_tokens} "
+                               f"tokens; omitting it")
+                summary_text = None
+
+        parts = list(fixed)
+        if summary_text:
+            parts.append(f"Earlier in this conversation: {summary_text}\n\n")
+        parts.extend(rendered[first_kept:])
+        parts.append(REPLY_PREFIX)
+        prompt = "".join(parts)
+        prompt_tokens = fixed_tokens + used
+
+        plan = ChatPlan(prompt=prompt, max_tokens=max_tokens, prompt_tokens=prompt_tokens,
+                        kept_turns=kept, dropped_turns=first_kept,
+                        summarized=summary_text is not None)
+        self._fit_reply(plan, latency_target_ms, prompt_tokens_per_second,
+                        decode_tokens_per_second)
+        return plan
+
+    @staticmethod
+    def _fit(counts: List[int], budget: int) -> Tuple[int, int]:
+        """Keep the newest turns that fit; returns (turns kept, tokens used)"""
+        kept = 0
+        used = 0
+        for count in reversed(counts):
+            if used + count > budget:
+                break
+            used += count
+            kept += 1
+        return kept, used
+
+    def _fit_reply(self, plan: ChatPlan, latency_target_ms: Optional[float],
+                   prompt_tps: Optional[float], decode_tps: Optional[float]) -> None:
+        room = self.n_ctx - plan.prompt_tokens
+        if room < plan.max_tokens:
+            plan.max_tokens = room
+            plan.limits.append('context')
+
+        if latency_target_ms is not None and decode_tps:
+            seconds = latency_target_ms / 1000.0
+            if prompt_tps:
+                seconds -= plan.prompt_tokens / prompt_tps
+            affordable = int(seconds * decode_tps)
+            if affordable < plan.max_tokens:
+                plan.max_tokens = affordable
+                plan.limits.append('latency')
+
+        plan.max_tokens = max(self.min_reply_tokens, plan.max_tokens)
+
+    def _summary_for(self, turns: List[Dict[str, str]], count: int) -> str:
+        """Rolling summary of turns[:count], extending the longest cached prefix"""
+        chain = []
+        digest = hashlib.sha1()
+        for message in turns[:count]:
+            digest.update(render_message(message).encode('utf-8'))
+            chain.append(digest.copy().hexdigest())
+
+        start, previous = 0, None
+        for index in range(count - 1, -1, -1):
+            cached = self._cache_get(self._summaries, chain[index])
+            if cached is not None:
+                start, previous = index + 1, cached
+                break
+
+        if start == count:
+            return previous
+
+        summary = self.summarizer(previous, turns[start:count])
+        self.summaries_built += 1
+        self._cache_put(self._summaries, chain[count - 1], summary)
+        return summary
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'n_ctx': self.n_ctx,
+            'max_history_tokens': self.max_history_tokens,
+            'token_cache_entries': len(self._token_cache),
+            'token_cache_hits': self.token_cache_hits,
+            'token_cache_misses': self.token_cache_misses,
+            'summaries_built': self.summaries_built
+        }
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+
+    def summarize(previous, turns):
+        said = "; ".join(m['content'][:30] for m in turns)
+        return f"{previous + '; ' if previous else ''}{said}"[-200:]
+
+    manager = ChatContextManager(n_ctx=256, summarizer=summarize)
+    history = [{'role': 'system', 'content': 'You are Martha Quinn, a grumpy baker.'}]
+    for turn in range(30):
+        history.append({'role': 'user', 'content': f'Question number {turn} about the bread?'})
+        history.append({'role': 'assistant', 'content': f'Answer {turn}: it is sourdough.'})
+        plan = manager.plan(history, max_tokens=64, latency_target_ms=800,
+                            prompt_tokens_per_second=400, decode_tokens_per_second=40)
+
+    print(plan.prompt)
+    print({k: v for k, v in plan.__dict__.items() if k != 'prompt'})
+    print(manager.get_stats())
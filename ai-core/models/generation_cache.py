@@ -0,0 +1,139 @@
+"""
+Generation Cache
+LRU memoization of LLM completions keyed on prompt and sampling params
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional, Dict, Any
+
+logger = logging.getLogger(__name__)
+
+
+class GenerationCache:
+    """
+    Bounded LRU cache of generated text
+    Limited by entry count and total stored characters, optionally persisted
+    to a JSON file so replays and QA runs survive restarts
+    """
+
+    def __init__(self, max_entries: int = 1024,
+                 max_bytes: int = 4 * 1024 * 1024,
+                 persist_path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.persist_path = Path(persist_path) if persist_path else None
+
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        self._size_bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        if self.persist_path and self.persist_path.exists():
+            self.load()
+
+    @staticmethod
+    def make_key(prompt: str, max_tokens: int, temperature: float,
+                 stop: Optional[list], model_id: Optional[str] = None,
+                 adapter: Optional[str] = None) -> str:
+        """Hash the full effective prompt, sampling parameters and adapter"""
+        payload = json.dumps(
+            [model_id, adapter, prompt, max_tokens, round(float(temperature), 6),
+             list(stop or [])],
+            ensure_ascii=False
+        )
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def _entry_bytes(key: str, value: str) -> int:
+        return len(key) + len(value.encode('utf-8'))
+
+    def get(self, key: str) -> Optional[str]:
+        """Return cached text and mark it most recently used"""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: str, value: str) -> None:
+        """Insert a completion, evicting least recently used entries"""
+        size = self._entry_bytes(key, value)
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._size_bytes -= self._entry_bytes(key, self._entries.pop(key))
+
+            self._entries[key] = value
+            self._size_bytes += size
+
+            while (len(self._entries) > self.max_entries
+                   or self._size_bytes > self.max_bytes):
+                old_key, old_value = self._entries.popitem(last=False)
+                self._size_bytes -= self._entry_bytes(old_key, old_value)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """Drop all entries (statistics are kept)"""
+        with self._lock:
+            self._entries.clear()
+            self._size_bytes = 0
+
+    def save(self) -> None:
+        """Write entries to disk in LRU order"""
+        if not self.persist_path:
+            return
+
+        with self._lock:
+            items = list(self._entries.items())
+
+        self.persist_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.persist_path.with_suffix(self.persist_path.suffix + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': 1, 'entries': items}, f)
+        os.replace(tmp_path, self.persist_path)
+        logger.info(f"Saved {len(items)} cached generations to {self.persist_path}")
+
+    def load(self) -> None:
+        """Restore entries previously written by save()"""
+        try:
+            with open(self.persist_path, encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not read generation cache {self.persist_path}: {e}")
+            return
+
+        for key, value in data.get('entries', []):
+            self.put(key, value)
+        logger.info(f"Loaded {len(self._entries)} cached generations")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and current occupancy"""
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'size_bytes': self._size_bytes,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'persist_path': str(self.persist_path) if self.persist_path else None
+        }
+
+    def __len__(self) -> int:
+        return len(self._entries)
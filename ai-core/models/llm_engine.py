@@ -4,9 +4,16 @@ Handles model loading and text generation using llama.cpp
 """
 
 import logging
-from typing import Optional, Dict, Any
+import time
+from typing import Optional, Dict, Any, List, Tuple
 from pathlib import Path
 
+from models.context_manager import (ChatContextManager, ChatPlan, REPLY_PREFIX,
+                                    approx_token_count, render_message)
+from models.generation_cache import GenerationCache
+from models.simulator import LatencySimulator
+from monitoring.metrics import inc, observe, span
+
 logger = logging.getLogger(__name__)
 
 
@@ -14,12 +21,64 @@ class LLMEngine:
     """
     Wrapper for LLM inference using llama-cpp-python
     Falls back to mock responses if model is not available
+    
+    An optional GenerationCache memoizes completions. Only deterministic
+    (temperature 0) calls are cached unless cache_nondeterministic is set
+    or the caller passes use_cache=True.
+    
+    Generation can target a LoRA adapter (a name or a LoRASwitcher adapter
+    dict). The mock backend serves a mixed-adapter batch in one simulated
+    pass, each sequence under its own adapter. llama-cpp-python only binds
+    a LoRA when the model is loaded, so there generate_batch runs its
+    sequences one after another, grouped by adapter, and the persona is
+    carried by the adapter's prompt prefix. The mock picks its stock line
+    from the adapter's character before looking at the prompt.
+    
+    chat() keeps conversations inside n_ctx through a ChatContextManager;
+    set summarize_history to fold turns that scroll out of the window into
+    a rolling summary generated by this engine.
+    
+    A LatencySimulator gives the mock backend the prompt evaluation and
+    decode timing of real hardware, so load tests see generation cost
+    without a model; mock_token_latency_ms is shorthand for a fixed cost
+    per generated token.
     """
     
-    def __init__(self, model_path: str = None, use_gpu: bool = True):
+    DEFAULT_STOP = ["\n\n", "###"]
+    THROUGHPUT_ALPHA = 0.2
+    
+    def __init__(self, model_path: str = None, use_gpu: bool = True,
+                 n_threads: Optional[int] = None,
+                 cache: Optional[GenerationCache] = None,
+                 cache_nondeterministic: bool = False,
+                 n_ctx: int = 2048,
+                 max_history_tokens: Optional[int] = None,
+                 summarize_history: bool = False,
+                 mock_token_latency_ms: float = 0.0,
+                 simulator: Optional[LatencySimulator] = None):
         self.model_path = model_path
         self.model = None
         self.use_mock = True
+        self.cache = cache
+        self.cache_nondeterministic = cache_nondeterministic
+        self.n_ctx = n_ctx
+        if simulator is None and mock_token_latency_ms > 0:
+            simulator = LatencySimulator.token_latency(mock_token_latency_ms)
+        self.simulator = simulator
+        
+        # Measured throughput (EWMA, tokens/s), used to size replies to a
+        # latency target
+        self.prompt_tokens_per_second: Optional[float] = None
+        self.decode_tokens_per_second: Optional[float] = None
+        
+        self.active_adapter: Optional[str] = None
+        self.batch_stats = {
+            'batches': 0,
+            'sequences': 0,
+            'adapter_groups': 0,
+            'adapter_switches': 0,
+            'passes': 0
+        }
         
         if model_path and Path(model_path).exists():
             try:
@@ -28,8 +87,9 @@ class LLMEngine:
                 logger.info(f"Loading model from {model_path}")
                 self.model = Llama(
                     model_path=model_path,
-                    n_ctx=2048,
+                    n_ctx=n_ctx,
                     n_gpu_layers=-1 if use_gpu else 0,
+                    n_threads=n_threads,
                     verbose=False
                 )
                 self.use_mock = False
@@ -41,67 +101,325 @@ class LLMEngine:
                 logger.warning("Falling back to mock responses")
         else:
             logger.info("No model specified, using mock responses")
+        
+        self.context = ChatContextManager(
+            count_tokens=self.count_tokens,
+            n_ctx=n_ctx,
+            max_history_tokens=max_history_tokens,
+            summarizer=self._summarize_turns if summarize_history else None
+        )
+    
+    def count_tokens(self, text: str) -> int:
+        """Exact count with the model's tokenizer, estimated for the mock"""
+        if self.model is None:
+            return approx_token_count(text)
+        return len(self.model.tokenize(text.encode('utf-8'), add_bos=False))
     
     def generate(self, 
                  prompt: str, 
                  max_tokens: int = 100,
                  temperature: float = 0.7,
-                 stop: list = None) -> str:
-        """Generate text completion"""
+                 stop: list = None,
+                 use_cache: Optional[bool] = None,
+                 adapter: Any = None) -> str:
+        """
+        Generate text completion
+        use_cache overrides the temperature-based cache policy for this call
+        """
+        stop = stop or self.DEFAULT_STOP
+        adapter_id = self._adapter_id(adapter)
+        
+        cache_key, cached = self._cache_lookup(prompt, max_tokens, temperature, stop,
+                                               use_cache, adapter_id)
+        if cached is not None:
+            return cached
         
+        self._activate_adapter(adapter_id)
         if self.use_mock:
-            return self._mock_generate(prompt, max_tokens)
+            inc("spector_mock_fallbacks_total", component="llm", reason="no_model")
+            with span("llm_generate", backend="mock" if self.simulator is None else "simulated"):
+                text = self._mock_generate(prompt, max_tokens, adapter)
+                if self.simulator is not None:
+                    self._simulate_generation(prompt, text, max_tokens)
+        else:
+            try:
+                with span("llm_generate", backend="llama_cpp"):
+                    text = self._run_model(prompt, max_tokens, temperature, stop)
+            except Exception as e:
+                logger.error(f"Generation failed: {e}")
+                inc("spector_mock_fallbacks_total", component="llm", reason="error")
+                return self._mock_generate(prompt, max_tokens, adapter)
         
+        if cache_key is not None:
+            self.cache.put(cache_key, text)
+        
+        return text
+    
+    def _cache_lookup(self, prompt: str, max_tokens: int, temperature: float,
+                      stop: list, use_cache: Optional[bool],
+                      adapter_id: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
+        """(cache key or None if the call is not cached, cached text or None)"""
+        if not self._should_cache(temperature, use_cache):
+            return None, None
+        cache_key = self.cache.make_key(prompt, max_tokens, temperature,
+                                        stop, self.model_path, adapter_id)
+        cached = self.cache.get(cache_key)
+        inc("spector_cache_requests_total", cache="generation",
+            result="miss" if cached is None else "hit")
+        return cache_key, cached
+    
+    def _run_model(self, prompt: str, max_tokens: int, temperature: float,
+                   stop: list) -> str:
+        """
+        Call llama.cpp; prompt evaluation and decode are timed apart from
+        llama.cpp's own eval counters, so the call is neither streamed nor
+        the prompt tokenized a second time
+        """
+        before = self._llama_timings()
+        start = time.perf_counter()
+        response = self.model(
+            prompt,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            stop=stop,
+            echo=False
+        )
+        self._record_run(before, response.get('usage') or {},
+                         time.perf_counter() - start)
+        return response['choices'][0]['text'].strip()
+    
+    def _llama_timings(self) -> Optional[Tuple[int, float, int, float]]:
+        """
+        llama.cpp's cumulative (prompt tokens, prompt ms, decoded tokens,
+        decode ms), or None if this build does not expose them
+        """
         try:
-            response = self.model(
-                prompt,
-                max_tokens=max_tokens,
-                temperature=temperature,
-                stop=stop or ["\n\n", "###"],
-                echo=False
-            )
-            
-            return response['choices'][0]['text'].strip()
-        except Exception as e:
-            logger.error(f"Generation failed: {e}")
-            return self._mock_generate(prompt, max_tokens)
-    
-    def _mock_generate(self, prompt: str, max_tokens: int) -> str:
-        """Generate mock response for testing"""
-        # Extract character traits from prompt
-        if "grumpy" in prompt.lower() or "baker" in prompt.lower():
-            return "I don't have time for this nonsense!"
-        elif "cop" in prompt.lower() or "opportunistic" in prompt.lower():
-            return "Looks like we've got a situation here. What's it worth to you?"
-        elif "anxious" in prompt.lower() or "student" in prompt.lower():
-            return "Oh no, I really can't deal with this right now!"
-        elif "landlord" in prompt.lower() or "vigilante" in prompt.lower():
-            return "Someone's going to pay for this damage to my property."
+            import llama_cpp
+            timings = llama_cpp.llama_get_timings(self.model.ctx)
+        except (ImportError, AttributeError, TypeError):
+            return None
+        return timings.n_p_eval, timings.t_p_eval_ms, timings.n_eval, timings.t_eval_ms
+    
+    def _record_run(self, before: Optional[tuple], usage: Dict[str, Any],
+                    elapsed: float) -> None:
+        after = self._llama_timings() if before is not None else None
+        if after is not None:
+            prompt_tokens, prompt_ms, decode_tokens, decode_ms = (
+                a - b for a, b in zip(after, before))
+            self._record_timing(prompt_tokens, prompt_ms / 1000.0,
+                                decode_tokens, decode_ms / 1000.0)
         else:
-            return "I need to respond to this situation carefully."
-    
-    def chat(self, messages: list, max_tokens: int = 100) -> str:
-        """Chat completion with message history"""
-        # Convert messages to prompt format
-        prompt = self._format_chat_prompt(messages)
-        return self.generate(prompt, max_tokens)
-    
-    def _format_chat_prompt(self, messages: list) -> str:
-        """Format chat messages into prompt"""
-        prompt = ""
-        for msg in messages:
-            role = msg.get('role', 'user')
-            content = msg.get('content', '')
-            
-            if role == 'system':
-                prompt += f"{content}\n\n"
-            elif role == 'user':
-                prompt += f"Human: {content}\n"
-            elif role == 'assistant':
-                prompt += f"Assistant: {content}\n"
+            # No split available: charge the whole call to decoding, which
+            # understates decode speed rather than overstating it
+            self._record_timing(0, 0.0, usage.get('completion_tokens', 0), elapsed)
+    
+    def _simulate_generation(self, prompt: str, text: str, max_tokens: int) -> None:
+        """Spend the simulator's time for this prompt and reply"""
+        prompt_tokens = self.count_tokens(prompt)
+        output_tokens = self.simulator.reply_tokens(max_tokens, self.count_tokens(text))
+        prompt_s, decode_s = self.simulator.generate(prompt_tokens, output_tokens)
+        self._record_timing(prompt_tokens, prompt_s, output_tokens - 1, decode_s)
+    
+    def _record_timing(self, prompt_tokens: int, prompt_s: float,
+                       decode_tokens: int, decode_s: float) -> None:
+        """
+        Throughput estimates and stage metrics from one generation
+        The estimates size replies to latency targets, so they are kept
+        up to date even when metrics are disabled (observe() is then a no-op)
+        """
+        if prompt_tokens > 0:
+            observe("spector_stage_seconds", prompt_s, stage="llm_prompt_eval")
+        observe("spector_stage_seconds", decode_s, stage="llm_decode")
+        if prompt_tokens > 0 and prompt_s > 0:
+            self.prompt_tokens_per_second = self._ewma(
+                self.prompt_tokens_per_second, prompt_tokens / prompt_s)
+        if decode_tokens > 0 and decode_s > 0:
+            decode_rate = decode_tokens / decode_s
+            observe("spector_llm_decode_tokens_per_second", decode_rate)
+            self.decode_tokens_per_second = self._ewma(
+                self.decode_tokens_per_second, decode_rate)
+    
+    def _ewma(self, current: Optional[float], sample: float) -> float:
+        if current is None:
+            return sample
+        return current + self.THROUGHPUT_ALPHA * (sample - current)
+    
+    def generate_batch(self, requests: List[Tuple[Any, str, Dict[str, Any]]]) -> List[str]:
+        """
+        Serve a mixed-adapter batch in one scheduling pass
+        requests: [(adapter, prompt, params), ...] where params may hold
+        max_tokens, temperature, stop and use_cache. Results keep input order.
+        
+        With per-sequence LoRA the batch is a single forward pass in which
+        each sequence runs under its own adapter. llama-cpp-python binds
+        one LoRA per context, so there the sequences run one after another,
+        grouped by adapter (first-appearance order) so each adapter is
+        bound once per batch.
+        """
+        groups: Dict[Optional[str], List[int]] = {}
+        for index, (adapter, _, _) in enumerate(requests):
+            groups.setdefault(self._adapter_id(adapter), []).append(index)
+        
+        if self.supports_per_sequence_lora():
+            results = self._generate_mixed(requests)
+            self.batch_stats['passes'] += 1
+        else:
+            results: List[Optional[str]] = [None] * len(requests)
+            for indices in groups.values():
+                for index in indices:
+                    adapter, prompt, params = requests[index]
+                    results[index] = self.generate(prompt, adapter=adapter, **params)
+            self.batch_stats['passes'] += len(requests)
         
-        prompt += "Assistant:"
-        return prompt
+        self.batch_stats['batches'] += 1
+        self.batch_stats['sequences'] += len(requests)
+        self.batch_stats['adapter_groups'] += len(groups)
+        return results
+    
+    def _generate_mixed(self, requests: List[Tuple[Any, str, Dict[str, Any]]]) -> List[str]:
+        """
+        One mock pass over a mixed-adapter batch: each sequence gets its
+        own adapter's line, and the simulator charges the batch once
+        (every prompt evaluated, then as many decode steps as the longest
+        reply), as a batched forward pass would cost
+        """
+        results: List[str] = []
+        prompt_tokens = decode_steps = 0
+        inc("spector_mock_fallbacks_total", component="llm", reason="no_model")
+        with span("llm_generate", backend="mock" if self.simulator is None else "simulated",
+                  batch_size=len(requests)):
+            for adapter, prompt, params in requests:
+                max_tokens = params.get('max_tokens', 100)
+                cache_key, text = self._cache_lookup(
+                    prompt, max_tokens, params.get('temperature', 0.7),
+                    params.get('stop') or self.DEFAULT_STOP, params.get('use_cache'),
+                    self._adapter_id(adapter))
+                if text is None:
+                    text = self._mock_generate(prompt, max_tokens, adapter)
+                    if self.simulator is not None:
+                        prompt_tokens += self.count_tokens(prompt)
+                        decode_steps = max(decode_steps, self.simulator.reply_tokens(
+                            max_tokens, self.count_tokens(text)))
+                    if cache_key is not None:
+                        self.cache.put(cache_key, text)
+                results.append(text)
+            
+            if self.simulator is not None and (prompt_tokens or decode_steps):
+                prompt_s, decode_s = self.simulator.generate(prompt_tokens, decode_steps)
+                self._record_timing(prompt_tokens, prompt_s, decode_steps - 1, decode_s)
+        return results
+    
+    def supports_per_sequence_lora(self) -> bool:
+        """
+        Whether one pass can apply a different LoRA to each sequence
+        The mock backend simulates it; llama-cpp-python cannot
+        """
+        return self.use_mock
+    
+    @staticmethod
+    def _adapter_id(adapter: Any) -> Optional[str]:
+        if adapter is None:
+            return None
+        if isinstance(adapter, dict):
+            return adapter.get('name')
+        return str(adapter)
+    
+    def _activate_adapter(self, adapter_id: Optional[str]) -> None:
+        """
+        Bind an adapter for the following generations
+        llama-cpp-python cannot unapply a merged LoRA, so no weights change:
+        the persona is carried by the adapter's prompt prefix, and this only
+        records the switch so batching can be measured against it
+        """
+        if adapter_id != self.active_adapter:
+            self.active_adapter = adapter_id
+            self.batch_stats['adapter_switches'] += 1
+    
+    @staticmethod
+    def _mock_character(adapter: Any) -> str:
+        """The character an adapter was trained for (its name without suffix)"""
+        if adapter is None:
+            return ""
+        if isinstance(adapter, dict):
+            metadata = adapter.get('metadata') or {}
+            character = metadata.get('character_type') or adapter.get('name', '')
+        else:
+            character = str(adapter)
+        return character.rsplit('.', 1)[0]
+    
+    def canned_response(self, prompt: str, adapter: Any = None) -> str:
+        """In-character stock line, used when there is no time to generate"""
+        return self._mock_generate(prompt, 0, adapter)
+    
+    def _should_cache(self, temperature: float, use_cache: Optional[bool]) -> bool:
+        """Decide whether this call may be served from / stored in the cache"""
+        if self.cache is None or use_cache is False:
+            return False
+        if use_cache or self.cache_nondeterministic:
+            return True
+        return temperature == 0
+    
+    MOCK_LINES = [
+        (("grumpy", "baker"), "I don't have time for this nonsense!"),
+        (("cop", "opportunistic"), "Looks like we've got a situation here. What's it worth to you?"),
+        (("anxious", "student"), "Oh no, I really can't deal with this right now!"),
+        (("landlord", "vigilante"), "Someone's going to pay for this damage to my property."),
+    ]
+    
+    def _mock_generate(self, prompt: str, max_tokens: int, adapter: Any = None) -> str:
+        """
+        Generate mock response for testing
+        The adapter's character decides the line; character traits in the
+        prompt are only a fallback, since prompts mention other characters
+        and places (e.g. "bakery")
+        """
+        for text in (self._mock_character(adapter), prompt):
+            text = text.lower()
+            for keywords, line in self.MOCK_LINES:
+                if any(keyword in text for keyword in keywords):
+                    return line
+        return "I need to respond to this situation carefully."
+    
+    def chat(self, messages: list, max_tokens: int = 100,
+             latency_target_ms: Optional[float] = None) -> str:
+        """
+        Chat completion with message history
+        History is windowed to fit the context, and max_tokens is reduced
+        if the context or latency_target_ms cannot accommodate it
+        """
+        plan = self.prepare_chat(messages, max_tokens, latency_target_ms)
+        return self.generate(plan.prompt, plan.max_tokens)
+    
+    def prepare_chat(self, messages: list, max_tokens: int = 100,
+                     latency_target_ms: Optional[float] = None) -> ChatPlan:
+        """Fit messages into the context window and size the reply"""
+        with span("prompt_build", kind="chat"):
+            plan = self.context.plan(
+                messages,
+                max_tokens=max_tokens,
+                latency_target_ms=latency_target_ms,
+                prompt_tokens_per_second=self.prompt_tokens_per_second,
+                decode_tokens_per_second=self.decode_tokens_per_second
+            )
+        if plan.dropped_turns:
+            inc("spector_chat_turns_dropped_total", plan.dropped_turns)
+        return plan
+    
+    def _summarize_turns(self, previous: Optional[str], turns: list) -> str:
+        """Rolling summary used by the context manager"""
+        parts = ["Summarize this conversation in two short sentences, "
+                 "keeping names, promises and facts.\n\n"]
+        if previous:
+            parts.append(f"Summary so far: {previous}\n\n")
+        parts.extend(render_message(m) for m in turns)
+        parts.append("\nSummary:")
+        return self.generate("".join(parts), max_tokens=self.context.summary_max_tokens,
+                             temperature=0)
+    
+    @staticmethod
+    def _format_chat_prompt(messages: list) -> str:
+        """Format chat messages into prompt (no windowing)"""
+        return "".join(render_message(m) for m in messages) + REPLY_PREFIX
     
     def is_loaded(self) -> bool:
         """Check if real model is loaded"""
@@ -112,7 +430,14 @@ class LLMEngine:
         return {
             'model_path': self.model_path,
             'loaded': self.is_loaded(),
-            'using_mock': self.use_mock
+            'using_mock': self.use_mock,
+            'simulator': self.simulator.get_stats() if self.simulator else None,
+            'per_sequence_lora': self.supports_per_sequence_lora(),
+            'batch_stats': dict(self.batch_stats),
+            'context': self.context.get_stats(),
+            'prompt_tokens_per_second': self.prompt_tokens_per_second,
+            'decode_tokens_per_second': self.decode_tokens_per_second,
+            'generation_cache': self.cache.get_stats() if self.cache else None
         }
 
 
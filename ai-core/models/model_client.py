@@ -0,0 +1,126 @@
+"""
+Model Client - Thin LLMEngine Stand-In
+Forwards generation calls to a shared model server over its Unix socket
+"""
+
+import logging
+import socket
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from models.llm_engine import LLMEngine
+from models.model_server import ProtocolError, send_message, recv_message
+
+logger = logging.getLogger(__name__)
+
+
+class ModelServerError(RuntimeError):
+    """The model server returned an error for a request"""
+
+
+class ModelClient:
+    """
+    Implements the LLMEngine interface against a model server process
+
+    One connection per client instance, guarded by a lock; give each
+    BatchScheduler worker its own client so requests travel in parallel.
+    A request whose connection fails (e.g. it went stale when the server
+    restarted, or the server dropped it mid-reply) is sent once more on a
+    new connection; generations have no side effects, so at worst the
+    server runs one twice. A reply that times out fails the call, since
+    the server is still busy with the request.
+    """
+
+    def __init__(self, socket_path: str, timeout: Optional[float] = 120.0):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._sock: Optional[socket.socket] = None
+        self._lock = threading.Lock()
+        self._per_sequence_lora: Optional[bool] = None
+
+    def _connect(self) -> socket.socket:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(self.socket_path)
+        return sock
+
+    def _call(self, op: str, **args) -> Any:
+        with self._lock:
+            for attempt in range(2):
+                try:
+                    if self._sock is None:
+                        self._sock = self._connect()
+                    send_message(self._sock, {"op": op, "args": args})
+                    reply = recv_message(self._sock)
+                    if reply is None:
+                        raise ConnectionError("Model server closed the connection before replying")
+                except socket.timeout:
+                    # The server is still working on it; a resend would queue a duplicate
+                    self._disconnect()
+                    raise
+                except (OSError, ProtocolError) as e:
+                    self._disconnect()
+                    if attempt:
+                        raise
+                    logger.warning(f"Model server connection lost ({e}), reconnecting")
+                    continue
+                break
+
+        if not reply.get("ok"):
+            raise ModelServerError(f"{reply.get('type')}: {reply.get('error')}")
+        return reply["result"]
+
+    def generate(self, prompt: str, max_tokens: int = 100,
+                 temperature: float = 0.7, stop: list = None,
+                 use_cache: Optional[bool] = None, adapter: Any = None) -> str:
+        """Generate text completion on the server"""
+        return self._call("generate", prompt=prompt, max_tokens=max_tokens,
+                          temperature=temperature, stop=stop, use_cache=use_cache,
+                          adapter=LLMEngine._adapter_id(adapter))
+
+    def generate_batch(self, requests: List[Tuple[Any, str, Dict[str, Any]]]) -> List[str]:
+        """Send a mixed-adapter batch in one round trip"""
+        return self._call("generate_batch", requests=[
+            [LLMEngine._adapter_id(adapter), prompt, params]
+            for adapter, prompt, params in requests
+        ])
+
+    def chat(self, messages: list, max_tokens: int = 100,
+             latency_target_ms: Optional[float] = None) -> str:
+        return self._call("chat", messages=messages, max_tokens=max_tokens,
+                          latency_target_ms=latency_target_ms)
+
+    def supports_per_sequence_lora(self) -> bool:
+        """Whether the server's engine batches mixed adapters in one pass"""
+        if self._per_sequence_lora is None:
+            try:
+                self._per_sequence_lora = bool(self.get_info().get('per_sequence_lora'))
+            except (OSError, ModelServerError):
+                return False
+        return self._per_sequence_lora
+
+    def ping(self) -> bool:
+        try:
+            return self._call("ping") == "pong"
+        except (OSError, ModelServerError):
+            return False
+
+    def is_loaded(self) -> bool:
+        return self.get_info().get('loaded', False)
+
+    def get_info(self) -> Dict[str, Any]:
+        info = self._call("info")
+        info['model_server'] = self.socket_path
+        return info
+
+    def _disconnect(self) -> None:
+        """Drop the socket. Caller must hold self._lock"""
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            finally:
+                self._sock = None
+
+    def close(self) -> None:
+        with self._lock:
+            self._disconnect()
@@ -0,0 +1,245 @@
+"""
+Model Server - Shared Local Inference Process
+Owns the LLM and the LoRA adapter cache and serves API workers over a
+Unix socket, so several uvicorn workers share one copy of the model
+
+Wire format: every message is a 4-byte big-endian length followed by a
+UTF-8 JSON object.
+    request:  {"op": "generate" | "generate_batch" | "chat" | "info" | "ping",
+               "args": {...}}
+    response: {"ok": true, "result": ...}
+              {"ok": false, "error": "...", "type": "ExceptionName"}
+"""
+
+import argparse
+import json
+import logging
+import os
+import socket
+import socketserver
+import struct
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+_LENGTH = struct.Struct(">I")
+MAX_MESSAGE_BYTES = 64 * 1024 * 1024
+
+
+class ProtocolError(Exception):
+    """Malformed or oversized message on the model socket"""
+
+
+def _recv_exact(sock: socket.socket, size: int) -> Optional[bytes]:
+    chunks = []
+    while size:
+        chunk = sock.recv(size)
+        if not chunk:
+            return None
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def send_message(sock: socket.socket, message: Dict[str, Any]) -> None:
+    """Write one length-prefixed JSON message"""
+    payload = json.dumps(message).encode("utf-8")
+    if len(payload) > MAX_MESSAGE_BYTES:
+        raise ProtocolError(f"Message too large: {len(payload)} bytes")
+    sock.sendall(_LENGTH.pack(len(payload)) + payload)
+
+
+def recv_message(sock: socket.socket) -> Optional[Dict[str, Any]]:
+    """Read one length-prefixed JSON message; None when the peer closed"""
+    header = _recv_exact(sock, _LENGTH.size)
+    if header is None:
+        return None
+
+    (length,) = _LENGTH.unpack(header)
+    if length > MAX_MESSAGE_BYTES:
+        raise ProtocolError(f"Message too large: {length} bytes")
+
+    payload = _recv_exact(sock, length)
+    if payload is None:
+        raise ProtocolError("Connection closed mid-message")
+    return json.loads(payload.decode("utf-8"))
+
+
+class ModelServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """
+    Threaded Unix-socket server in front of a BatchScheduler
+
+    Each client connection gets a thread; generations from all connections
+    go through one scheduler, so concurrent API workers are batched
+    together and adapters are pinned in the server's LoRASwitcher. The
+    socket is created with mode 0600, so API workers must run as the
+    server's user.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, scheduler, engine_info=None):
+        self.socket_path = socket_path
+        self.scheduler = scheduler
+        self.engine_info = engine_info or (lambda: {})
+
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        # Only the server's user may connect: bind with the socket already 0600
+        umask = os.umask(0o177)
+        try:
+            super().__init__(socket_path, _ConnectionHandler)
+        finally:
+            os.umask(umask)
+        logger.info(f"Model server listening on {socket_path}")
+
+    def server_close(self) -> None:
+        super().server_close()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+    def dispatch(self, op: str, args: Dict[str, Any]) -> Any:
+        if op == "ping":
+            return "pong"
+
+        if op == "info":
+            return {**self.engine_info(), 'scheduler': self.scheduler.get_stats()}
+
+        if op == "generate":
+            return self.scheduler.submit(
+                args["prompt"],
+                max_tokens=args.get("max_tokens", 100),
+                temperature=args.get("temperature", 0.7),
+                stop=args.get("stop"),
+                adapter=args.get("adapter"),
+                use_cache=args.get("use_cache")
+            ).result()
+
+        if op == "generate_batch":
+            futures = [
+                self.scheduler.submit(
+                    prompt,
+                    max_tokens=params.get("max_tokens", 100),
+                    temperature=params.get("temperature", 0.7),
+                    stop=params.get("stop"),
+                    adapter=adapter,
+                    use_cache=params.get("use_cache")
+                )
+                for adapter, prompt, params in args["requests"]
+            ]
+            return [future.result() for future in futures]
+
+        if op == "chat":
+            # Window the history with the engines' tokenizer and throughput
+            plan = self.scheduler.engines[0].prepare_chat(
+                args["messages"],
+                max_tokens=args.get("max_tokens", 100),
+                latency_target_ms=args.get("latency_target_ms")
+            )
+            return self.scheduler.submit(plan.prompt, max_tokens=plan.max_tokens).result()
+
+        raise ValueError(f"Unknown op: {op}")
+
+
+class _ConnectionHandler(socketserver.BaseRequestHandler):
+    """Serves request/response pairs until the client disconnects"""
+
+    def handle(self) -> None:
+        while True:
+            try:
+                message = recv_message(self.request)
+            except (ProtocolError, ValueError, OSError) as e:
+                logger.warning(f"Dropping model client: {e}")
+                return
+
+            if message is None:
+                return
+
+            try:
+                result = self.server.dispatch(message.get("op"), message.get("args") or {})
+                reply = {"ok": True, "result": result}
+            except Exception as e:
+                reply = {"ok": False, "error": str(e), "type": type(e).__name__}
+
+            try:
+                send_message(self.request, reply)
+            except OSError:
+                return
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Shared LLM inference server')
+    parser.add_argument('--socket', default='/tmp/spector-llm.sock')
+    parser.add_argument('--model', default=os.environ.get('SPECTOR_MODEL_PATH'))
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Engine instances (they share the mmapped weights)')
+    parser.add_argument('--lora-dir', default='models/loras')
+    parser.add_argument('--lora-cache-bytes', type=int, default=1024 * 1024 * 1024,
+                        help='Byte budget of the adapter cache (settings: lora_cache_bytes)')
+    parser.add_argument('--lora-cache-size', type=int,
+                        help='Most adapters cached at once (settings: lora_cache_size)')
+    parser.add_argument('--cpu', action='store_true', help='Disable GPU offload')
+    parser.add_argument('--generation-cache', default=os.environ.get('SPECTOR_GENERATION_CACHE'),
+                        help='JSON file that persists memoized generations')
+    parser.add_argument('--cache-all', action='store_true',
+                        default=os.environ.get('SPECTOR_CACHE_ALL_GENERATIONS') == '1',
+                        help='Also cache non-zero temperature generations')
+    parser.add_argument('--mock-token-ms', type=float, default=0.0,
+                        help='Per-token latency of the mock backend (no model)')
+    parser.add_argument('--latency-profile',
+                        help='Latency profile JSON for the mock backend (no model)')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    from models.batch_scheduler import BatchScheduler
+    from models.generation_cache import GenerationCache
+    from models.llm_engine import LLMEngine
+    from models.simulator import LatencySimulator
+    from orchestration.adapter_queue import AdapterGroupedQueue
+    from orchestration.lora_switcher import LoRASwitcher
+
+    simulator = LatencySimulator.load(args.latency_profile) if args.latency_profile else None
+    # Shared by all API workers, so a line cached for one is served to all
+    generation_cache = GenerationCache(persist_path=args.generation_cache)
+    engines = [
+        LLMEngine(
+            model_path=args.model,
+            use_gpu=not args.cpu,
+            n_threads=max(1, (os.cpu_count() or 1) // args.workers),
+            cache=generation_cache,
+            cache_nondeterministic=args.cache_all,
+            mock_token_latency_ms=args.mock_token_ms,
+            simulator=simulator
+        )
+        for _ in range(args.workers)
+    ]
+    adapter_queue = AdapterGroupedQueue(mixed_batches=engines[0].supports_per_sequence_lora())
+    scheduler = BatchScheduler(engines, request_queue=adapter_queue)
+    lora_switcher = LoRASwitcher(
+        base_model_path=args.model or "",
+        lora_directory=args.lora_dir,
+        max_cache_size=args.lora_cache_size,
+        max_cache_bytes=args.lora_cache_bytes,
+        llm_engine=engines[0],
+        scheduler=scheduler,
+        simulator=simulator if engines[0].use_mock else None
+    )
+    adapter_queue.is_hot = lora_switcher.is_adapter_loaded
+
+    def engine_info():
+        return {**engines[0].get_info(), 'adapters': lora_switcher.get_cache_status()}
+
+    server = ModelServer(args.socket, scheduler, engine_info)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        scheduler.shutdown(wait=False)
+        generation_cache.save()
+
+
+if __name__ == '__main__':
+    main()
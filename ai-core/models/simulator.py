@@ -0,0 +1,243 @@
+"""
+Latency Simulator
+Gives the mock LLM, STT and TTS backends the timing of real hardware from a profile
+"""
+
+import json
+import logging
+import math
+import random
+import threading
+import time
+from dataclasses import dataclass, field, fields
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Distribution:
+    """
+    A jittered latency quantity
+    kind is "fixed", "normal" or "lognormal" (mean and cv, the standard
+    deviation as a fraction of the mean) or "empirical" (draws from
+    samples recorded on real hardware). Draws never go below minimum.
+    """
+    mean: float = 0.0
+    cv: float = 0.0
+    kind: str = "lognormal"
+    samples: List[float] = field(default_factory=list)
+    minimum: float = 0.0
+
+    KINDS = ("fixed", "normal", "lognormal", "empirical")
+
+    def __post_init__(self):
+        if self.kind not in self.KINDS:
+            raise ValueError(f"Unknown distribution {self.kind!r}, expected one of {self.KINDS}")
+        if self.kind == "empirical" and not self.samples:
+            raise ValueError("An empirical distribution needs samples")
+
+    @classmethod
+    def fixed(cls, value: float) -> "Distribution":
+        return cls(mean=value, kind="fixed")
+
+    @classmethod
+    def from_value(cls, value: Any) -> "Distribution":
+        """A profile entry: a bare number (fixed) or a dict of fields"""
+        if isinstance(value, Distribution):
+            return value
+        if isinstance(value, (int, float)):
+            return cls.fixed(float(value))
+        return cls(**value)
+
+    def sample(self, rng: random.Random) -> float:
+        if self.kind == "empirical":
+            value = rng.choice(self.samples)
+        elif self.kind == "fixed" or self.cv <= 0 or self.mean <= 0:
+            value = self.mean
+        elif self.kind == "normal":
+            value = rng.gauss(self.mean, self.cv * self.mean)
+        else:
+            # Parameterized so the draws have the given mean and cv
+            sigma = math.sqrt(math.log(1.0 + self.cv ** 2))
+            value = rng.lognormvariate(math.log(self.mean) - sigma ** 2 / 2, sigma)
+        return max(self.minimum, value)
+
+    def to_dict(self) -> Dict[str, Any]:
+        if self.kind == "empirical":
+            return {'kind': self.kind, 'samples': self.samples, 'minimum': self.minimum}
+        return {'kind': self.kind, 'mean': self.mean, 'cv': self.cv, 'minimum': self.minimum}
+
+
+@dataclass
+class LatencyProfile:
+    """
+    Timing of one hardware setup; unset entries cost nothing
+
+    LLM: prompt evaluation per prompt token, decode speed, and optionally
+    how many tokens a reply runs to (capped at max_tokens; the mock text's
+    own length otherwise). parallel_generations limits how many simulated
+    generations run at once across every engine sharing the simulator, as
+    a single GPU would. Adapter loads cost a fixed part plus a part per MB.
+    STT and TTS cost a fixed overhead per call plus the real-time factor
+    times the audio duration; tts_chars_per_second sets how long the
+    synthesized audio is.
+    """
+    name: str = "custom"
+    prompt_ms_per_token: Optional[Distribution] = None
+    decode_tokens_per_second: Optional[Distribution] = None
+    reply_tokens: Optional[Distribution] = None
+    parallel_generations: Optional[int] = None
+    adapter_load_ms: Optional[Distribution] = None
+    adapter_load_ms_per_mb: Optional[Distribution] = None
+    stt_overhead_ms: Optional[Distribution] = None
+    stt_real_time_factor: Optional[Distribution] = None
+    tts_overhead_ms: Optional[Distribution] = None
+    tts_real_time_factor: Optional[Distribution] = None
+    tts_chars_per_second: float = 15.0
+
+    SCALARS = ("name", "parallel_generations", "tts_chars_per_second")
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "LatencyProfile":
+        known = {f.name for f in fields(cls)}
+        unknown = set(data) - known - {"captured"}
+        if unknown:
+            raise ValueError(f"Unknown latency profile entries: {sorted(unknown)}")
+        values = {}
+        for key in known & set(data):
+            value = data[key]
+            if key not in cls.SCALARS and value is not None:
+                value = Distribution.from_value(value)
+            values[key] = value
+        return cls(**values)
+
+    @classmethod
+    def load(cls, path: str) -> "LatencyProfile":
+        with open(path, 'r') as f:
+            return cls.from_dict(json.load(f))
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {}
+        for f in fields(self):
+            value = getattr(self, f.name)
+            if value is not None:
+                data[f.name] = value.to_dict() if isinstance(value, Distribution) else value
+        return data
+
+
+class LatencySimulator:
+    """
+    Draws and sleeps the latencies of a LatencyProfile
+
+    Shared by the mock backends of one process, so parallel_generations
+    applies across all LLM engine workers. Sleeps go through a time_scale
+    (0.5 runs twice as fast); get_stats reports the simulated seconds.
+    """
+
+    def __init__(self, profile: LatencyProfile, seed: Optional[int] = None,
+                 time_scale: float = 1.0):
+        self.profile = profile
+        self.time_scale = time_scale
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._generation_slots = (threading.BoundedSemaphore(profile.parallel_generations)
+                                  if profile.parallel_generations else None)
+        self.stats: Dict[str, Dict[str, float]] = {}
+
+    @classmethod
+    def load(cls, path: str, **kwargs) -> "LatencySimulator":
+        profile = LatencyProfile.load(path)
+        logger.info(f"Simulating latency profile '{profile.name}' from {path}")
+        return cls(profile, **kwargs)
+
+    @classmethod
+    def token_latency(cls, ms_per_token: float) -> "LatencySimulator":
+        """Fixed decode cost per generated token and nothing else"""
+        return cls(LatencyProfile(name=f"{ms_per_token:g}ms/token",
+                                  decode_tokens_per_second=Distribution.fixed(1000.0 / ms_per_token)))
+
+    def _draw(self, distribution: Optional[Distribution]) -> float:
+        if distribution is None:
+            return 0.0
+        with self._lock:
+            return distribution.sample(self._rng)
+
+    def _sleep(self, component: str, seconds: float) -> None:
+        with self._lock:
+            entry = self.stats.setdefault(component, {'calls': 0, 'seconds': 0.0})
+            entry['calls'] += 1
+            entry['seconds'] += seconds
+        if seconds > 0:
+            time.sleep(seconds * self.time_scale)
+
+    def reply_tokens(self, max_tokens: int, default: int) -> int:
+        """How many tokens the simulated model generates"""
+        if self.profile.reply_tokens is not None:
+            default = int(round(self._draw(self.profile.reply_tokens)))
+        return max(0, min(max_tokens, default))
+
+    def generate(self, prompt_tokens: int, output_tokens: int) -> tuple:
+        """
+        Sleep through prompt evaluation, then decoding; returns the
+        (prompt_seconds, decode_seconds) spent, excluding any wait for a
+        generation slot
+        """
+        prompt_s = prompt_tokens * self._draw(self.profile.prompt_ms_per_token) / 1000.0
+        rate = self._draw(self.profile.decode_tokens_per_second)
+        decode_s = output_tokens / rate if rate > 0 and output_tokens else 0.0
+
+        if self._generation_slots is None:
+            self._sleep("llm_prompt_eval", prompt_s)
+            self._sleep("llm_decode", decode_s)
+        else:
+            with self._generation_slots:
+                self._sleep("llm_prompt_eval", prompt_s)
+                self._sleep("llm_decode", decode_s)
+        return prompt_s, decode_s
+
+    def load_adapter(self, size_bytes: int) -> None:
+        seconds = (self._draw(self.profile.adapter_load_ms)
+                   + self._draw(self.profile.adapter_load_ms_per_mb) * size_bytes / 2 ** 20) / 1000.0
+        self._sleep("adapter_load", seconds)
+
+    def transcribe(self, audio_seconds: float) -> None:
+        """One Whisper pass (a batch counts once) over audio_seconds of audio"""
+        seconds = (self._draw(self.profile.stt_overhead_ms) / 1000.0
+                   + self._draw(self.profile.stt_real_time_factor) * audio_seconds)
+        self._sleep("stt", seconds)
+
+    def speech_seconds(self, text: str) -> float:
+        """Duration of the synthesized audio for text"""
+        return len(text) / self.profile.tts_chars_per_second if text else 0.0
+
+    def synthesize(self, audio_seconds: float) -> None:
+        seconds = (self._draw(self.profile.tts_overhead_ms) / 1000.0
+                   + self._draw(self.profile.tts_real_time_factor) * audio_seconds)
+        self._sleep("tts", seconds)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'profile': self.profile.name,
+                'time_scale': self.time_scale,
+                'simulated': {name: dict(entry) for name, entry in self.stats.items()}
+            }
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+
+    simulator = LatencySimulator(LatencyProfile(
+        name="demo",
+        prompt_ms_per_token=Distribution(mean=0.5, cv=0.1),
+        decode_tokens_per_second=Distribution(mean=40.0, cv=0.15),
+        tts_real_time_factor=Distribution(mean=0.2, cv=0.2)
+    ), seed=0)
+
+    start = time.perf_counter()
+    prompt_s, decode_s = simulator.generate(prompt_tokens=400, output_tokens=30)
+    print(f"Generation: prompt {prompt_s * 1000:.0f}ms, decode {decode_s * 1000:.0f}ms, "
+          f"wall {(time.perf_counter() - start) * 1000:.0f}ms")
+    simulator.synthesize(simulator.speech_seconds("Someone's going to pay for this damage."))
+    print(json.dumps(simulator.get_stats(), indent=2))
@@ -0,0 +1,80 @@
+import json
+import mmap
+import struct
+
+import numpy as np
+import pytest
+
+from models import adapter_format
+from models.adapter_format import (ALIGNMENT, MAGIC, MappedAdapter, is_mapped_adapter,
+                                   write_adapter)
+
+
+@pytest.fixture
+def opened_maps(monkeypatch):
+    """Every mmap MappedAdapter opens, to check none is left open"""
+    maps = []
+    real_mmap = mmap.mmap
+
+    def tracking_mmap(*args, **kwargs):
+        maps.append(real_mmap(*args, **kwargs))
+        return maps[-1]
+
+    monkeypatch.setattr(adapter_format.mmap, "mmap", tracking_mmap)
+    return maps
+
+
+def test_tensors_round_trip_as_aligned_zero_copy_views(tmp_path):
+    path = tmp_path / "baker.lora"
+    tensors = {'lora_a': np.arange(12, dtype=np.float32).reshape(3, 4),
+               'lora_b': np.arange(5, dtype=np.float16)}
+    write_adapter(str(path), tensors, metadata={'character_type': "grumpy_baker"})
+
+    assert is_mapped_adapter(str(path))
+    assert path.stat().st_size % ALIGNMENT == 0
+    # Views keep the mapping alive, so the adapter is dropped, not closed
+    adapter = MappedAdapter(str(path))
+    assert adapter.metadata == {'character_type': "grumpy_baker"}
+    assert adapter.nbytes == 12 * 4 + 5 * 2
+    for name, expected in tensors.items():
+        view = adapter.tensor(name)
+        assert adapter.tensor_table[name]['offset'] % ALIGNMENT == 0
+        assert view.dtype == expected.dtype
+        np.testing.assert_array_equal(view, expected)
+        assert not view.flags.owndata and not view.flags.writeable
+
+
+def test_placeholder_files_are_not_mapped_adapters(tmp_path):
+    path = tmp_path / "mock.lora"
+    path.write_text("mock adapter")
+    assert not is_mapped_adapter(str(path))
+
+
+def rewrite_preamble(path, magic=MAGIC, version=adapter_format.VERSION, header=None):
+    data = bytearray(path.read_bytes())
+    header_len = struct.unpack_from("<I", data, 12)[0]
+    if header is not None:
+        header = header.ljust(header_len)
+        data[16:16 + header_len] = header
+    struct.pack_into("<8sI", data, 0, magic, version)
+    path.write_bytes(bytes(data))
+
+
+@pytest.mark.parametrize("damage, message", [
+    ({'magic': b"NOTLORA\0"}, "Not a mapped adapter"),
+    ({'version': 99}, "Unsupported adapter format version 99"),
+    ({'header': b"{not json"}, "Corrupt adapter header"),
+    ({'header': json.dumps({'tensors': {'w': {'dtype': "<f4", 'shape': [10 ** 6],
+                                               'offset': 64, 'nbytes': 4 * 10 ** 6}}}
+                           ).encode()}, "runs past the end"),
+])
+def test_damaged_files_are_rejected_without_leaking_the_map(tmp_path, opened_maps,
+                                                             damage, message):
+    path = tmp_path / "bad.lora"
+    write_adapter(str(path), {'w': np.zeros(64, dtype=np.float32)},
+                  metadata={'padding': "x" * 200})
+    rewrite_preamble(path, **damage)
+
+    with pytest.raises(ValueError, match=message):
+        MappedAdapter(str(path))
+    assert opened_maps and all(m.closed for m in opened_maps)
@@ -0,0 +1,128 @@
+import threading
+
+import pytest
+
+from models.batch_scheduler import BatchScheduler, DeadlineExceeded
+
+
+class RecordingEngine:
+    """Echoes prompts and records the batches it was given"""
+
+    def __init__(self):
+        self.batches = []
+
+    def generate_batch(self, items):
+        self.batches.append([prompt for _, prompt, _ in items])
+        return [f"reply to {prompt}" for _, prompt, _ in items]
+
+
+class GatedEngine(RecordingEngine):
+    """Holds its first batch until released, so requests pile up behind it"""
+
+    def __init__(self):
+        super().__init__()
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def generate_batch(self, items):
+        self.started.set()
+        assert self.release.wait(5.0)
+        return super().generate_batch(items)
+
+
+@pytest.fixture
+def gated():
+    engine = GatedEngine()
+    yield engine
+    engine.release.set()
+
+
+def test_queued_requests_are_served_together_in_one_batch(gated):
+    scheduler = BatchScheduler([gated], max_batch_size=8, max_wait_ms=1.0)
+    first = scheduler.submit("first")
+    assert gated.started.wait(5.0)
+    futures = [scheduler.submit(f"p{i}") for i in range(3)]
+    gated.release.set()
+
+    assert first.result(5.0) == "reply to first"
+    assert [f.result(5.0) for f in futures] == ["reply to p0", "reply to p1", "reply to p2"]
+    assert gated.batches == [["first"], ["p0", "p1", "p2"]]
+    scheduler.shutdown()
+
+
+def test_shutdown_cancels_queued_requests(gated):
+    scheduler = BatchScheduler([gated], max_wait_ms=1.0)
+    first = scheduler.submit("first")
+    assert gated.started.wait(5.0)
+    queued = scheduler.submit("queued")
+    scheduler.shutdown(wait=False)
+    gated.release.set()
+
+    assert first.result(5.0) == "reply to first"
+    assert queued.cancelled()
+    assert gated.batches == [["first"]]
+
+
+def stock_line(request):
+    return f"stock line for {request.archetype}"
+
+
+def test_expired_requests_are_dropped_or_degraded_without_running(gated):
+    scheduler = BatchScheduler([gated], max_wait_ms=1.0, fallback=stock_line)
+    first = scheduler.submit("first")
+    assert gated.started.wait(5.0)
+    dropped = scheduler.submit("late", deadline_ms=0.0)
+    degraded = scheduler.submit("late too", deadline_ms=0.0, on_expire="degrade",
+                                archetype="baker")
+    kept = scheduler.submit("in time", deadline_ms=60000.0)
+    gated.release.set()
+
+    first.result(5.0)
+    with pytest.raises(DeadlineExceeded):
+        dropped.result(5.0)
+    assert degraded.result(5.0) == "stock line for baker"
+    assert kept.result(5.0) == "reply to in time"
+    assert gated.batches == [["first"], ["in time"]]
+    assert (scheduler.expired_dropped, scheduler.expired_degraded) == (1, 1)
+    scheduler.shutdown()
+
+
+def test_degrade_without_a_fallback_drops(gated):
+    scheduler = BatchScheduler([gated], max_wait_ms=1.0)
+    scheduler.submit("first")
+    assert gated.started.wait(5.0)
+    late = scheduler.submit("late", deadline_ms=0.0, on_expire="degrade")
+    gated.release.set()
+
+    with pytest.raises(DeadlineExceeded):
+        late.result(5.0)
+    scheduler.shutdown()
+
+
+def test_requests_over_their_latency_budget_are_shed_at_submit():
+    engine = RecordingEngine()
+    scheduler = BatchScheduler([engine], max_wait_ms=1.0, fallback=stock_line)
+    assert scheduler.estimate_latency() == 0.0
+    scheduler.service_time = 1.0
+
+    shed = scheduler.submit("hurry", budget_ms=100.0, archetype="cop")
+    served = scheduler.submit("no rush", budget_ms=10000.0)
+
+    assert shed.result(5.0) == "stock line for cop"
+    assert served.result(5.0) == "reply to no rush"
+    assert engine.batches == [["no rush"]]
+    assert scheduler.shed == 1
+    scheduler.shutdown()
+
+
+def test_a_failing_fallback_queues_the_request_instead():
+    def broken(request):
+        raise RuntimeError("no lines")
+
+    engine = RecordingEngine()
+    scheduler = BatchScheduler([engine], max_wait_ms=1.0, fallback=broken)
+    scheduler.service_time = 1.0
+
+    assert scheduler.submit("hurry", budget_ms=100.0).result(5.0) == "reply to hurry"
+    assert scheduler.shed == 0
+    scheduler.shutdown()
@@ -0,0 +1,83 @@
+from models.context_manager import ChatContextManager
+
+
+def ten_tokens(text):
+    return 10
+
+
+def conversation(turns):
+    messages = [{'role': 'system', 'content': "You are a grumpy baker."}]
+    for n in range(turns):
+        messages.append({'role': 'user', 'content': f"Question {n}?"})
+        messages.append({'role': 'assistant', 'content': f"Answer {n}."})
+    return messages
+
+
+def test_system_message_and_newest_turns_are_kept():
+    # 10 (system) + 10 (reply prefix) + 20 reserved for the reply leaves 60
+    manager = ChatContextManager(count_tokens=ten_tokens, n_ctx=100, min_reply_tokens=20)
+    plan = manager.plan(conversation(5), max_tokens=20)
+
+    assert (plan.kept_turns, plan.dropped_turns) == (6, 4)
+    assert plan.prompt.startswith("You are a grumpy baker.")
+    assert "Question 1?" not in plan.prompt
+    assert "Question 2?" in plan.prompt and "Answer 4." in plan.prompt
+    assert plan.prompt_tokens <= 100 - 20
+
+
+def test_max_history_tokens_bounds_the_window():
+    manager = ChatContextManager(count_tokens=ten_tokens, n_ctx=1000, max_history_tokens=30)
+    assert manager.plan(conversation(5)).kept_turns == 3
+
+
+def test_reply_is_capped_by_the_latency_target():
+    manager = ChatContextManager(count_tokens=ten_tokens, n_ctx=1000)
+    plan = manager.plan(conversation(1), max_tokens=100, latency_target_ms=1000,
+                        decode_tokens_per_second=40)
+
+    assert plan.max_tokens == 40
+    assert plan.limits == ['latency']
+
+
+def test_message_token_counts_are_cached():
+    counted = []
+
+    def counting(text):
+        counted.append(text)
+        return 10
+
+    manager = ChatContextManager(count_tokens=counting, n_ctx=1000)
+    manager.plan(conversation(3))
+    first = len(counted)
+    manager.plan(conversation(4))
+
+    # Only the two new messages are tokenized
+    assert len(counted) - first == 2
+
+
+def test_each_turn_is_summarized_once_as_it_scrolls_out():
+    calls = []
+
+    def summarize(previous, turns):
+        calls.append((previous, [m['content'] for m in turns]))
+        return "summary"
+
+    manager = ChatContextManager(count_tokens=ten_tokens, n_ctx=100, min_reply_tokens=20,
+                                 summarizer=summarize, summary_max_tokens=10)
+    history = conversation(5)
+    plan = manager.plan(history, max_tokens=20)
+    assert plan.summarized
+    assert "Earlier in this conversation: summary" in plan.prompt
+    folded = len(calls[0][1])
+
+    # Same history: the cached summary prefix is reused
+    manager.plan(history, max_tokens=20)
+    assert len(calls) == 1
+
+    # One more exchange: only the newly dropped turns are folded in
+    history += [{'role': 'user', 'content': "Question 5?"},
+                {'role': 'assistant', 'content': "Answer 5."}]
+    manager.plan(history, max_tokens=20)
+    assert len(calls) == 2
+    assert calls[1] == ("summary", [m['content'] for m in history[1 + folded:3 + folded]])
+    assert manager.summaries_built == 2
@@ -0,0 +1,93 @@
+from models.generation_cache import GenerationCache
+from models.llm_engine import LLMEngine
+
+
+def key(prompt="Hello", **overrides):
+    params = dict(max_tokens=50, temperature=0.0, stop=["\n\n"], model_id="m.gguf",
+                  adapter="baker.lora")
+    params.update(overrides)
+    return GenerationCache.make_key(prompt, **params)
+
+
+def test_key_covers_prompt_sampling_params_model_and_adapter():
+    base = key()
+    assert key() == base
+    assert key("Hello!") != base
+    assert key(max_tokens=51) != base
+    assert key(temperature=0.7) != base
+    assert key(stop=["###"]) != base
+    assert key(model_id="other.gguf") != base
+    assert key(adapter="cop.lora") != base
+    assert key(adapter=None) != base
+
+
+def test_least_recently_used_entry_is_evicted_first():
+    cache = GenerationCache(max_entries=2)
+    cache.put("a", "A")
+    cache.put("b", "B")
+    assert cache.get("a") == "A"
+    cache.put("c", "C")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "A"
+    assert cache.get("c") == "C"
+    assert cache.evictions == 1
+
+
+def test_byte_budget_evicts_and_oversized_entries_are_skipped():
+    cache = GenerationCache(max_entries=100, max_bytes=20)
+    cache.put("k1", "x" * 9)
+    cache.put("k2", "y" * 9)
+    assert len(cache) == 1
+    assert cache.get("k2") == "y" * 9
+
+    cache.put("k3", "z" * 30)
+    assert cache.get("k3") is None
+    assert cache.get_stats()['size_bytes'] <= 20
+
+
+def test_replacing_a_key_keeps_the_size_accounting():
+    cache = GenerationCache()
+    cache.put("k", "short")
+    cache.put("k", "a longer value")
+    assert len(cache) == 1
+    assert cache.get_stats()['size_bytes'] == len("k") + len("a longer value")
+
+
+def test_entries_survive_save_and_load(tmp_path):
+    path = tmp_path / "cache.json"
+    cache = GenerationCache(persist_path=str(path))
+    cache.put("a", "A")
+    cache.put("b", "B")
+    cache.save()
+
+    restored = GenerationCache(persist_path=str(path))
+    assert restored.get("a") == "A"
+    assert restored.get("b") == "B"
+
+
+def test_engine_caches_only_deterministic_calls_by_default():
+    cache = GenerationCache()
+    engine = LLMEngine(model_path=None, cache=cache)
+
+    engine.generate("The baker says", temperature=0.0)
+    engine.generate("The baker says", temperature=0.0)
+    engine.generate("The baker says", temperature=0.7)
+    assert (cache.hits, len(cache)) == (1, 1)
+
+    engine.generate("The baker says", temperature=0.7, use_cache=True)
+    assert len(cache) == 2
+
+
+def test_scheduled_requests_carry_their_cache_policy():
+    from models.batch_scheduler import BatchScheduler
+
+    cache = GenerationCache()
+    scheduler = BatchScheduler([LLMEngine(model_path=None, cache=cache)], max_wait_ms=1.0)
+    first = scheduler.submit("The baker says", temperature=0.7, use_cache=True).result(5.0)
+    again = scheduler.submit("The baker says", temperature=0.7, use_cache=True).result(5.0)
+    scheduler.submit("The baker says", temperature=0.7).result(5.0)
+    scheduler.shutdown()
+
+    assert again == first
+    assert (cache.hits, len(cache)) == (1, 1)
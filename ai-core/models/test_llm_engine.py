@@ -0,0 +1,63 @@
+from models.generation_cache import GenerationCache
+from models.llm_engine import LLMEngine
+
+
+MIXED = [
+    ("grumpy_baker.lora", "A customer complains about the bread.", {'max_tokens': 20}),
+    ("opportunistic_cop.lora", "Someone reports a theft.", {'max_tokens': 20}),
+    ("grumpy_baker.lora", "The oven breaks down.", {'max_tokens': 20}),
+    (None, "Describe the weather.", {'max_tokens': 20}),
+]
+
+
+def test_mixed_adapter_batch_is_one_pass_in_input_order():
+    engine = LLMEngine()
+    assert engine.supports_per_sequence_lora()
+
+    texts = engine.generate_batch(MIXED)
+
+    assert texts == [
+        "I don't have time for this nonsense!",
+        "Looks like we've got a situation here. What's it worth to you?",
+        "I don't have time for this nonsense!",
+        "I need to respond to this situation carefully.",
+    ]
+    assert engine.batch_stats['passes'] == 1
+    assert engine.batch_stats['sequences'] == 4
+    assert engine.batch_stats['adapter_groups'] == 3
+    assert engine.batch_stats['adapter_switches'] == 0
+    assert engine.active_adapter is None
+
+
+def test_mixed_batch_reuses_cached_sequences():
+    engine = LLMEngine(cache=GenerationCache())
+    cached = [(adapter, prompt, dict(params, use_cache=True)) for adapter, prompt, params in MIXED]
+
+    first = engine.generate_batch(cached)
+    assert engine.cache.hits == 0
+    assert engine.generate_batch(cached) == first
+    assert engine.cache.hits == 4
+
+
+def test_without_per_sequence_lora_each_adapter_is_bound_once():
+    engine = LLMEngine()
+    engine.supports_per_sequence_lora = lambda: False
+
+    texts = engine.generate_batch(MIXED)
+
+    assert texts == LLMEngine().generate_batch(MIXED)
+    assert engine.batch_stats['passes'] == 4
+    assert engine.batch_stats['adapter_switches'] == 3
+    assert engine.active_adapter is None
+
+
+def test_throughput_estimates_update_with_metrics_disabled(monkeypatch):
+    from monitoring.metrics import metrics
+
+    monkeypatch.setattr(metrics, "enabled", False)
+    engine = LLMEngine(mock_token_latency_ms=1.0)
+
+    engine.generate("You are a grumpy baker. A window breaks.", max_tokens=8)
+
+    assert engine.decode_tokens_per_second is not None
+    assert metrics.histogram("spector_llm_decode_tokens_per_second") is None
@@ -0,0 +1,127 @@
+import os
+import shutil
+import socket
+import tempfile
+import threading
+
+import pytest
+
+from models.batch_scheduler import BatchScheduler
+from models.generation_cache import GenerationCache
+from models.llm_engine import LLMEngine
+from models.model_client import ModelClient
+from models.model_server import ModelServer, recv_message, send_message
+
+
+@pytest.fixture
+def socket_dir():
+    # Unix socket paths are capped near 100 bytes, so keep them short
+    path = tempfile.mkdtemp(prefix="spector-")
+    yield path
+    shutil.rmtree(path, ignore_errors=True)
+
+
+@pytest.fixture
+def server(socket_dir):
+    engine = LLMEngine(cache=GenerationCache())
+    scheduler = BatchScheduler([engine])
+    server = ModelServer(os.path.join(socket_dir, "llm.sock"), scheduler, engine.get_info)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+    scheduler.shutdown()
+
+
+def test_generation_round_trips_over_the_socket(server):
+    client = ModelClient(server.socket_path, timeout=5.0)
+    try:
+        assert client.ping()
+        assert client.generate("Hi", adapter="grumpy_baker.lora") == \
+            "I don't have time for this nonsense!"
+        assert client.generate_batch([
+            ("opportunistic_cop.lora", "A theft.", {'max_tokens': 20}),
+            ("grumpy_baker.lora", "Bread.", {'max_tokens': 20}),
+        ]) == [
+            "Looks like we've got a situation here. What's it worth to you?",
+            "I don't have time for this nonsense!",
+        ]
+        assert client.supports_per_sequence_lora()
+        assert client.get_info()['model_server'] == server.socket_path
+    finally:
+        client.close()
+
+
+def test_cache_policy_reaches_the_server_engine(server):
+    cache = server.scheduler.engines[0].cache
+    client = ModelClient(server.socket_path, timeout=5.0)
+    try:
+        for _ in range(2):
+            client.generate("Hi", temperature=0.7, use_cache=True)
+            client.generate_batch([(None, "Hey", {'temperature': 0.7, 'use_cache': True})])
+        client.generate("Hi", temperature=0.7)
+    finally:
+        client.close()
+
+    assert cache.hits == 2
+    assert cache.misses == 2
+
+
+def test_request_is_resent_when_the_reply_is_cut_off(socket_dir):
+    path = os.path.join(socket_dir, "flaky.sock")
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(path)
+    listener.listen()
+    received = []
+
+    def serve():
+        # First connection: read the request, send half a reply and hang up
+        conn, _ = listener.accept()
+        received.append(recv_message(conn))
+        conn.sendall(b"\x00\x00\x01\x00{\"ok\"")
+        conn.close()
+        conn, _ = listener.accept()
+        received.append(recv_message(conn))
+        send_message(conn, {"ok": True, "result": "pong"})
+        conn.close()
+
+    thread = threading.Thread(target=serve, daemon=True)
+    thread.start()
+    client = ModelClient(path, timeout=5.0)
+    try:
+        assert client.ping()
+    finally:
+        client.close()
+        thread.join(5.0)
+        listener.close()
+
+    assert [message["op"] for message in received] == ["ping", "ping"]
+
+
+def test_timed_out_reply_is_not_resent(socket_dir):
+    path = os.path.join(socket_dir, "slow.sock")
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(path)
+    listener.listen()
+    accepted = []
+
+    def serve():
+        conn, _ = listener.accept()
+        accepted.append(conn)
+        recv_message(conn)
+
+    thread = threading.Thread(target=serve, daemon=True)
+    thread.start()
+    client = ModelClient(path, timeout=0.2)
+    try:
+        with pytest.raises(socket.timeout):
+            client.generate("Hi")
+    finally:
+        client.close()
+        thread.join(5.0)
+        for conn in accepted:
+            conn.close()
+        listener.close()
+
+    assert len(accepted) == 1
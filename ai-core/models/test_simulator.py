@@ -0,0 +1,80 @@
+import json
+import random
+import statistics
+import threading
+import time
+
+import pytest
+
+from models.simulator import Distribution, LatencyProfile, LatencySimulator
+
+
+def test_lognormal_draws_match_the_mean_and_cv():
+    distribution = Distribution(mean=40.0, cv=0.25)
+    rng = random.Random(0)
+
+    draws = [distribution.sample(rng) for _ in range(20000)]
+
+    assert statistics.fmean(draws) == pytest.approx(40.0, rel=0.02)
+    assert statistics.pstdev(draws) / statistics.fmean(draws) == pytest.approx(0.25, rel=0.05)
+    assert min(draws) > 0
+
+
+def test_distribution_kinds_and_floor():
+    rng = random.Random(0)
+    assert Distribution.fixed(5.0).sample(rng) == 5.0
+    assert Distribution(kind="empirical", samples=[1.0, 2.0]).sample(rng) in (1.0, 2.0)
+    assert Distribution(mean=1.0, cv=5.0, kind="normal", minimum=0.5).sample(rng) >= 0.5
+    with pytest.raises(ValueError, match="Unknown distribution"):
+        Distribution(kind="uniform")
+    with pytest.raises(ValueError, match="needs samples"):
+        Distribution(kind="empirical")
+
+
+def test_profiles_round_trip_through_json(tmp_path):
+    data = {'name': "rtx3060", 'prompt_ms_per_token': 0.4,
+            'decode_tokens_per_second': {'mean': 45.0, 'cv': 0.1},
+            'parallel_generations': 1, 'captured': "2026-01-01"}
+    path = tmp_path / "profile.json"
+    path.write_text(json.dumps(data))
+
+    profile = LatencyProfile.load(str(path))
+
+    assert profile.prompt_ms_per_token == Distribution.fixed(0.4)
+    assert profile.decode_tokens_per_second.mean == 45.0
+    assert LatencyProfile.from_dict(profile.to_dict()) == profile
+    with pytest.raises(ValueError, match="stt_rtf"):
+        LatencyProfile.from_dict({'stt_rtf': 0.1})
+
+
+def test_generation_costs_prompt_and_decode_time():
+    simulator = LatencySimulator(LatencyProfile(
+        prompt_ms_per_token=Distribution.fixed(1.0),
+        decode_tokens_per_second=Distribution.fixed(100.0),
+        reply_tokens=Distribution.fixed(12.0)), time_scale=0.0)
+
+    assert simulator.reply_tokens(max_tokens=8, default=30) == 8
+    assert simulator.generate(prompt_tokens=200, output_tokens=10) == \
+        pytest.approx((0.2, 0.1))
+    simulator.transcribe(2.0)
+
+    simulated = simulator.get_stats()['simulated']
+    assert simulated['llm_prompt_eval'] == {'calls': 1, 'seconds': pytest.approx(0.2)}
+    assert simulated['llm_decode']['seconds'] == pytest.approx(0.1)
+    # Unset entries cost nothing
+    assert simulated['stt'] == {'calls': 1, 'seconds': 0.0}
+
+
+def test_parallel_generations_serializes_engines():
+    simulator = LatencySimulator(LatencyProfile(
+        decode_tokens_per_second=Distribution.fixed(100.0), parallel_generations=1))
+
+    threads = [threading.Thread(target=simulator.generate, args=(0, 5)) for _ in range(3)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # Three 50 ms decodes one after another, not side by side
+    assert time.perf_counter() - started >= 0.15
@@ -0,0 +1,228 @@
+"""
+Metrics - Lightweight Request-Path Instrumentation
+Stage timing spans, counters and gauges rendered in Prometheus text format
+"""
+
+import bisect
+import os
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional, Tuple, Any
+
+from monitoring import tracing
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(key: LabelKey, extra: Optional[Dict[str, str]] = None) -> str:
+    pairs = list(key) + list((extra or {}).items())
+    if not pairs:
+        return ""
+    body = ",".join(f'{k}="{str(v).replace(chr(34), chr(39))}"' for k, v in pairs)
+    return "{" + body + "}"
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram plus a bounded reservoir of recent samples
+    Buckets give cheap long-run distribution; the reservoir gives p50/p95/p99
+    """
+
+    DEFAULT_BUCKETS = [0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                       1.0, 2.5, 5.0, 10.0]
+    QUANTILES = (0.5, 0.95, 0.99)
+
+    def __init__(self, buckets: Optional[List[float]] = None, reservoir_size: int = 1024):
+        self.buckets = list(buckets or self.DEFAULT_BUCKETS)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+        self.max = 0.0
+        self._recent: deque = deque(maxlen=reservoir_size)
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        with self._lock:
+            self.counts[bisect.bisect_left(self.buckets, value)] += 1
+            self.total += value
+            self.count += 1
+            self.max = max(self.max, value)
+            self._recent.append(value)
+
+    def quantiles(self) -> Dict[float, float]:
+        with self._lock:
+            samples = sorted(self._recent)
+        if not samples:
+            return {q: 0.0 for q in self.QUANTILES}
+        last = len(samples) - 1
+        return {q: samples[min(last, int(round(q * last)))] for q in self.QUANTILES}
+
+    def to_dict(self, unit: str = "s", scale: float = 1.0) -> Dict[str, Any]:
+        """Summary for JSON status endpoints"""
+        labels = [f"<={b * scale:g}{unit}" for b in self.buckets]
+        labels.append(f">{self.buckets[-1] * scale:g}{unit}")
+        return {
+            'count': self.count,
+            f'mean_{unit}': (self.total / self.count * scale) if self.count else 0.0,
+            f'max_{unit}': self.max * scale,
+            **{f'p{int(q * 100)}_{unit}': v * scale for q, v in self.quantiles().items()},
+            'buckets': dict(zip(labels, self.counts))
+        }
+
+
+class _NoopSpan:
+    """Returned by span() when metrics are disabled"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class _Span:
+    __slots__ = ("registry", "name", "labels", "start", "trace")
+
+    def __init__(self, registry: "MetricsRegistry", name: str, labels: Dict[str, Any]):
+        self.registry = registry
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.trace = tracing.open_span(self.name, self.labels)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.start
+        tracing.close_span(self.trace, exc)
+        self.registry.observe("spector_stage_seconds", elapsed,
+                              stage=self.name, **self.labels)
+        if exc_type is not None:
+            self.registry.inc("spector_stage_errors_total", stage=self.name)
+        return False
+
+
+class MetricsRegistry:
+    """
+    Process-wide store of histograms, counters and gauge callbacks
+
+    When disabled (and no request trace is being captured), span() returns a
+    shared no-op context manager and inc()/observe() return immediately, so
+    instrumentation left in the hot path costs one attribute check.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._histograms: Dict[str, Dict[LabelKey, Histogram]] = {}
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._gauges: Dict[str, Tuple[str, Callable[[], Dict[LabelKey, float]]]] = {}
+        self._help: Dict[str, str] = {
+            "spector_stage_seconds": "Latency of request-path stages",
+            "spector_stage_errors_total": "Stages that raised an exception",
+            "spector_cache_requests_total": "Cache lookups by cache and result",
+            "spector_mock_fallbacks_total": "Requests served by a mock backend",
+            "spector_llm_decode_tokens_per_second": "LLM decode throughput per generation",
+            "spector_voice_latency_seconds": "Player end of speech to first NPC audio sent",
+        }
+        self._lock = threading.Lock()
+
+    def span(self, name: str, **labels):
+        """Time a block as a named stage (and nest it in the active trace)"""
+        if not self.enabled and not tracing.is_active():
+            return _NOOP_SPAN
+        return _Span(self, name, labels)
+
+    def observe(self, metric: str, value: float, **labels) -> None:
+        if not self.enabled:
+            return
+        key = _label_key(labels)
+        series = self._histograms.get(metric)
+        histogram = series.get(key) if series else None
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(metric, {}).setdefault(key, Histogram())
+        histogram.observe(value)
+
+    def inc(self, metric: str, value: float = 1.0, **labels) -> None:
+        if not self.enabled:
+            return
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(metric, {})
+            series[key] = series.get(key, 0.0) + value
+
+    def describe(self, metric: str, help_text: str) -> None:
+        self._help[metric] = help_text
+
+    def register_gauge(self, metric: str, help_text: str,
+                       read: Callable[[], Any]) -> None:
+        """
+        Gauge sampled at scrape time
+        read() returns a number or a {label_dict_tuple: value} mapping built
+        with gauge_series()
+        """
+        self._gauges[metric] = (help_text, read)
+
+    @staticmethod
+    def gauge_series(**labels) -> LabelKey:
+        return _label_key(labels)
+
+    def histogram(self, metric: str, **labels) -> Optional[Histogram]:
+        return self._histograms.get(metric, {}).get(_label_key(labels))
+
+    def reset(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    def render_prometheus(self) -> str:
+        """Prometheus text exposition format (histograms as summaries)"""
+        lines: List[str] = []
+
+        with self._lock:
+            histograms = {m: dict(s) for m, s in self._histograms.items()}
+            counters = {m: dict(s) for m, s in self._counters.items()}
+
+        for metric, series in sorted(histograms.items()):
+            lines.append(f"# HELP {metric} {self._help.get(metric, metric)}")
+            lines.append(f"# TYPE {metric} summary")
+            for key, histogram in sorted(series.items()):
+                for q, value in histogram.quantiles().items():
+                    lines.append(f"{metric}{_format_labels(key, {'quantile': str(q)})} {value:.6f}")
+                lines.append(f"{metric}_sum{_format_labels(key)} {histogram.total:.6f}")
+                lines.append(f"{metric}_count{_format_labels(key)} {histogram.count}")
+
+        for metric, series in sorted(counters.items()):
+            lines.append(f"# HELP {metric} {self._help.get(metric, metric)}")
+            lines.append(f"# TYPE {metric} counter")
+            for key, value in sorted(series.items()):
+                lines.append(f"{metric}{_format_labels(key)} {value:g}")
+
+        for metric, (help_text, read) in sorted(self._gauges.items()):
+            try:
+                value = read()
+            except Exception:
+                continue
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} gauge")
+            series = value if isinstance(value, dict) else {(): value}
+            for key, sample in sorted(series.items()):
+                lines.append(f"{metric}{_format_labels(key)} {float(sample):g}")
+
+        return "\n".join(lines) + "\n"
+
+
+# Process-wide registry; set SPECTOR_METRICS=0 to disable instrumentation
+metrics = MetricsRegistry(enabled=os.environ.get("SPECTOR_METRICS", "1") != "0")
+span = metrics.span
+inc = metrics.inc
+observe = metrics.observe
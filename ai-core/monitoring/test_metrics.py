@@ -0,0 +1,65 @@
+from monitoring import tracing
+from monitoring.metrics import Histogram, MetricsRegistry
+
+
+def test_histogram_buckets_and_quantiles():
+    histogram = Histogram(buckets=[0.1, 1.0])
+    for value in (0.05, 0.2, 0.3, 0.4, 5.0):
+        histogram.observe(value)
+
+    assert histogram.counts == [1, 3, 1]
+    assert histogram.count == 5
+    assert histogram.max == 5.0
+    assert histogram.quantiles() == {0.5: 0.3, 0.95: 5.0, 0.99: 5.0}
+
+    summary = histogram.to_dict(unit="ms", scale=1000.0)
+    assert summary['buckets'] == {'<=100ms': 1, '<=1000ms': 3, '>1000ms': 1}
+    assert summary['max_ms'] == 5000.0
+
+
+def test_span_times_the_stage_and_counts_errors():
+    registry = MetricsRegistry()
+    with registry.span("rag_retrieve", kind="event"):
+        pass
+    try:
+        with registry.span("rag_retrieve", kind="event"):
+            raise KeyError("agent")
+    except KeyError:
+        pass
+
+    assert registry.histogram("spector_stage_seconds", stage="rag_retrieve",
+                              kind="event").count == 2
+    assert 'spector_stage_errors_total{stage="rag_retrieve"} 1' in registry.render_prometheus()
+
+
+def test_prometheus_text_has_summaries_counters_and_gauges():
+    registry = MetricsRegistry()
+    registry.observe("spector_stage_seconds", 0.5, stage="tts")
+    registry.inc("spector_cache_requests_total", cache="generation", result="hit")
+    registry.inc("spector_cache_requests_total", cache="generation", result="hit")
+    registry.register_gauge("spector_sessions", "Open sessions", lambda: 3)
+    registry.register_gauge("spector_broken", "Raises", lambda: 1 / 0)
+
+    lines = registry.render_prometheus().splitlines()
+
+    assert "# TYPE spector_stage_seconds summary" in lines
+    assert 'spector_stage_seconds{stage="tts",quantile="0.5"} 0.500000' in lines
+    assert 'spector_stage_seconds_count{stage="tts"} 1' in lines
+    assert 'spector_cache_requests_total{cache="generation",result="hit"} 2' in lines
+    assert "spector_sessions 3" in lines
+    assert not any("spector_broken" in line for line in lines)
+
+
+def test_disabled_registry_records_nothing_unless_a_trace_is_active():
+    registry = MetricsRegistry(enabled=False)
+    registry.observe("spector_stage_seconds", 0.5, stage="tts")
+    registry.inc("spector_cache_requests_total")
+    with registry.span("tts"):
+        pass
+    assert registry.render_prometheus() == "\n"
+
+    with tracing.start_trace("POST /event") as trace:
+        with registry.span("tts", voice="baker"):
+            pass
+    assert [child.name for child in trace.root.children] == ["tts"]
+    assert registry.render_prometheus() == "\n"
@@ -0,0 +1,71 @@
+import asyncio
+import threading
+
+import pytest
+from fastapi import HTTPException
+
+from monitoring.profiler import ProfilerBusy, SamplingProfiler
+
+
+@pytest.fixture
+def parked_thread():
+    """A named thread blocked in a known function until the test ends"""
+    release = threading.Event()
+
+    def parked_in_test():
+        release.wait(5.0)
+
+    thread = threading.Thread(target=parked_in_test, name="npc worker;1")
+    thread.start()
+    yield thread
+    release.set()
+    thread.join()
+
+
+def test_profile_samples_other_threads_into_collapsed_stacks(parked_thread):
+    profiler = SamplingProfiler(interval=0.002)
+
+    stacks = profiler.profile(0.05)
+
+    lines = stacks.splitlines()
+    (parked,) = [line for line in lines if line.startswith("npc_worker:1;")]
+    stack, count = parked.rsplit(" ", 1)
+    assert ";parked_in_test (test_profiler.py:" in stack
+    assert int(count) == profiler.last_run['samples']
+    assert not any("_sample (profiler.py:" in line for line in lines)
+
+    report = profiler.last_run
+    assert report['samples'] > 1
+    assert report['seconds'] >= 0.05
+    assert report['unique_stacks'] == len(lines)
+
+
+def test_window_is_capped_and_runs_one_at_a_time():
+    profiler = SamplingProfiler()
+    profiler.MAX_SECONDS = 0.02
+    profiler.profile(30.0, interval=0.005)
+    assert profiler.last_run['seconds'] < 1.0
+
+    with profiler._lock:
+        with pytest.raises(ProfilerBusy):
+            profiler.profile(0.01)
+
+
+def test_admin_endpoint_returns_stacks_and_rejects_overlap(parked_thread, monkeypatch):
+    import main_api
+
+    profiler = SamplingProfiler()
+    monkeypatch.setattr(main_api, "profiler", profiler)
+
+    response = asyncio.run(main_api.capture_profile(seconds=0.05, interval_ms=2.0))
+    assert b"parked_in_test" in response.body
+    assert response.headers["X-Profile-Samples"] == str(profiler.last_run['samples'])
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(main_api.capture_profile(seconds=0.0))
+    assert error.value.status_code == 400
+
+    with profiler._lock:
+        with pytest.raises(HTTPException) as error:
+            asyncio.run(main_api.capture_profile(seconds=0.05))
+    assert error.value.status_code == 409
@@ -0,0 +1,75 @@
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+
+from starlette.responses import Response
+
+from monitoring import tracing
+
+
+def test_spans_nest_under_the_active_trace():
+    assert not tracing.is_active()
+    with tracing.start_trace("POST /event", world="w1") as trace:
+        outer = tracing.open_span("process_event", {})
+        inner = tracing.open_span("rag_retrieve", {'k': 3})
+        tracing.close_span(inner)
+        tracing.close_span(outer, KeyError("agent"))
+        assert tracing.current_span() is trace.root
+    assert not tracing.is_active()
+    assert tracing.open_span("orphan", {}) is None
+
+    tree = trace.to_dict()
+    assert tree['trace_id'] == trace.trace_id
+    assert tree['root']['name'] == "POST /event"
+    (process,) = tree['root']['children']
+    assert process['error'] == "KeyError: 'agent'"
+    assert process['children'][0]['name'] == "rag_retrieve"
+    assert process['children'][0]['attrs'] == {'k': '3'}
+    assert tracing.traces.get(trace.trace_id) is trace
+
+
+def test_spans_from_worker_threads_attach_to_the_request():
+    with tracing.start_trace("POST /dialogue") as trace:
+        parent = tracing.current_span()
+
+        def worker():
+            start = time.perf_counter()
+            tracing.record(parent, "llm_batch", start, start + 0.01, batch_size=4)
+
+        thread = threading.Thread(target=worker)
+        thread.start()
+        thread.join()
+
+    (batch,) = trace.to_dict()['root']['children']
+    assert batch['name'] == "llm_batch"
+    assert batch['duration_ms'] == 10.0
+    assert tracing.record(None, "dropped", 0.0, 1.0) is None
+
+
+def test_store_keeps_the_most_recent_traces():
+    store = tracing.TraceStore(max_traces=2)
+    first, second, third = (tracing.Trace(f"t{i}") for i in range(3))
+    for trace in (first, second, third):
+        store.add(trace)
+
+    assert store.list_ids() == [second.trace_id, third.trace_id]
+    assert store.get(first.trace_id) is None
+
+
+def test_traced_response_carries_only_the_trace_id():
+    import main_api
+
+    async def call_next(request):
+        tracing.close_span(tracing.open_span("process_event", {}))
+        return Response("ok")
+
+    request = SimpleNamespace(headers={"X-Spector-Trace": "1"}, method="POST",
+                              url=SimpleNamespace(path="/event"))
+    response = asyncio.run(main_api.capture_trace(request, call_next))
+
+    trace_id = response.headers["X-Spector-Trace-Id"]
+    assert "X-Spector-Trace" not in response.headers
+    tree = asyncio.run(main_api.get_trace(trace_id))
+    assert tree['root']['name'] == "POST /event"
+    assert [child['name'] for child in tree['root']['children']] == ["process_event"]
@@ -0,0 +1,139 @@
+"""
+Tracing - Per-Request Span Trees
+Captures the nested stages of a single request when a client asks for it
+"""
+
+import contextlib
+import contextvars
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+_current: contextvars.ContextVar = contextvars.ContextVar("spector_trace_span", default=None)
+
+
+@dataclass
+class TraceSpan:
+    """One timed stage; children are appended as nested stages finish"""
+    name: str
+    start: float
+    end: Optional[float] = None
+    attrs: Dict[str, Any] = field(default_factory=dict)
+    error: Optional[str] = None
+    children: List["TraceSpan"] = field(default_factory=list)
+
+    def to_dict(self, origin: float) -> Dict[str, Any]:
+        end = self.end if self.end is not None else time.perf_counter()
+        node = {
+            'name': self.name,
+            'start_ms': round((self.start - origin) * 1000.0, 3),
+            'duration_ms': round((end - self.start) * 1000.0, 3)
+        }
+        if self.attrs:
+            node['attrs'] = {k: str(v) for k, v in self.attrs.items()}
+        if self.error:
+            node['error'] = self.error
+        if self.children:
+            # Worker threads may append while we read; copy first
+            children = sorted(list(self.children), key=lambda c: c.start)
+            node['children'] = [child.to_dict(origin) for child in children]
+        return node
+
+
+class Trace:
+    """Root span plus an id the client can use to fetch the tree again"""
+
+    def __init__(self, name: str, **attrs):
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.root = TraceSpan(name, time.perf_counter(), attrs=attrs)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'trace_id': self.trace_id, 'root': self.root.to_dict(self.root.start)}
+
+
+class TraceStore:
+    """The most recent finished traces, for GET /admin/traces/{id}"""
+
+    def __init__(self, max_traces: int = 64):
+        self.max_traces = max_traces
+        self._traces: "OrderedDict[str, Trace]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, trace: Trace) -> None:
+        with self._lock:
+            self._traces[trace.trace_id] = trace
+            while len(self._traces) > self.max_traces:
+                self._traces.popitem(last=False)
+
+    def get(self, trace_id: str) -> Optional[Trace]:
+        with self._lock:
+            return self._traces.get(trace_id)
+
+    def list_ids(self) -> List[str]:
+        with self._lock:
+            return list(self._traces)
+
+
+traces = TraceStore()
+
+
+def is_active() -> bool:
+    return _current.get() is not None
+
+
+def current_span() -> Optional[TraceSpan]:
+    """The innermost open span, or None when no trace is being captured"""
+    return _current.get()
+
+
+@contextlib.contextmanager
+def start_trace(name: str, **attrs):
+    """Capture every span opened in this context until the block exits"""
+    trace = Trace(name, **attrs)
+    token = _current.set(trace.root)
+    try:
+        yield trace
+    except BaseException as e:
+        trace.root.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _current.reset(token)
+        trace.root.end = time.perf_counter()
+        traces.add(trace)
+
+
+def open_span(name: str, attrs: Dict[str, Any]) -> Optional[Tuple[TraceSpan, Any]]:
+    """Open a child of the current span; None when no trace is active"""
+    parent = _current.get()
+    if parent is None:
+        return None
+    child = TraceSpan(name, time.perf_counter(), attrs=dict(attrs))
+    parent.children.append(child)
+    return child, _current.set(child)
+
+
+def close_span(handle: Optional[Tuple[TraceSpan, Any]], error: Optional[BaseException] = None) -> None:
+    if handle is None:
+        return
+    child, token = handle
+    child.end = time.perf_counter()
+    if error is not None:
+        child.error = f"{type(error).__name__}: {error}"
+    _current.reset(token)
+
+
+def record(parent: Optional[TraceSpan], name: str, start: float, end: float,
+           error: Optional[str] = None, **attrs) -> Optional[TraceSpan]:
+    """
+    Attach an already-finished span under parent
+    Used where work runs on another thread (e.g. a scheduler worker) and
+    the request's context is not current there
+    """
+    if parent is None:
+        return None
+    child = TraceSpan(name, start, end, attrs=attrs, error=error)
+    parent.children.append(child)
+    return child
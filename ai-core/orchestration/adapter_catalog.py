@@ -0,0 +1,168 @@
+"""
+Adapter Catalog - In-Memory LoRA Index
+Scans the LoRA directory once and caches each adapter's sidecar metadata
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, Any
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class AdapterInfo:
+    """Catalog entry for one adapter file and its .json sidecar"""
+    name: str
+    path: str
+    size_bytes: int
+    mtime: float
+    metadata_path: Optional[str] = None
+    metadata_mtime: Optional[float] = None
+    metadata: Optional[Dict[str, Any]] = None
+    prompt_prefix: Optional[str] = None
+
+
+def adapter_for(agent: Dict[str, Any]) -> str:
+    """
+    Adapter an agent generates with: its configured lora_adapter, or
+    <archetype>.lora (what tools/train_lora.py writes) if none is set
+    """
+    return agent.get('lora_adapter') or f"{agent['archetype']}{AdapterCatalog.ADAPTER_SUFFIX}"
+
+
+class AdapterCatalog:
+    """
+    Index of available LoRA adapters
+
+    The directory is scanned once at startup and again at most every
+    refresh_interval seconds, so lookups cost no disk I/O and unknown
+    adapter names fail fast. Sidecar metadata is parsed once and rendered
+    into a prompt prefix; a changed mtime on the next rescan drops the
+    stale entry and calls on_change(name).
+    """
+
+    ADAPTER_SUFFIX = '.lora'
+
+    def __init__(self, lora_directory: str, refresh_interval: float = 5.0,
+                 on_change: Optional[Callable[[str], None]] = None):
+        self.lora_directory = lora_directory
+        self.refresh_interval = refresh_interval
+        self.on_change = on_change
+
+        self._entries: Dict[str, AdapterInfo] = {}
+        self._lock = threading.Lock()
+        self._last_scan = 0.0
+
+        self.scan()
+
+    def scan(self) -> None:
+        """Rebuild the index from a single directory listing"""
+        found: Dict[str, os.stat_result] = {}
+        try:
+            with os.scandir(self.lora_directory) as it:
+                for entry in it:
+                    if entry.is_file():
+                        found[entry.name] = entry.stat()
+        except FileNotFoundError:
+            logger.warning(f"LoRA directory not found: {self.lora_directory}")
+
+        changed = []
+        with self._lock:
+            entries = {}
+            for name, stat in found.items():
+                if not name.endswith(self.ADAPTER_SUFFIX):
+                    continue
+
+                sidecar = name[:-len(self.ADAPTER_SUFFIX)] + '.json'
+                sidecar_stat = found.get(sidecar)
+                previous = self._entries.get(name)
+
+                info = AdapterInfo(
+                    name=name,
+                    path=os.path.join(self.lora_directory, name),
+                    size_bytes=stat.st_size,
+                    mtime=stat.st_mtime,
+                    metadata_path=(os.path.join(self.lora_directory, sidecar)
+                                   if sidecar_stat else None),
+                    metadata_mtime=sidecar_stat.st_mtime if sidecar_stat else None
+                )
+
+                if previous is not None:
+                    unchanged = (previous.mtime == info.mtime
+                                 and previous.metadata_mtime == info.metadata_mtime)
+                    if unchanged:
+                        info = previous
+                    else:
+                        changed.append(name)
+
+                entries[name] = info
+
+            changed.extend(name for name in self._entries if name not in entries)
+            self._entries = entries
+            self._last_scan = time.monotonic()
+
+        if changed:
+            logger.info(f"Adapter catalog changed: {', '.join(changed)}")
+            if self.on_change:
+                for name in changed:
+                    self.on_change(name)
+
+    def _maybe_refresh(self) -> None:
+        # Claim the rescan under the lock so concurrent lookups that find
+        # the index stale do not all list the directory at once
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_scan < self.refresh_interval:
+                return
+            self._last_scan = now
+        self.scan()
+
+    def get(self, adapter_name: str) -> AdapterInfo:
+        """Look up an adapter, raising FileNotFoundError if unknown"""
+        self._maybe_refresh()
+        info = self._entries.get(adapter_name)
+        if info is None:
+            raise FileNotFoundError(
+                f"LoRA adapter not found: "
+                f"{os.path.join(self.lora_directory, adapter_name)}")
+        return info
+
+    def __contains__(self, adapter_name: str) -> bool:
+        self._maybe_refresh()
+        return adapter_name in self._entries
+
+    def load_metadata(self, adapter_name: str) -> Optional[Dict[str, Any]]:
+        """Parse the sidecar once and pre-render the traits prompt prefix"""
+        info = self.get(adapter_name)
+        if info.prompt_prefix is None:
+            self._render(info)
+        return info.metadata
+
+    def _render(self, info: AdapterInfo) -> None:
+        metadata = None
+        if info.metadata_path:
+            try:
+                with open(info.metadata_path) as f:
+                    metadata = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Bad adapter metadata {info.metadata_path}: {e}")
+
+        traits = (metadata or {}).get('traits', [])
+        info.metadata = metadata
+        info.prompt_prefix = (f"Character traits: {', '.join(traits)}. "
+                              if traits else "")
+
+    def prompt_prefix(self, adapter_name: str) -> str:
+        """Rendered "Character traits: ..." prefix for an adapter"""
+        info = self.get(adapter_name)
+        if info.prompt_prefix is None:
+            self._render(info)
+        return info.prompt_prefix
+
+    def list_adapters(self) -> list:
+        return sorted(self._entries)
@@ -0,0 +1,138 @@
+"""
+Adapter Prefetcher - Predictive LoRA Warming
+Loads the adapters of NPCs near the player in a background thread
+"""
+
+import logging
+import queue
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Any
+
+from orchestration.adapter_catalog import adapter_for
+
+logger = logging.getLogger(__name__)
+
+
+class AdapterPrefetcher:
+    """
+    Predicts which characters the player is about to talk to and warms
+    their LoRA adapters before the first request arrives
+
+    Takes either the player's location (agents are placed from their
+    schedules) or explicit agent distances computed by the game client.
+    Agents strictly closer than radius count as nearby; GameMaster puts
+    agents elsewhere at exactly its 10.0 "different location" distance.
+    Loading happens on a daemon thread through LoRASwitcher.prefetch, which
+    never evicts adapters pinned by in-flight generations.
+    """
+
+    def __init__(self, lora_switcher, game_master,
+                 radius: float = 10.0, max_candidates: int = 3):
+        self.lora_switcher = lora_switcher
+        self.game_master = game_master
+        self.radius = radius
+        self.max_candidates = max_candidates
+
+        self._queue: "queue.Queue[Optional[str]]" = queue.Queue()
+        self._queued: set = set()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+        self.updates = 0
+        self.predicted = 0
+        self.already_loaded = 0
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._run, name="lora-prefetch",
+                                        daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+    def update_player_location(self, location: str,
+                               game_time: Optional[str] = None,
+                               game_master=None) -> List[str]:
+        """
+        Predict nearby agents from their scheduled locations
+        game_time is "HH:MM"; defaults to the server's wall clock.
+        game_master overrides the default world (e.g. a session's)
+        """
+        game_master = game_master or self.game_master
+        game_time = game_time or datetime.now().strftime("%H:%M")
+        distances = {}
+        for agent in game_master.agents_config['agents']:
+            agent_location = game_master.get_agent_location(agent['id'], game_time)
+            distances[agent['id']] = game_master.calculate_distance(
+                location, agent_location)
+        return self.update_proximity(distances, game_master)
+
+    def update_proximity(self, agent_distances: Dict[str, float],
+                         game_master=None) -> List[str]:
+        """
+        Queue adapters for the closest agents closer than radius
+        Returns the adapter names predicted for this update
+        """
+        self.updates += 1
+        nearby = sorted(
+            (distance, agent_id) for agent_id, distance in agent_distances.items()
+            if distance < self.radius
+        )[:self.max_candidates]
+
+        adapters = []
+        for _, agent_id in nearby:
+            adapter_name = self._adapter_for(agent_id, game_master or self.game_master)
+            if adapter_name:
+                adapters.append(adapter_name)
+                self._enqueue(adapter_name)
+
+        return adapters
+
+    def _adapter_for(self, agent_id: str, game_master) -> Optional[str]:
+        agent = next((a for a in game_master.agents_config['agents']
+                      if a['id'] == agent_id), None)
+        return adapter_for(agent) if agent else None
+
+    def _enqueue(self, adapter_name: str) -> None:
+        if self.lora_switcher.is_adapter_loaded(adapter_name):
+            self.already_loaded += 1
+            return
+
+        with self._lock:
+            if adapter_name in self._queued:
+                return
+            self._queued.add(adapter_name)
+
+        self.predicted += 1
+        self.start()
+        self._queue.put(adapter_name)
+
+    def _run(self) -> None:
+        while True:
+            adapter_name = self._queue.get()
+            if adapter_name is None:
+                return
+
+            try:
+                self.lora_switcher.prefetch(adapter_name)
+            except Exception as e:
+                logger.warning(f"Prefetch of {adapter_name} failed: {e}")
+            finally:
+                with self._lock:
+                    self._queued.discard(adapter_name)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Prediction counters plus hit-rate attribution from the switcher"""
+        return {
+            'updates': self.updates,
+            'predicted': self.predicted,
+            'already_loaded': self.already_loaded,
+            'queued': self._queue.qsize(),
+            'cache': self.lora_switcher.get_cache_status()['prefetch']
+        }
@@ -0,0 +1,219 @@
+"""
+Event Channel - Multiplexed Client Connection
+Carries events, dialogue and pushed NPC reactions over one WebSocket with request ids
+"""
+
+import asyncio
+import base64
+import json
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Union
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+logger = logging.getLogger(__name__)
+
+Frame = Union[bytes, str]
+Push = Callable[[str, Any], Awaitable[None]]
+Handler = Callable[[Dict[str, Any], Push], Awaitable[Any]]
+
+
+class ChannelCodec:
+    """
+    Wire encoding of channel messages
+    msgpack travels in binary frames and carries bytes (audio) natively;
+    JSON travels in text frames and carries bytes as base64 strings.
+    Either kind of frame is accepted from the client.
+    """
+
+    MSGPACK = "spector.msgpack"
+    JSON = "spector.json"
+
+    def __init__(self, name: str = JSON):
+        if name == self.MSGPACK and msgpack is None:
+            raise ValueError("msgpack is not installed")
+        self.name = name
+
+    @classmethod
+    def negotiate(cls, offered: List[str]) -> "ChannelCodec":
+        """Pick from the client's WebSocket subprotocols, preferring msgpack"""
+        if cls.MSGPACK in offered and msgpack is not None:
+            return cls(cls.MSGPACK)
+        if cls.MSGPACK in offered:
+            logger.warning("Client asked for msgpack but it is not installed, using JSON")
+        return cls(cls.JSON)
+
+    @property
+    def binary(self) -> bool:
+        return self.name == self.MSGPACK
+
+    def encode(self, message: Dict[str, Any]) -> Frame:
+        if self.binary:
+            return msgpack.packb(message, use_bin_type=True)
+        return json.dumps(message, separators=(",", ":"), default=self._json_default)
+
+    @staticmethod
+    def _json_default(value: Any) -> Any:
+        if isinstance(value, (bytes, bytearray)):
+            return base64.b64encode(value).decode('ascii')
+        raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+    @staticmethod
+    def decode(frame: Frame) -> Dict[str, Any]:
+        if isinstance(frame, (bytes, bytearray)):
+            if msgpack is None:
+                raise ValueError("Binary frames need msgpack, which is not installed")
+            message = msgpack.unpackb(frame, raw=False)
+        else:
+            message = json.loads(frame)
+        if not isinstance(message, dict):
+            raise ValueError("A message must be a map")
+        return message
+
+
+class EventChannel:
+    """
+    One long-lived client connection serving many concurrent requests
+
+    The client sends {"id": n, "op": name, "data": {...}}. Each op runs as
+    its own task through handlers[op](data, push); push(type, data) sends
+    {"id": n, "type": type, "data": data} as soon as a piece of the answer
+    is ready (an event's ack, then each NPC reaction as its generation
+    finishes), and a handler's return value, if not None, is pushed as
+    "result". Failures are pushed as "error" with a status and detail;
+    exceptions carrying status_code/detail (HTTPException) keep their
+    status. At most max_inflight requests run at once per connection.
+
+    All frames go out through one writer task and a bounded queue, so a
+    slow client applies backpressure to its own requests only. When the
+    connection closes, or a send fails, running requests are cancelled,
+    which withdraws generations still waiting in the scheduler; pushes
+    after a failed send are dropped rather than waiting on a full queue.
+    """
+
+    def __init__(self, codec: ChannelCodec, send: Callable[[Frame], Awaitable[None]],
+                 handlers: Dict[str, Handler], max_inflight: int = 64,
+                 send_queue_size: int = 256):
+        self.codec = codec
+        self.send = send
+        self.handlers = handlers
+        self.max_inflight = max_inflight
+
+        self._outgoing: "asyncio.Queue[Optional[Frame]]" = asyncio.Queue(send_queue_size)
+        self._tasks: Dict[asyncio.Task, Any] = {}
+        self.send_error: Optional[BaseException] = None
+
+        self.requests = 0
+        self.errors = 0
+        self.pushed = 0
+
+    async def run(self, receive: Callable[[], Awaitable[Optional[Frame]]]) -> None:
+        """
+        Serve until receive() returns None (the client disconnected) or a
+        send fails (send_error holds why)
+        """
+        writer = asyncio.create_task(self._write_loop())
+        try:
+            while True:
+                receiving = asyncio.ensure_future(receive())
+                await asyncio.wait({receiving, writer}, return_when=asyncio.FIRST_COMPLETED)
+                if not receiving.done():
+                    # The writer died: nothing more can reach the client
+                    receiving.cancel()
+                    await asyncio.gather(receiving, return_exceptions=True)
+                    break
+                frame = receiving.result()
+                if frame is None:
+                    break
+                try:
+                    message = self.codec.decode(frame)
+                except Exception as e:
+                    self.errors += 1
+                    await self.push(None, "error", {'status': 400,
+                                                    'detail': f"Undecodable message: {e}"})
+                    continue
+                await self._dispatch(message)
+        finally:
+            for task in list(self._tasks):
+                task.cancel()
+            if self._tasks:
+                await asyncio.gather(*self._tasks, return_exceptions=True)
+            writer.cancel()
+            await asyncio.gather(writer, return_exceptions=True)
+
+    async def _write_loop(self) -> None:
+        try:
+            while True:
+                frame = await self._outgoing.get()
+                await self.send(frame)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.send_error = e
+            logger.info(f"Channel send failed, closing: {e}")
+            # Pushes from now on are dropped; free any that wait for room
+            while not self._outgoing.empty():
+                self._outgoing.get_nowait()
+
+    async def push(self, request_id: Any, message_type: str, data: Any = None) -> None:
+        if self.send_error is not None:
+            return
+        message = {'id': request_id, 'type': message_type}
+        if data is not None:
+            message['data'] = data
+        self.pushed += 1
+        await self._outgoing.put(self.codec.encode(message))
+
+    async def _dispatch(self, message: Dict[str, Any]) -> None:
+        request_id = message.get('id')
+        op = message.get('op')
+        if op == "ping":
+            await self.push(request_id, "pong")
+            return
+
+        handler = self.handlers.get(op)
+        if handler is None:
+            self.errors += 1
+            await self.push(request_id, "error", {'status': 400, 'detail': f"Unknown op {op!r}"})
+            return
+        if len(self._tasks) >= self.max_inflight:
+            self.errors += 1
+            await self.push(request_id, "error", {
+                'status': 429,
+                'detail': f"{self.max_inflight} requests already in flight on this connection"})
+            return
+
+        self.requests += 1
+        task = asyncio.create_task(self._handle(request_id, handler, message.get('data') or {}))
+        self._tasks[task] = request_id
+        task.add_done_callback(self._tasks.pop)
+
+    async def _handle(self, request_id: Any, handler: Handler, data: Dict[str, Any]) -> None:
+        async def push(message_type: str, payload: Any = None) -> None:
+            await self.push(request_id, message_type, payload)
+
+        try:
+            result = await handler(data, push)
+            if result is not None:
+                await push("result", result)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.errors += 1
+            status = getattr(e, 'status_code', 500)
+            detail = getattr(e, 'detail', None) or str(e)
+            if status >= 500:
+                logger.error(f"Channel request {request_id} failed: {e}")
+            await push("error", {'status': status, 'detail': detail})
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'encoding': self.codec.name,
+            'requests': self.requests,
+            'in_flight': len(self._tasks),
+            'pushed': self.pushed,
+            'errors': self.errors
+        }
@@ -5,10 +5,18 @@ Handles event orchestration and agent coordination
 
 import json
 import math
+import re
 from typing import List, Dict, Any, Optional
 from datetime import datetime
 import yaml
 
+from monitoring.metrics import span
+from orchestration.adapter_catalog import adapter_for
+
+# Game clock times: "HH:MM", 24-hour
+CLOCK_PATTERN = r"^([01]?\d|2[0-3]):[0-5]\d$"
+
+
 class GameMaster:
     """
     The Game Master acts as the central causal engine.
@@ -83,6 +91,10 @@ class GameMaster:
         3. Generate prompts for LoRA inference
         4. Return orchestrated response
         """
+        with span("process_event"):
+            return self._process_event(event)
+    
+    def _process_event(self, event: Dict[str, Any]) -> Dict[str, Any]:
         self.event_history.append({
             'timestamp': datetime.now().isoformat(),
             'event': event
@@ -105,7 +117,8 @@ class GameMaster:
                 reaction = {
                     'agent_id': agent_id,
                     'agent_name': agent_data['name'],
-                    'lora_adapter': agent_data['lora_adapter'],
+                    'archetype': agent_data['archetype'],
+                    'lora_adapter': adapter_for(agent_data),
                     'prompt': self._generate_prompt(agent_data, event),
                     'context': self._get_agent_context(agent_id)
                 }
@@ -117,6 +130,10 @@ class GameMaster:
         """
         Generate contextual prompt for the agent based on event
         """
+        with span("prompt_build"):
+            return self._render_prompt(agent_data, event)
+    
+    def _render_prompt(self, agent_data: Dict, event: Dict) -> str:
         personality = ', '.join(agent_data.get('personality_traits', []))
         
         prompt = f"""You are {agent_data['name']}, a {agent_data['archetype']}.
@@ -150,10 +167,54 @@ Respond with your immediate thought/action (1-2 sentences).
         if not agent_data or 'schedule' not in agent_data:
             return None
         
+        minute = self._parse_clock(time)
         for schedule_item in agent_data['schedule']:
-            return schedule_item
+            start, end = schedule_item['time'].split('-')
+            start, end = self._parse_clock(start), self._parse_clock(end)
+            
+            # Windows such as "18:00-08:00" wrap past midnight
+            if start <= end:
+                if start <= minute < end:
+                    return schedule_item
+            elif minute >= start or minute < end:
+                return schedule_item
         
         return None
+    
+    def get_agent_location(self, agent_id: str, time: Optional[str] = None) -> str:
+        """
+        Where an agent is expected to be at a given time ("HH:MM")
+        Falls back to the agent's configured current_location
+        """
+        if time is not None:
+            schedule_item = self.get_agent_schedule(agent_id, time)
+            if schedule_item:
+                return schedule_item.get('location', '')
+        
+        agent_data = next((a for a in self.agents_config['agents']
+                          if a['id'] == agent_id), None)
+        return agent_data.get('current_location', '') if agent_data else ''
+    
+    def get_state(self) -> Dict[str, Any]:
+        """Mutable world state, JSON-serializable (config is reloaded from disk)"""
+        return {
+            'active_agents': self.active_agents,
+            'event_history': self.event_history
+        }
+    
+    def load_state(self, state: Dict[str, Any]) -> None:
+        """Restore state saved by get_state()"""
+        self.active_agents = state.get('active_agents', {})
+        self.event_history = state.get('event_history', [])
+    
+    @staticmethod
+    def _parse_clock(value: str) -> int:
+        """Convert "HH:MM" into minutes past midnight"""
+        value = value.strip()
+        if not re.match(CLOCK_PATTERN, value):
+            raise ValueError(f"Expected a time as HH:MM, got {value!r}")
+        hours, minutes = value.split(':')
+        return int(hours) * 60 + int(minutes)
 
 
 if __name__ == "__main__":
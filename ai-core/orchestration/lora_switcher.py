@@ -3,31 +3,81 @@ LoRA Switcher - Dynamic Personality Loading
 Hot-swaps LoRA adapters into the base model for character-specific inference
 """
 
+import contextlib
 import os
 import json
-from typing import Dict, Optional
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Dict, Optional, List
 import time
 import logging
 
+from models.adapter_format import MappedAdapter, is_mapped_adapter
+from monitoring.metrics import Histogram, inc, span
+from orchestration.adapter_catalog import AdapterCatalog
+
+logger = logging.getLogger(__name__)
+
 
 class LoRASwitcher:
     """
     Manages dynamic loading/unloading of LoRA adapters
     Enables one base model to portray hundreds of characters
+    
+    The cache is an O(1) LRU bounded by adapter bytes (and optionally by
+    count). It is safe to call from concurrent request threads; concurrent
+    misses on the same adapter share a single load. Adapters held through
+    use_adapter() are pinned and never evicted.
+    
+    With a LatencySimulator (mock backends), loads also take the profile's
+    adapter load time, so cache misses cost what they would on hardware.
     """
     
     def __init__(self, base_model_path: str, lora_directory: str,
-                 max_cache_size: int = 3):
+                 max_cache_size: Optional[int] = None,
+                 max_cache_bytes: int = 1024 * 1024 * 1024,
+                 llm_engine=None, scheduler=None, simulator=None):
         self.base_model_path = base_model_path
         self.lora_directory = lora_directory
         self.max_cache_size = max_cache_size
+        self.max_cache_bytes = max_cache_bytes
+        self.simulator = simulator
+        
+        # Cache of currently loaded adapters, least recently used first
+        self.loaded_adapters: "OrderedDict[str, any]" = OrderedDict()
+        self.adapter_sizes: Dict[str, int] = {}
+        self.cache_bytes = 0
+        
+        self._lock = threading.RLock()
+        self._loading: Dict[str, threading.Event] = {}
+        self._pins: Dict[str, int] = {}
         
-        # Cache of currently loaded adapters
-        self.loaded_adapters: Dict[str, any] = {}
-        self.load_times: Dict[str, float] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.load_time_histogram = Histogram()
+        
+        # Prefetch attribution: adapters warmed ahead of demand that have
+        # not been requested yet, and what became of them
+        self._prefetched_unused: set = set()
+        self.prefetch_loads = 0
+        self.prefetch_hits = 0
+        self.prefetch_wasted = 0
+        self.prefetch_skipped = 0
+        
+        # Directory index and parsed sidecar metadata; changed files are
+        # dropped from the adapter cache as well
+        self.catalog = AdapterCatalog(lora_directory, on_change=self._invalidate)
         
         self.base_model = None
-        logger = logging.getLogger(__name__)
+        if llm_engine is not None:
+            self.llm_engine = llm_engine
+        # Optional BatchScheduler used by submit_response; adapters are
+        # activated when the scheduler runs the request, not at submit time
+        self.scheduler = scheduler
+        if scheduler is not None and scheduler.adapter_context is None:
+            scheduler.adapter_context = self.use_adapter
         logger.info(f"Initialized LoRA switcher: {base_model_path}")
     
     def _get_lora_path(self, adapter_name: str) -> str:
@@ -35,127 +85,291 @@ class LoRASwitcher:
         return os.path.join(self.lora_directory, adapter_name)
     
     def _load_adapter(self, adapter_name: str) -> any:
-        """Load a LoRA adapter from disk"""
-        adapter_path = self._get_lora_path(adapter_name)
-        
-        if not os.path.exists(adapter_path):
-            raise FileNotFoundError(f"LoRA adapter not found: {adapter_path}")
+        """
+        Load a LoRA adapter from disk
+        Files in the mapped adapter format are memory-mapped, so their
+        weights are zero-copy views shared through the OS page cache
+        """
+        info = self.catalog.get(adapter_name)
         
-        import logging
-        logger = logging.getLogger(__name__)
         logger.debug(f"Loading adapter: {adapter_name}")
-        start_time = time.time()
+        start_time = time.perf_counter()
         
-        adapter = {"name": adapter_name, "path": adapter_path}
+        adapter = {
+            "name": adapter_name,
+            "path": info.path,
+            "size_bytes": info.size_bytes,
+            "metadata": self.catalog.load_metadata(adapter_name),
+            "weights": None
+        }
+        
+        if is_mapped_adapter(info.path):
+            adapter["weights"] = MappedAdapter(info.path)
+        if self.simulator is not None:
+            self.simulator.load_adapter(info.size_bytes)
         
-        load_time = time.time() - start_time
+        load_time = time.perf_counter() - start_time
+        self.load_time_histogram.observe(load_time)
         logger.info(f"Loaded {adapter_name} in {load_time:.2f}s")
         
         return adapter
     
-    def _manage_cache(self) -> None:
+    def _over_budget(self) -> bool:
+        if self.cache_bytes > self.max_cache_bytes:
+            return True
+        return (self.max_cache_size is not None
+                and len(self.loaded_adapters) > self.max_cache_size)
+    
+    def _manage_cache(self, keep: Optional[str]) -> None:
         """
-        Evict least recently used adapter if cache is full
+        Evict least recently used adapters until the cache fits its budget
+        The adapter named by keep (the one just inserted) and pinned
+        adapters are never evicted. Caller must hold self._lock
         """
-        if len(self.loaded_adapters) >= self.max_cache_size:
-            # Find LRU adapter
-            lru_adapter = min(self.load_times.items(), key=lambda x: x[1])[0]
-            print(f"Cache full. Evicting: {lru_adapter}")
-            del self.loaded_adapters[lru_adapter]
-            del self.load_times[lru_adapter]
+        while self._over_budget():
+            victim = next((name for name in self.loaded_adapters
+                           if name != keep and not self._pins.get(name)), None)
+            if victim is None:
+                break
+            self._evict(victim)
+        
+        if self._over_budget() and keep is not None:
+            logger.warning(f"Cache over budget after loading {keep}; "
+                           f"remaining adapters are pinned")
+    
+    def _evict(self, adapter_name: str) -> None:
+        """Drop one adapter from the cache. Caller must hold self._lock"""
+        logger.debug(f"Cache full. Evicting: {adapter_name}")
+        del self.loaded_adapters[adapter_name]
+        self.cache_bytes -= self.adapter_sizes.pop(adapter_name, 0)
+        self.evictions += 1
+        if adapter_name in self._prefetched_unused:
+            self._prefetched_unused.discard(adapter_name)
+            self.prefetch_wasted += 1
     
     def get_adapter(self, adapter_name: str) -> any:
         """
         Get a LoRA adapter, loading it if necessary
         Uses LRU caching to keep hot adapters in memory
         """
-        # Check if already loaded
-        if adapter_name in self.loaded_adapters:
-            print(f"Cache hit: {adapter_name}")
-            self.load_times[adapter_name] = time.time()
-            return self.loaded_adapters[adapter_name]
+        with span("adapter_fetch"):
+            return self._fetch(adapter_name, prefetch=False)
+    
+    @contextlib.contextmanager
+    def use_adapter(self, adapter_name: str):
+        """Fetch an adapter and pin it in the cache for the block's duration"""
+        with self._lock:
+            self._pins[adapter_name] = self._pins.get(adapter_name, 0) + 1
+        try:
+            yield self.get_adapter(adapter_name)
+        finally:
+            with self._lock:
+                self._pins[adapter_name] -= 1
+                if not self._pins[adapter_name]:
+                    del self._pins[adapter_name]
+                self._manage_cache(keep=None)
+    
+    def prefetch(self, adapter_name: str) -> bool:
+        """
+        Warm an adapter ahead of demand without evicting pinned adapters
+        Returns True if the adapter was loaded by this call
+        """
+        try:
+            size = self.catalog.get(adapter_name).size_bytes
+        except FileNotFoundError as e:
+            logger.warning(f"Cannot prefetch: {e}")
+            return False
+        
+        with self._lock:
+            if adapter_name in self.loaded_adapters or adapter_name in self._loading:
+                return False
+            
+            pinned_bytes = sum(self.adapter_sizes.get(name, 0) for name in self._pins)
+            fits_bytes = pinned_bytes + size <= self.max_cache_bytes
+            fits_count = (self.max_cache_size is None
+                          or len(self._pins) < self.max_cache_size)
+            if not (fits_bytes and fits_count):
+                self.prefetch_skipped += 1
+                return False
+        
+        self._fetch(adapter_name, prefetch=True)
+        return True
+    
+    def _fetch(self, adapter_name: str, prefetch: bool) -> any:
+        with self._lock:
+            # Check if already loaded
+            if adapter_name in self.loaded_adapters:
+                if not prefetch:
+                    self.hits += 1
+                    inc("spector_cache_requests_total", cache="adapter", result="hit")
+                    if adapter_name in self._prefetched_unused:
+                        self._prefetched_unused.discard(adapter_name)
+                        self.prefetch_hits += 1
+                self.loaded_adapters.move_to_end(adapter_name)
+                return self.loaded_adapters[adapter_name]
+            
+            pending = self._loading.get(adapter_name)
+            if pending is None:
+                # Cache miss - this thread loads it
+                if prefetch:
+                    self.prefetch_loads += 1
+                else:
+                    self.misses += 1
+                    inc("spector_cache_requests_total", cache="adapter", result="miss")
+                self._loading[adapter_name] = threading.Event()
         
-        # Cache miss - need to load
-        print(f"Cache miss: {adapter_name}")
-        self._manage_cache()
+        if pending is not None:
+            # Another thread is already loading this adapter
+            pending.wait()
+            return self._fetch(adapter_name, prefetch)
         
-        adapter = self._load_adapter(adapter_name)
-        self.loaded_adapters[adapter_name] = adapter
-        self.load_times[adapter_name] = time.time()
+        logger.debug(f"Cache miss: {adapter_name}")
+        try:
+            adapter = self._load_adapter(adapter_name)
+            with self._lock:
+                self.loaded_adapters[adapter_name] = adapter
+                self.adapter_sizes[adapter_name] = adapter.get("size_bytes", 0)
+                self.cache_bytes += self.adapter_sizes[adapter_name]
+                if prefetch:
+                    self._prefetched_unused.add(adapter_name)
+                self._manage_cache(keep=adapter_name)
+        finally:
+            with self._lock:
+                self._loading.pop(adapter_name).set()
         
         return adapter
     
-    def preload_adapters(self, adapter_names: list[str]) -> None:
+    def _invalidate(self, adapter_name: str) -> None:
+        """Drop an adapter whose file changed on disk"""
+        with self._lock:
+            if adapter_name in self.loaded_adapters and not self._pins.get(adapter_name):
+                self._evict(adapter_name)
+    
+    def is_adapter_loaded(self, adapter_name: str) -> bool:
+        """Check whether an adapter is currently cached"""
+        return adapter_name in self.loaded_adapters
+    
+    def preload_adapters(self, adapter_names: List[str]) -> None:
         """
         Pre-fetch adapters into cache
         Useful for predictive loading (e.g., when player approaches NPCs)
         """
-        print(f"Pre-loading {len(adapter_names)} adapters...")
+        logger.info(f"Pre-loading {len(adapter_names)} adapters...")
         for adapter_name in adapter_names:
             if adapter_name not in self.loaded_adapters:
                 try:
                     self.get_adapter(adapter_name)
                 except FileNotFoundError as e:
-                    print(f"Warning: {e}")
+                    logger.warning(str(e))
     
     def generate_response(self, adapter_name: str, prompt: str,
                          max_tokens: int = 100,
-                         temperature: float = 0.7) -> str:
+                         temperature: float = 0.7,
+                         use_cache: Optional[bool] = None) -> str:
         """
         Generate text using the specified LoRA adapter
         """
-        adapter = self.get_adapter(adapter_name)
-        
         # Load LLM engine if not already loaded
         if not hasattr(self, 'llm_engine'):
             from models.llm_engine import LLMEngine
             self.llm_engine = LLMEngine()
         
-        # Get character metadata if available
-        character_context = ""
-        metadata_path = self._get_lora_path(adapter_name).replace('.lora', '.json')
-        if os.path.exists(metadata_path):
-            import json
-            with open(metadata_path) as f:
-                metadata = json.load(f)
-                traits = metadata.get('traits', [])
-                if traits:
-                    character_context = f"Character traits: {', '.join(traits)}. "
-        
-        # Enhance prompt with character context
-        enhanced_prompt = f"{character_context}{prompt}"
-        
-        # Generate response
-        response = self.llm_engine.generate(
-            enhanced_prompt,
-            max_tokens=max_tokens,
-            temperature=temperature
-        )
+        with span("generate_response"), self.use_adapter(adapter_name) as adapter:
+            enhanced_prompt = self._character_prompt(adapter_name, prompt)
+            
+            # Generate response
+            response = self.llm_engine.generate(
+                enhanced_prompt,
+                max_tokens=max_tokens,
+                temperature=temperature,
+                use_cache=use_cache,
+                adapter=adapter
+            )
         
         return response
     
+    def submit_response(self, adapter_name: str, prompt: str,
+                        max_tokens: int = 100,
+                        temperature: float = 0.7,
+                        priority: Optional[str] = None,
+                        deadline_ms: Optional[float] = None,
+                        on_expire: str = "drop",
+                        budget_ms: Optional[float] = None,
+                        archetype: Optional[str] = None,
+                        use_cache: Optional[bool] = None) -> Future:
+        """
+        Queue a generation on the attached scheduler
+        Returns a Future; without a scheduler the work runs inline and the
+        scheduling arguments (priority, deadline, budget) do not apply.
+        use_cache sets the generation cache policy (see LLMEngine.generate)
+        """
+        if self.scheduler is None:
+            future = Future()
+            try:
+                future.set_result(self.generate_response(
+                    adapter_name, prompt, max_tokens, temperature, use_cache))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+        
+        return self.scheduler.submit(
+            self._character_prompt(adapter_name, prompt),
+            max_tokens=max_tokens,
+            temperature=temperature,
+            adapter=adapter_name,
+            priority=priority,
+            deadline_ms=deadline_ms,
+            on_expire=on_expire,
+            budget_ms=budget_ms,
+            archetype=archetype,
+            use_cache=use_cache
+        )
+    
+    def _character_prompt(self, adapter_name: str, prompt: str) -> str:
+        """Prefix the prompt with the adapter's pre-rendered character traits"""
+        return f"{self.catalog.prompt_prefix(adapter_name)}{prompt}"
+    
     def get_cache_status(self) -> Dict[str, any]:
         """Get current cache statistics"""
-        return {
-            'loaded_adapters': list(self.loaded_adapters.keys()),
-            'cache_size': len(self.loaded_adapters),
-            'max_cache_size': self.max_cache_size,
-            'utilization': len(self.loaded_adapters) / self.max_cache_size
-        }
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'loaded_adapters': list(self.loaded_adapters.keys()),
+                'cache_size': len(self.loaded_adapters),
+                'max_cache_size': self.max_cache_size,
+                'cache_bytes': self.cache_bytes,
+                'max_cache_bytes': self.max_cache_bytes,
+                'utilization': self.cache_bytes / self.max_cache_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'pinned_adapters': list(self._pins.keys()),
+                'load_time_ms': self.load_time_histogram.to_dict(unit="ms", scale=1000.0),
+                'prefetch': {
+                    'loads': self.prefetch_loads,
+                    'misses_avoided': self.prefetch_hits,
+                    'wasted': self.prefetch_wasted,
+                    'skipped': self.prefetch_skipped,
+                    'pending_use': len(self._prefetched_unused)
+                }
+            }
     
     def clear_cache(self) -> None:
         """Clear all loaded adapters from cache"""
-        print("Clearing adapter cache...")
-        self.loaded_adapters.clear()
-        self.load_times.clear()
-
+        logger.info("Clearing adapter cache...")
+        with self._lock:
+            self.loaded_adapters.clear()
+            self.adapter_sizes.clear()
+            self._prefetched_unused.clear()
+            self.cache_bytes = 0
 
 if __name__ == "__main__":
     # Example usage
     switcher = LoRASwitcher(
         base_model_path="models/base/llama-3-8b-quantized",
         lora_directory="models/loras",
-        max_cache_size=3
+        max_cache_bytes=512 * 1024 * 1024
     )
     
     # Simulate loading different character adapters
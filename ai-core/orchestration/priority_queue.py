@@ -0,0 +1,112 @@
+"""
+Priority Request Queue
+Serves player-facing generations ahead of background NPC reactions
+"""
+
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from models.batch_scheduler import FifoRequestQueue
+
+DIALOGUE = "dialogue"
+AMBIENT = "ambient"
+
+
+class PriorityRequestQueue:
+    """
+    Request queue for BatchScheduler with strict priority classes
+
+    Each class has its own sub-queue (FIFO or adapter-grouped, via
+    queue_factory), and batches never mix classes. A batch always comes
+    from the highest class with work, so a queued dialogue line jumps
+    every waiting ambient reaction. Lower classes cannot starve: once a
+    class's oldest request has waited longer than its max_age_ms, it is
+    served next. Keep max_age_ms well inside the class's request deadline
+    (the default is half the ambient deadline in main_api), or promoted
+    requests are already expired when a worker reaches them. batch_limits
+    caps batch size per class so a worker busy with background work comes
+    back to the queue quickly.
+    """
+
+    def __init__(self, classes: Sequence[str] = (DIALOGUE, AMBIENT),
+                 queue_factory: Callable[[], Any] = FifoRequestQueue,
+                 max_age_ms: Optional[Dict[str, float]] = None,
+                 batch_limits: Optional[Dict[str, int]] = None):
+        self.classes = list(classes)
+        self._queues = {name: queue_factory() for name in self.classes}
+        self.max_age = {name: ms / 1000.0
+                        for name, ms in (max_age_ms or {AMBIENT: 1500.0}).items()}
+        self.batch_limits = batch_limits if batch_limits is not None else {AMBIENT: 2}
+
+        self.served = {name: 0 for name in self.classes}
+        self.starvation_overrides = 0
+
+    @property
+    def is_hot(self) -> Optional[Callable[[str], bool]]:
+        return getattr(self._queues[self.classes[0]], 'is_hot', None)
+
+    @is_hot.setter
+    def is_hot(self, value: Optional[Callable[[str], bool]]) -> None:
+        # Forward to adapter-aware sub-queues
+        for queue in self._queues.values():
+            if hasattr(queue, 'is_hot'):
+                queue.is_hot = value
+
+    def _class_of(self, request) -> str:
+        priority = getattr(request, 'priority', None)
+        # Unknown classes are treated as the lowest priority
+        return priority if priority in self._queues else self.classes[-1]
+
+    def push(self, request) -> None:
+        self._queues[self._class_of(request)].push(request)
+
+    def pop_batch(self, max_size: int) -> List[Any]:
+        name = self._select_class()
+        if name is None:
+            return []
+
+        limit = min(max_size, self.batch_limits.get(name, max_size))
+        batch = self._queues[name].pop_batch(limit)
+        self.served[name] += len(batch)
+        return batch
+
+    def _select_class(self) -> Optional[str]:
+        waiting = [name for name in self.classes if len(self._queues[name])]
+        if not waiting:
+            return None
+
+        now = time.monotonic()
+        for name in waiting[1:]:
+            limit = self.max_age.get(name)
+            oldest = self._queues[name].oldest_enqueued_at()
+            if limit is not None and oldest is not None and now - oldest > limit:
+                self.starvation_overrides += 1
+                return name
+
+        return waiting[0]
+
+    def oldest_enqueued_at(self) -> Optional[float]:
+        times = [q.oldest_enqueued_at() for q in self._queues.values() if len(q)]
+        return min(times) if times else None
+
+    def depth(self, name: str) -> int:
+        return len(self._queues[name])
+
+    def depth_ahead(self, priority: Optional[str]) -> int:
+        """Requests that would be served before a new one of this class"""
+        rank = self.classes.index(priority if priority in self._queues else self.classes[-1])
+        return sum(len(self._queues[name]) for name in self.classes[:rank + 1])
+
+    def __len__(self) -> int:
+        return sum(len(q) for q in self._queues.values())
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'policy': 'priority',
+            'depth': len(self),
+            'classes': {
+                name: {**self._queues[name].get_stats(), 'served': self.served[name]}
+                for name in self.classes
+            },
+            'starvation_overrides': self.starvation_overrides
+        }
@@ -8,6 +8,9 @@ import json
 import logging
 from typing import List, Dict, Any, Optional
 from datetime import datetime
+from pathlib import Path
+
+from monitoring.metrics import span
 
 logger = logging.getLogger(__name__)
 
@@ -16,18 +19,88 @@ class RAGEngine:
     """
     Retrieval engine using SQLite FTS5 for text search
     Falls back gracefully when embedding models aren't available
+    
+    With template_db, db_path only holds this world's own writes: the
+    template is attached read-only and temp views of the written tables
+    (OVERLAY_TABLES) show the template's rows as of the first open plus
+    the local ones, so a world built on a large seeded database costs
+    nothing until it stores memories. Every other table is read from the
+    template directly.
     """
     
-    def __init__(self, db_path: str = "memory/vector_db/spector.db"):
+    OVERLAY_TABLES = ("episodic_memory", "world_objects")
+    
+    def __init__(self, db_path: str = "memory/vector_db/spector.db",
+                 template_db: Optional[str] = None):
         self.db_path = db_path
+        self.template_db = template_db
         try:
-            self.conn = sqlite3.connect(db_path, check_same_thread=False)
+            self.conn = sqlite3.connect(db_path, check_same_thread=False,
+                                        uri=bool(template_db))
             self.conn.row_factory = sqlite3.Row
+            if template_db:
+                self._attach_template(template_db)
             logger.info(f"Connected to database: {db_path}")
         except sqlite3.Error as e:
             logger.error(f"Database connection failed: {e}")
             raise
     
+    def _attach_template(self, template_db: str) -> None:
+        """Layer this database over a read-only template (see class docstring)"""
+        cursor = self.conn.cursor()
+        cursor.execute("ATTACH DATABASE ? AS template",
+                       (Path(template_db).resolve().as_uri() + "?mode=ro",))
+        local = {row[0] for row in cursor.execute(
+            "SELECT name FROM main.sqlite_master WHERE type = 'table'")}
+        
+        if "template_snapshot" not in local:
+            if "episodic_memory" in local:
+                # A full copy of the template from before overlays
+                cursor.execute("DETACH DATABASE template")
+                return
+            self._create_overlay(cursor)
+        
+        bounds = dict(cursor.execute(
+            "SELECT table_name, max_rowid FROM main.template_snapshot").fetchall())
+        for table in self.OVERLAY_TABLES:
+            # Local rows shadow template rows with the same key
+            cursor.execute(f"""
+                CREATE TEMP VIEW {table} AS
+                SELECT * FROM main.{table}
+                UNION ALL
+                SELECT * FROM template.{table}
+                WHERE rowid <= {int(bounds[table])}
+                AND id NOT IN (SELECT id FROM main.{table})
+            """)
+    
+    def _create_overlay(self, cursor: sqlite3.Cursor) -> None:
+        """Empty copies of the overlay tables and the template's extent"""
+        with self.conn:
+            cursor.execute("""
+                CREATE TABLE main.template_snapshot (
+                    table_name TEXT PRIMARY KEY,
+                    max_rowid INTEGER NOT NULL
+                )
+            """)
+            for table in self.OVERLAY_TABLES:
+                statements = cursor.execute("""
+                    SELECT sql FROM template.sqlite_master
+                    WHERE tbl_name = ? AND sql IS NOT NULL
+                    ORDER BY type = 'index'
+                """, (table,)).fetchall()
+                for (sql,) in statements:
+                    cursor.execute(sql)
+                max_rowid = cursor.execute(
+                    f"SELECT COALESCE(MAX(rowid), 0) FROM template.{table}").fetchone()[0]
+                cursor.execute("INSERT INTO main.template_snapshot VALUES (?, ?)",
+                               (table, max_rowid))
+            # New memory ids continue after the template's
+            cursor.execute("""
+                INSERT INTO main.sqlite_sequence (name, seq)
+                SELECT table_name, max_rowid FROM main.template_snapshot
+                WHERE table_name = 'episodic_memory'
+            """)
+    
     def store_memory(self, agent_id: str, event_description: str,
                     event_type: str = "observation",
                     location: str = None,
@@ -37,7 +110,7 @@ class RAGEngine:
         
         try:
             cursor.execute("""
-                INSERT INTO episodic_memory 
+                INSERT INTO main.episodic_memory 
                 (agent_id, event_type, event_description, location, importance_score)
                 VALUES (?, ?, ?, ?, ?)
             """, (agent_id, event_type, event_description, location, importance_score))
@@ -77,7 +150,8 @@ class RAGEngine:
         params.append(top_k)
         
         try:
-            results = cursor.execute(sql, params).fetchall()
+            with span("rag_retrieval"):
+                results = cursor.execute(sql, params).fetchall()
             return [dict(row) for row in results]
         except sqlite3.Error as e:
             logger.error(f"Failed to retrieve memories: {e}")
@@ -86,6 +160,11 @@ class RAGEngine:
     def get_agent_context(self, agent_id: str, current_event: str,
                          max_memories: int = 5) -> Dict[str, Any]:
         """Get comprehensive context for an agent"""
+        with span("rag_context"):
+            return self._build_agent_context(agent_id, current_event, max_memories)
+    
+    def _build_agent_context(self, agent_id: str, current_event: str,
+                             max_memories: int) -> Dict[str, Any]:
         memories = self.retrieve_memories(
             query=current_event,
             agent_id=agent_id,
@@ -135,7 +214,7 @@ class RAGEngine:
         
         try:
             cursor.execute("""
-                INSERT OR REPLACE INTO world_objects
+                INSERT OR REPLACE INTO main.world_objects
                 (id, name, description, current_location, significance_score, first_mentioned_at)
                 VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
             """, (object_id, name, description, location, significance_score))
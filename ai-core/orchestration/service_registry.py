@@ -0,0 +1,148 @@
+"""
+Service Registry - Lazy, Parallel Service Initialization
+Builds backend services off the request path and tracks their readiness
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+INITIALIZING = "initializing"
+WARMING = "warming"
+READY = "ready"
+FAILED = "failed"
+
+
+class ServiceUnavailable(RuntimeError):
+    """A service failed to initialize"""
+
+
+@dataclass
+class _Service:
+    name: str
+    factory: Callable[[], Any]
+    eager: bool
+    warmup: Optional[Callable[[Any], None]]
+    state: str = PENDING
+    instance: Any = None
+    error: Optional[str] = None
+    init_seconds: Optional[float] = None
+    warmup_seconds: Optional[float] = None
+
+
+class ServiceRegistry:
+    """
+    Named service factories with on-demand construction
+
+    Eager services are built in parallel on a background pool by start(),
+    so the server can bind and answer liveness checks immediately. Lazy
+    services (e.g. Whisper, which most traffic never needs) are built the
+    first time get() asks for them. Factories may call get() for their
+    own dependencies; that simply blocks until the dependency is ready.
+    """
+
+    def __init__(self):
+        self._services: Dict[str, _Service] = {}
+        self._cond = threading.Condition()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.warmup_enabled = False
+
+    def register(self, name: str, factory: Callable[[], Any], eager: bool = True,
+                 warmup: Optional[Callable[[Any], None]] = None) -> None:
+        self._services[name] = _Service(name, factory, eager, warmup)
+
+    def start(self, warmup: bool = False) -> None:
+        """Begin building every eager service in parallel (non-blocking)"""
+        self.warmup_enabled = warmup
+        eager = [s.name for s in self._services.values() if s.eager]
+        # One thread per service so dependency waits can never deadlock
+        self._executor = ThreadPoolExecutor(max_workers=max(1, len(eager)),
+                                            thread_name_prefix="service-init")
+        for name in eager:
+            self._executor.submit(self._safe_initialize, name)
+
+    def _safe_initialize(self, name: str) -> None:
+        try:
+            self.get(name)
+        except ServiceUnavailable:
+            pass
+
+    def get(self, name: str) -> Any:
+        """Return a ready service, constructing it now if nobody has yet"""
+        service = self._services[name]
+
+        with self._cond:
+            while service.state in (INITIALIZING, WARMING):
+                self._cond.wait()
+            if service.state == READY:
+                return service.instance
+            if service.state == FAILED:
+                raise ServiceUnavailable(f"{name} failed to initialize: {service.error}")
+            service.state = INITIALIZING
+
+        logger.info(f"Initializing {name}...")
+        start = time.perf_counter()
+        try:
+            instance = service.factory()
+        except Exception as e:
+            logger.error(f"{name} initialization failed: {e}")
+            with self._cond:
+                service.state = FAILED
+                service.error = str(e)
+                self._cond.notify_all()
+            raise ServiceUnavailable(f"{name} failed to initialize: {e}") from e
+
+        service.init_seconds = time.perf_counter() - start
+        logger.info(f"✓ {name} ready in {service.init_seconds:.2f}s")
+
+        if self.warmup_enabled and service.warmup:
+            with self._cond:
+                service.state = WARMING
+            start = time.perf_counter()
+            try:
+                service.warmup(instance)
+            except Exception as e:
+                # A failed warmup only costs the first request its speed
+                logger.warning(f"{name} warmup failed: {e}")
+            service.warmup_seconds = time.perf_counter() - start
+
+        with self._cond:
+            service.instance = instance
+            service.state = READY
+            self._cond.notify_all()
+
+        return instance
+
+    def peek(self, name: str) -> Any:
+        """Return the instance if it has been built, without building it"""
+        service = self._services.get(name)
+        return service.instance if service and service.state == READY else None
+
+    def is_ready(self) -> bool:
+        """True once every eager service is ready"""
+        return all(s.state == READY for s in self._services.values() if s.eager)
+
+    def status(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            s.name: {
+                'state': s.state,
+                'eager': s.eager,
+                'init_seconds': s.init_seconds,
+                'warmup_seconds': s.warmup_seconds,
+                'error': s.error
+            }
+            for s in self._services.values()
+        }
+
+    def names(self) -> List[str]:
+        return list(self._services)
+
+    def shutdown(self) -> None:
+        if self._executor:
+            self._executor.shutdown(wait=False)
@@ -0,0 +1,402 @@
+"""
+Session Manager - Isolated Worlds on a Shared Runtime
+Gives each game session its own Game Master state and memory database
+"""
+
+import contextlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+from orchestration.game_master import GameMaster
+from orchestration.rag_engine import RAGEngine
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SESSION = "default"
+SESSION_ID = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+
+class SessionLimitReached(RuntimeError):
+    """Every session slot is held by a session with requests in flight"""
+
+
+class SessionQuotaExceeded(RuntimeError):
+    """A session asked for more generations than its quota allows"""
+
+
+@dataclass
+class WorldSession:
+    """One match's world: its Game Master and memory database"""
+    session_id: str
+    game_master: Any
+    rag_engine: Any
+    directory: Optional[Path] = None
+    restored: bool = False
+    created_at: float = field(default_factory=time.monotonic)
+    last_used: float = field(default_factory=time.monotonic)
+    active_requests: int = 0
+    inflight_generations: int = 0
+    generations: int = 0
+    rejected: int = 0
+    # Generations-per-minute token bucket
+    tokens: float = 0.0
+    refilled_at: float = field(default_factory=time.monotonic)
+
+    def get_stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        return {
+            'age_seconds': round(now - self.created_at, 1),
+            'idle_seconds': round(now - self.last_used, 1) if not self.active_requests else 0.0,
+            'active_requests': self.active_requests,
+            'inflight_generations': self.inflight_generations,
+            'generations': self.generations,
+            'rejected': self.rejected,
+            'restored': self.restored,
+            'events': len(self.game_master.event_history)
+        }
+
+
+class SessionManager:
+    """
+    Session-scoped worlds sharing one LLM, adapter cache and voice models
+
+    A request names its session; the first request of a session creates
+    <root_dir>/<session_id>/ with a fresh Game Master and a memory database
+    layered over the template (RAGEngine template_db): the session file
+    holds only the memories the session stores, and the template's rows
+    as of that first request are read in place, so opening a session
+    costs the same for a seeded multi-million-memory world as for an
+    empty one. Sessions are pinned while requests use them
+    (acquire/release or use()). Sessions idle for idle_timeout_s, or the
+    least recently used idle one when max_sessions are open, are evicted:
+    Game Master state is written to state.json and the database closed,
+    and the next request for the session restores both. The default
+    session is the server's own world and is never evicted.
+
+    Quotas are per session: at most max_inflight_generations queued or
+    running at once, and optionally generations_per_minute (a token
+    bucket allowing bursts of a minute's worth). The default world is not
+    limited, so clients that never name a session behave as before.
+    """
+
+    STATE_FILE = "state.json"
+    DB_FILE = "memory.db"
+
+    def __init__(self, root_dir: str, template_db: str,
+                 default_game_master=None, default_rag_engine=None,
+                 game_master_factory: Callable[[], Any] = GameMaster,
+                 rag_factory: Callable[..., Any] = RAGEngine,
+                 max_sessions: int = 64, idle_timeout_s: float = 900.0,
+                 max_inflight_generations: Optional[int] = 32,
+                 generations_per_minute: Optional[float] = None,
+                 sweep_interval_s: float = 30.0):
+        self.root_dir = Path(root_dir)
+        self.template_db = template_db
+        self.game_master_factory = game_master_factory
+        self.rag_factory = rag_factory
+        self.max_sessions = max_sessions
+        self.idle_timeout_s = idle_timeout_s
+        self.max_inflight_generations = max_inflight_generations
+        self.generations_per_minute = generations_per_minute
+        self.sweep_interval_s = sweep_interval_s
+
+        self._sessions: Dict[str, WorldSession] = {}
+        self._opening: Dict[str, threading.Event] = {}
+        # Evicted sessions still being written out; reopening waits for them
+        self._closing: Dict[str, threading.Event] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self.default = None
+        if default_game_master is not None:
+            self.default = WorldSession(DEFAULT_SESSION, default_game_master,
+                                        default_rag_engine)
+            self._refill(self.default, full=True)
+
+        self.opened = 0
+        self.restored = 0
+        self.evictions = 0
+        self.limit_rejections = 0
+
+    def start(self) -> None:
+        """Begin sweeping idle sessions in the background"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._sweep_loop, name="session-sweeper",
+                                        daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop sweeping and persist every open session"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        with self._lock:
+            evicted = [self._detach(session_id) for session_id in list(self._sessions)]
+        for world in evicted:
+            self._close(world)
+
+    def _sweep_loop(self) -> None:
+        while not self._stop.wait(self.sweep_interval_s):
+            try:
+                self.sweep()
+            except Exception as e:
+                logger.error(f"Session sweep failed: {e}")
+
+    def sweep(self) -> int:
+        """Evict sessions idle for longer than idle_timeout_s"""
+        cutoff = time.monotonic() - self.idle_timeout_s
+        with self._lock:
+            idle = [self._detach(world.session_id) for world in list(self._sessions.values())
+                    if not world.active_requests and world.last_used < cutoff]
+        for world in idle:
+            self._close(world)
+        return len(idle)
+
+    @staticmethod
+    def resolve_id(session_id: Optional[str]) -> str:
+        """Validate a client-supplied session id (None means the default world)"""
+        if not session_id:
+            return DEFAULT_SESSION
+        if not SESSION_ID.match(session_id):
+            raise ValueError("Session ids are 1-64 letters, digits, '-' or '_'")
+        return session_id
+
+    def acquire(self, session_id: Optional[str]) -> WorldSession:
+        """
+        The session's world, opened or restored if needed, pinned until
+        release(); concurrent first requests share one open
+        """
+        session_id = self.resolve_id(session_id)
+        if session_id == DEFAULT_SESSION and self.default is not None:
+            with self._lock:
+                self.default.active_requests += 1
+                self.default.last_used = time.monotonic()
+            return self.default
+
+        while True:
+            with self._lock:
+                world = self._sessions.get(session_id)
+                if world is not None:
+                    world.active_requests += 1
+                    world.last_used = time.monotonic()
+                    return world
+                # Wait out an open in progress, or this session's own eviction
+                # (its state file is still being written)
+                pending = self._opening.get(session_id) or self._closing.get(session_id)
+                if pending is None:
+                    evicted = self._make_room()
+                    self._opening[session_id] = threading.Event()
+                    break
+            pending.wait()
+
+        try:
+            if evicted is not None:
+                self._close(evicted)
+            world = self._open(session_id)
+        except Exception:
+            with self._lock:
+                self._opening.pop(session_id).set()
+            raise
+
+        with self._lock:
+            world.active_requests = 1
+            self._sessions[session_id] = world
+            self._opening.pop(session_id).set()
+        return world
+
+    def release(self, world: WorldSession) -> None:
+        with self._lock:
+            world.active_requests -= 1
+            world.last_used = time.monotonic()
+
+    @contextlib.contextmanager
+    def use(self, session_id: Optional[str]):
+        world = self.acquire(session_id)
+        try:
+            yield world
+        finally:
+            self.release(world)
+
+    def _make_room(self) -> Optional[WorldSession]:
+        """
+        Detach the least recently used idle session if every slot is taken;
+        call with the lock held and _close() what it returns after releasing it
+        """
+        if len(self._sessions) + len(self._opening) < self.max_sessions:
+            return None
+        idle = [world for world in self._sessions.values() if not world.active_requests]
+        if not idle:
+            self.limit_rejections += 1
+            raise SessionLimitReached(
+                f"All {self.max_sessions} sessions have requests in flight")
+        return self._detach(min(idle, key=lambda world: world.last_used).session_id)
+
+    def _open(self, session_id: str) -> WorldSession:
+        if not os.path.exists(self.template_db):
+            raise FileNotFoundError(f"Template database not found: {self.template_db}")
+        directory = self.root_dir / session_id
+        directory.mkdir(parents=True, exist_ok=True)
+        db_path = directory / self.DB_FILE
+
+        game_master = self.game_master_factory()
+        state_path = directory / self.STATE_FILE
+        restored = state_path.exists()
+        if restored:
+            with open(state_path, 'r', encoding='utf-8') as f:
+                game_master.load_state(json.load(f))
+
+        rag_engine = self.rag_factory(str(db_path), template_db=self.template_db)
+        world = WorldSession(session_id, game_master, rag_engine,
+                             directory=directory, restored=restored)
+        self._refill(world, full=True)
+        with self._lock:
+            if restored:
+                self.restored += 1
+            else:
+                self.opened += 1
+        logger.info(f"{'Restored' if restored else 'Opened'} session {session_id}")
+        return world
+
+    def _detach(self, session_id: str) -> WorldSession:
+        """
+        Take a session out of the open set; call with the lock held, then
+        _close() it without the lock so other sessions are not held up by
+        its file I/O
+        """
+        world = self._sessions.pop(session_id)
+        self._closing[session_id] = threading.Event()
+        self.evictions += 1
+        return world
+
+    def _close(self, world: WorldSession) -> None:
+        """Persist and close a detached session"""
+        session_id = world.session_id
+        state_path = world.directory / self.STATE_FILE
+        tmp_path = state_path.with_suffix(state_path.suffix + '.tmp')
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(world.game_master.get_state(), f)
+            os.replace(tmp_path, state_path)
+        except (OSError, TypeError, ValueError) as e:
+            logger.error(f"Failed to save session {session_id}: {e}")
+        try:
+            world.rag_engine.close()
+        finally:
+            with self._lock:
+                self._closing.pop(session_id).set()
+        logger.info(f"Evicted session {session_id} after "
+                    f"{time.monotonic() - world.last_used:.0f}s idle")
+
+    def evict(self, session_id: str) -> bool:
+        """Persist and close an idle session now; False if open requests hold it"""
+        session_id = self.resolve_id(session_id)
+        with self._lock:
+            world = self._sessions.get(session_id)
+            if world is None or world.active_requests:
+                return False
+            self._detach(session_id)
+        self._close(world)
+        return True
+
+    def _refill(self, world: WorldSession, full: bool = False) -> None:
+        if not self.generations_per_minute:
+            return
+        now = time.monotonic()
+        if full:
+            world.tokens = self.generations_per_minute
+        else:
+            world.tokens = min(self.generations_per_minute,
+                               world.tokens + (now - world.refilled_at)
+                               * self.generations_per_minute / 60.0)
+        world.refilled_at = now
+
+    def _check_quota(self, world: WorldSession, count: int) -> None:
+        """Take count generations from the session's quota; call with the lock held"""
+        limit = self.max_inflight_generations
+        if limit is not None and world.inflight_generations + count > limit:
+            world.rejected += count
+            raise SessionQuotaExceeded(
+                f"Session {world.session_id} cannot start {count} generations with "
+                f"{world.inflight_generations} in flight (limit {limit})")
+        if self.generations_per_minute:
+            self._refill(world)
+            if world.tokens < count:
+                world.rejected += count
+                raise SessionQuotaExceeded(
+                    f"Session {world.session_id} is over "
+                    f"{self.generations_per_minute:g} generations per minute")
+            world.tokens -= count
+
+    @contextlib.contextmanager
+    def generations(self, world: WorldSession, count: int = 1):
+        """
+        Hold count generations of the session's quota while they run
+        Raises SessionQuotaExceeded (before anything is queued) if they
+        would exceed it; the default world only counts them
+        """
+        with self._lock:
+            if world is not self.default:
+                self._check_quota(world, count)
+            world.inflight_generations += count
+            world.generations += count
+        try:
+            yield
+        finally:
+            with self._lock:
+                world.inflight_generations -= count
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            sessions = {session_id: world.get_stats()
+                        for session_id, world in self._sessions.items()}
+            if self.default is not None:
+                sessions[DEFAULT_SESSION] = self.default.get_stats()
+            return {
+                'open': len(self._sessions),
+                'max_sessions': self.max_sessions,
+                'idle_timeout_s': self.idle_timeout_s,
+                'max_inflight_generations': self.max_inflight_generations,
+                'generations_per_minute': self.generations_per_minute,
+                'opened': self.opened,
+                'restored': self.restored,
+                'evictions': self.evictions,
+                'limit_rejections': self.limit_rejections,
+                'sessions': sessions
+            }
+
+
+if __name__ == "__main__":
+    import tempfile
+
+    logging.basicConfig(level=logging.INFO)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        template = os.path.join(tmp, "template.db")
+        with open("memory/schema.sql", 'r') as f:
+            sqlite3.connect(template).executescript(f.read()).connection.close()
+
+        sessions = SessionManager(root_dir=os.path.join(tmp, "sessions"), template_db=template,
+                                  max_sessions=1, max_inflight_generations=4)
+        with sessions.use("match_a") as world:
+            world.game_master.process_event({'event_type': 'loud_noise', 'location': 'street'})
+            world.rag_engine.store_memory("baker_01", "Heard glass break on the street")
+        # Opening a second match evicts the idle first one to disk
+        with sessions.use("match_b"):
+            pass
+        with sessions.use("match_a") as world:
+            print(f"match_a restored: {world.restored}, events: {len(world.game_master.event_history)}, "
+                  f"memories: {len(world.rag_engine.retrieve_memories('glass'))}")
+        sessions.stop()
+        print(json.dumps(sessions.get_stats(), indent=2))
@@ -0,0 +1,72 @@
+import json
+import os
+import threading
+import time
+
+import pytest
+
+from orchestration.adapter_catalog import AdapterCatalog
+
+
+def write_adapter(lora_dir, name, traits=None, size=10):
+    (lora_dir / f"{name}.lora").write_bytes(b"\0" * size)
+    if traits is not None:
+        (lora_dir / f"{name}.json").write_text(json.dumps({'traits': traits}))
+
+
+def test_adapters_and_sidecars_are_indexed(tmp_path):
+    write_adapter(tmp_path, "baker", traits=["irritable", "direct"], size=42)
+    write_adapter(tmp_path, "cop")
+    (tmp_path / "notes.txt").write_text("not an adapter")
+    catalog = AdapterCatalog(str(tmp_path))
+
+    assert catalog.list_adapters() == ["baker.lora", "cop.lora"]
+    assert catalog.get("baker.lora").size_bytes == 42
+    assert catalog.prompt_prefix("baker.lora") == "Character traits: irritable, direct. "
+    assert catalog.prompt_prefix("cop.lora") == ""
+
+
+def test_unknown_adapters_fail_fast(tmp_path):
+    catalog = AdapterCatalog(str(tmp_path))
+    with pytest.raises(FileNotFoundError):
+        catalog.get("ghost.lora")
+    assert "ghost.lora" not in catalog
+
+
+def test_rescan_finds_new_and_changed_adapters(tmp_path):
+    write_adapter(tmp_path, "baker", traits=["irritable"])
+    changed = []
+    catalog = AdapterCatalog(str(tmp_path), refresh_interval=0.0, on_change=changed.append)
+    assert catalog.prompt_prefix("baker.lora") == "Character traits: irritable. "
+
+    write_adapter(tmp_path, "cop")
+    sidecar = tmp_path / "baker.json"
+    sidecar.write_text(json.dumps({'traits': ["calm"]}))
+    stat = sidecar.stat()
+    os.utime(sidecar, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+    assert "cop.lora" in catalog
+    assert changed == ["baker.lora"]
+    assert catalog.prompt_prefix("baker.lora") == "Character traits: calm. "
+
+
+def test_concurrent_lookups_share_one_rescan(tmp_path):
+    write_adapter(tmp_path, "baker")
+    catalog = AdapterCatalog(str(tmp_path), refresh_interval=3600.0)
+    scans = []
+    scan = catalog.scan
+
+    def counting_scan():
+        scans.append(threading.current_thread().name)
+        time.sleep(0.05)
+        scan()
+
+    catalog.scan = counting_scan
+    catalog._last_scan -= 3600.0
+    threads = [threading.Thread(target=catalog.get, args=("baker.lora",)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(scans) == 1
@@ -0,0 +1,35 @@
+def test_agents_at_other_locations_are_not_nearby(make_prefetcher):
+    prefetcher, switcher = make_prefetcher()
+
+    assert prefetcher.update_player_location("nowhere_at_all", "10:00") == []
+    prefetcher.stop()
+    assert switcher.prefetched == []
+
+
+def test_agent_at_player_location_warms_its_configured_adapter(make_prefetcher):
+    prefetcher, switcher = make_prefetcher()
+
+    # The baker works in the bakery until noon
+    assert prefetcher.update_player_location("bakery", "10:00") == ["baker.lora"]
+    prefetcher.stop()
+    assert switcher.prefetched == ["baker.lora"]
+
+
+def test_proximity_keeps_closest_candidates_inside_radius(make_prefetcher):
+    prefetcher, _ = make_prefetcher(radius=10.0, max_candidates=2)
+
+    predicted = prefetcher.update_proximity(
+        {'cop_01': 4.0, 'baker_01': 1.0, 'student_01': 6.0, 'landlord_01': 10.0})
+    prefetcher.stop()
+
+    assert predicted == ["baker.lora", "cop.lora"]
+
+
+def test_loaded_adapters_are_not_queued_again(make_prefetcher):
+    prefetcher, switcher = make_prefetcher(loaded={"baker.lora"})
+
+    assert prefetcher.update_proximity({'baker_01': 0.0}) == ["baker.lora"]
+    prefetcher.stop()
+
+    assert switcher.prefetched == []
+    assert prefetcher.already_loaded == 1
@@ -0,0 +1,73 @@
+from models.batch_scheduler import BatchScheduler
+from models.llm_engine import LLMEngine
+from orchestration.adapter_queue import AdapterGroupedQueue
+
+
+def adapters(batch):
+    return [request.adapter for request in batch]
+
+
+def push_all(queue, make_request, names, waited_s=0.0):
+    for name in names:
+        queue.push(make_request(adapter=name, waited_s=waited_s))
+
+
+def test_interleaved_requests_are_served_one_adapter_at_a_time(make_request):
+    queue = AdapterGroupedQueue()
+    push_all(queue, make_request, ["a", "b", "a", "b", "a"])
+
+    assert adapters(queue.pop_batch(8)) == ["a", "a", "a"]
+    assert adapters(queue.pop_batch(8)) == ["b", "b"]
+    assert len(queue) == 0
+
+
+def test_hot_adapters_are_served_before_older_cold_ones(make_request):
+    queue = AdapterGroupedQueue(is_hot=lambda name: name == "hot")
+    push_all(queue, make_request, ["cold", "hot"])
+
+    assert adapters(queue.pop_batch(8)) == ["hot"]
+    assert adapters(queue.pop_batch(8)) == ["cold"]
+
+
+def test_group_run_allowance_lets_other_adapters_in(make_request):
+    queue = AdapterGroupedQueue(max_group_run=2)
+    push_all(queue, make_request, ["a"] * 5 + ["b"])
+
+    assert adapters(queue.pop_batch(8)) == ["a", "a"]
+    assert adapters(queue.pop_batch(8)) == ["b"]
+    assert adapters(queue.pop_batch(8)) == ["a", "a"]
+
+
+def test_starving_group_is_served_next_regardless_of_heat(make_request):
+    queue = AdapterGroupedQueue(max_wait_ms=100.0, is_hot=lambda name: name == "hot")
+    push_all(queue, make_request, ["cold"], waited_s=0.5)
+    push_all(queue, make_request, ["hot"])
+
+    assert adapters(queue.pop_batch(8)) == ["cold"]
+    assert queue.starvation_overrides == 1
+
+
+def test_mixed_batches_fill_spare_slots_from_other_groups(make_request):
+    queue = AdapterGroupedQueue(mixed_batches=True, is_hot=lambda name: name == "c")
+    push_all(queue, make_request, ["a", "b", "a", "c", "d"])
+
+    # The hot group is selected, then the oldest groups fill the rest
+    assert adapters(queue.pop_batch(4)) == ["c", "a", "a", "b"]
+    assert adapters(queue.pop_batch(4)) == ["d"]
+    assert queue.mixed_fills == 3
+
+
+def test_scheduler_reports_the_adapter_switches_engines_made():
+    engine = LLMEngine(model_path=None)
+    engine.supports_per_sequence_lora = lambda: False
+    scheduler = BatchScheduler([engine], max_batch_size=8, max_wait_ms=50.0,
+                               request_queue=AdapterGroupedQueue())
+    futures = [scheduler.submit(f"line {n}", adapter=name)
+               for n, name in enumerate(["a", "b", "a", "b"])]
+    for future in futures:
+        future.result(5.0)
+    swaps = scheduler.get_stats()['adapter_swaps']
+    scheduler.shutdown()
+
+    assert swaps['arrival_order'] == 4
+    assert swaps['actual'] == engine.batch_stats['adapter_switches'] < 4
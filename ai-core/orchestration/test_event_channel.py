@@ -0,0 +1,127 @@
+import asyncio
+import json
+
+from orchestration.event_channel import ChannelCodec, EventChannel
+
+
+class Client:
+    """Feeds frames to a channel and collects what it sends back"""
+
+    def __init__(self, frames, fail_sends=False):
+        self.incoming: asyncio.Queue = asyncio.Queue()
+        for frame in frames:
+            self.incoming.put_nowait(json.dumps(frame))
+        self.sent = []
+        self.fail_sends = fail_sends
+
+    async def receive(self):
+        return await self.incoming.get()
+
+    async def send(self, frame):
+        if self.fail_sends:
+            raise ConnectionError("client went away")
+        self.sent.append(json.loads(frame))
+
+    def close(self):
+        self.incoming.put_nowait(None)
+
+
+async def settle():
+    for _ in range(10):
+        await asyncio.sleep(0)
+
+
+def test_requests_are_dispatched_by_op_and_tagged_with_their_id():
+    async def echo(data, push):
+        await push("ack")
+        return {'echo': data['text']}
+
+    async def scenario():
+        client = Client([{'id': 1, 'op': "echo", 'data': {'text': "hi"}},
+                         {'id': 2, 'op': "nope"},
+                         {'id': 3, 'op': "ping"}])
+        channel = EventChannel(ChannelCodec(), client.send, {'echo': echo})
+        running = asyncio.create_task(channel.run(client.receive))
+        await settle()
+        client.close()
+        await running
+        return client.sent
+
+    sent = asyncio.run(scenario())
+    by_id = {}
+    for message in sent:
+        by_id.setdefault(message['id'], []).append(message)
+
+    assert [m['type'] for m in by_id[1]] == ["ack", "result"]
+    assert by_id[1][-1]['data'] == {'echo': "hi"}
+    assert by_id[2][0]['data']['status'] == 400
+    assert by_id[3][0]['type'] == "pong"
+
+
+def test_requests_over_max_inflight_get_429():
+    release = None
+
+    async def hold(data, push):
+        await release.wait()
+        return "done"
+
+    async def scenario():
+        nonlocal release
+        release = asyncio.Event()
+        client = Client([{'id': i, 'op': "hold"} for i in range(3)])
+        channel = EventChannel(ChannelCodec(), client.send, {'hold': hold}, max_inflight=2)
+        running = asyncio.create_task(channel.run(client.receive))
+        await settle()
+        release.set()
+        await settle()
+        client.close()
+        await running
+        return client.sent
+
+    sent = asyncio.run(scenario())
+    errors = [m for m in sent if m['type'] == "error"]
+    assert [(m['id'], m['data']['status']) for m in errors] == [(2, 429)]
+    assert sorted(m['id'] for m in sent if m['type'] == "result") == [0, 1]
+
+
+def test_closing_the_connection_cancels_running_requests():
+    cancelled = []
+
+    async def forever(data, push):
+        try:
+            await asyncio.sleep(3600)
+        except asyncio.CancelledError:
+            cancelled.append(data['n'])
+            raise
+
+    async def scenario():
+        client = Client([{'id': n, 'op': "forever", 'data': {'n': n}} for n in range(2)])
+        channel = EventChannel(ChannelCodec(), client.send, {'forever': forever})
+        running = asyncio.create_task(channel.run(client.receive))
+        await settle()
+        client.close()
+        await asyncio.wait_for(running, 1.0)
+        return channel
+
+    channel = asyncio.run(scenario())
+    assert sorted(cancelled) == [0, 1]
+    assert channel.get_stats()['in_flight'] == 0
+
+
+def test_a_failed_send_ends_the_channel_instead_of_blocking_pushes():
+    async def chatty(data, push):
+        for _ in range(10):
+            await push("line")
+        return "done"
+
+    async def scenario():
+        client = Client([{'id': n, 'op': "chatty"} for n in range(4)], fail_sends=True)
+        channel = EventChannel(ChannelCodec(), client.send, {'chatty': chatty},
+                               send_queue_size=2)
+        # The client never closes: only the failed send can end run()
+        await asyncio.wait_for(channel.run(client.receive), 1.0)
+        return channel
+
+    channel = asyncio.run(scenario())
+    assert isinstance(channel.send_error, ConnectionError)
+    assert channel.get_stats()['in_flight'] == 0
@@ -0,0 +1,13 @@
+import pytest
+
+
+def test_schedule_windows_wrap_past_midnight(game_master):
+    assert game_master.get_agent_schedule("cop_01", "23:30")['location'] == "apartment_3c"
+    assert game_master.get_agent_schedule("cop_01", "07:59")['location'] == "apartment_3c"
+    assert game_master.get_agent_schedule("cop_01", "08:00")['location'] == "street"
+
+
+@pytest.mark.parametrize("game_time", ["noon", "25:00", "10:0", ""])
+def test_malformed_game_time_is_a_value_error(game_master, game_time):
+    with pytest.raises(ValueError, match="HH:MM"):
+        game_master.get_agent_schedule("cop_01", game_time)
@@ -0,0 +1,43 @@
+def test_byte_budget_evicts_least_recently_used(make_switcher):
+    switcher = make_switcher(max_cache_bytes=250)
+    switcher.get_adapter("a.lora")
+    switcher.get_adapter("b.lora")
+    switcher.get_adapter("a.lora")
+    switcher.get_adapter("c.lora")
+
+    assert list(switcher.loaded_adapters) == ["a.lora", "c.lora"]
+    assert switcher.cache_bytes == 200
+    assert (switcher.hits, switcher.misses, switcher.evictions) == (1, 3, 1)
+
+
+def test_count_limit_applies_alongside_the_byte_budget(make_switcher):
+    switcher = make_switcher(max_cache_size=1)
+    switcher.get_adapter("a.lora")
+    switcher.get_adapter("b.lora")
+
+    assert list(switcher.loaded_adapters) == ["b.lora"]
+
+
+def test_pinned_adapters_survive_until_released(make_switcher):
+    switcher = make_switcher(max_cache_bytes=150)
+    with switcher.use_adapter("a.lora"):
+        switcher.get_adapter("b.lora")
+        # Over budget, but a is pinned: only the newcomer is kept with it
+        assert switcher.is_adapter_loaded("a.lora")
+        switcher.get_adapter("c.lora")
+        assert list(switcher.loaded_adapters) == ["a.lora", "c.lora"]
+
+    # Releasing the pin brings the cache back inside its budget
+    assert list(switcher.loaded_adapters) == ["c.lora"]
+    assert switcher.cache_bytes <= 150
+
+
+def test_prefetch_never_evicts_pinned_adapters(make_switcher):
+    switcher = make_switcher(max_cache_bytes=150)
+    with switcher.use_adapter("a.lora"):
+        assert switcher.prefetch("b.lora") is False
+        assert switcher.prefetch_skipped == 1
+        assert list(switcher.loaded_adapters) == ["a.lora"]
+
+    assert switcher.prefetch("b.lora") is True
+    assert switcher.is_adapter_loaded("b.lora")
@@ -0,0 +1,57 @@
+import time
+
+import pytest
+
+from orchestration.priority_queue import AMBIENT, DIALOGUE, PriorityRequestQueue
+
+# main_api's default ambient deadline
+AMBIENT_DEADLINE_S = 3.0
+
+
+@pytest.fixture
+def queued(make_request):
+    def make(priority, waited_s=0.0, **fields):
+        return make_request(prompt=priority, priority=priority, waited_s=waited_s, **fields)
+
+    return make
+
+
+def test_dialogue_jumps_waiting_ambient_work(queued):
+    queue = PriorityRequestQueue()
+    queue.push(queued(AMBIENT))
+    queue.push(queued(DIALOGUE))
+
+    assert [r.priority for r in queue.pop_batch(8)] == [DIALOGUE]
+    assert [r.priority for r in queue.pop_batch(8)] == [AMBIENT]
+
+
+def test_old_ambient_work_is_promoted_before_its_deadline(queued):
+    queue = PriorityRequestQueue(max_age_ms={AMBIENT: 1500.0})
+    queue.push(queued(AMBIENT, waited_s=1.6))
+    queue.push(queued(DIALOGUE))
+
+    assert [r.priority for r in queue.pop_batch(8)] == [AMBIENT]
+    assert queue.starvation_overrides == 1
+
+
+def test_default_max_age_promotes_ambient_work_while_it_is_still_live(queued):
+    queue = PriorityRequestQueue()
+    waited_s = queue.max_age[AMBIENT] + 0.1
+    aged = queued(AMBIENT, waited_s=waited_s,
+                   deadline=time.monotonic() - waited_s + AMBIENT_DEADLINE_S)
+    queue.push(aged)
+    for _ in range(3):
+        queue.push(queued(DIALOGUE))
+
+    assert queue.pop_batch(8) == [aged]
+    assert time.monotonic() < aged.deadline
+    assert queue.starvation_overrides == 1
+
+
+def test_ambient_batches_are_capped(queued):
+    queue = PriorityRequestQueue(batch_limits={AMBIENT: 2})
+    for _ in range(5):
+        queue.push(queued(AMBIENT))
+
+    assert len(queue.pop_batch(8)) == 2
+    assert queue.depth(AMBIENT) == 3
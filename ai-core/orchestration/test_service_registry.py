@@ -0,0 +1,84 @@
+import asyncio
+import json
+import threading
+
+import pytest
+
+from orchestration.service_registry import (
+    FAILED, READY, ServiceRegistry, ServiceUnavailable,
+)
+
+
+@pytest.fixture
+def registry():
+    registry = ServiceRegistry()
+    yield registry
+    registry.shutdown()
+
+
+def test_eager_services_build_in_parallel_and_lazy_ones_on_demand(registry):
+    # Each factory waits for the other, so a serial start would time out
+    both_building = threading.Barrier(2, timeout=5.0)
+    lazy_calls = []
+
+    def build(name):
+        both_building.wait()
+        return name
+
+    registry.register("llm", lambda: build("llm"))
+    registry.register("tts", lambda: build("tts"))
+    registry.register("stt", lambda: lazy_calls.append(1) or "stt", eager=False)
+    registry.start()
+
+    assert registry.get("llm") == "llm"
+    assert registry.get("tts") == "tts"
+    assert registry.is_ready()
+    assert lazy_calls == []
+    assert registry.peek("stt") is None
+
+    assert registry.get("stt") == "stt"
+    assert registry.get("stt") == "stt"
+    assert lazy_calls == [1]
+
+
+def test_ready_endpoint_is_503_until_eager_services_are_built(registry, monkeypatch):
+    import main_api
+
+    release = threading.Event()
+    registry.register("llm", lambda: release.wait(5.0) and "llm")
+    monkeypatch.setattr(main_api, "services", registry)
+    registry.start()
+
+    response = asyncio.run(main_api.ready())
+    assert response.status_code == 503
+    assert json.loads(response.body)["services"]["llm"]["state"] != READY
+
+    release.set()
+    registry.get("llm")
+    response = asyncio.run(main_api.ready())
+    assert response.status_code == 200
+    assert json.loads(response.body)["ready"] is True
+
+
+def test_failed_build_is_reported_and_not_retried(registry):
+    calls = []
+
+    def broken():
+        calls.append(1)
+        raise RuntimeError("model file missing")
+
+    registry.register("llm", broken)
+    registry.register("switcher", lambda: ("switcher", registry.get("llm")))
+    registry.start()
+
+    with pytest.raises(ServiceUnavailable, match="model file missing"):
+        registry.get("switcher")
+    with pytest.raises(ServiceUnavailable, match="model file missing"):
+        registry.get("llm")
+
+    status = registry.status()
+    assert status["llm"]["state"] == FAILED
+    assert status["llm"]["error"] == "model file missing"
+    assert status["switcher"]["state"] == FAILED
+    assert not registry.is_ready()
+    assert calls == [1]
@@ -0,0 +1,110 @@
+import threading
+
+import pytest
+
+from orchestration.rag_engine import RAGEngine
+from orchestration.session_manager import SessionQuotaExceeded
+
+
+def test_inflight_quota_rejects_before_anything_is_queued(make_manager):
+    manager = make_manager(max_inflight_generations=2)
+    with manager.use("match-1") as world:
+        with manager.generations(world, 2):
+            with pytest.raises(SessionQuotaExceeded):
+                with manager.generations(world):
+                    pass
+            assert world.inflight_generations == 2
+        # Released generations free the quota again
+        with manager.generations(world, 2):
+            pass
+
+    assert (world.generations, world.rejected) == (4, 1)
+
+
+def test_rate_quota_is_a_token_bucket(make_manager):
+    manager = make_manager(generations_per_minute=3)
+    with manager.use("match-1") as world:
+        for _ in range(3):
+            with manager.generations(world):
+                pass
+        with pytest.raises(SessionQuotaExceeded):
+            with manager.generations(world):
+                pass
+
+
+def test_default_world_is_never_limited(make_manager):
+    manager = make_manager(max_inflight_generations=1,
+                           generations_per_minute=1)
+    with manager.use(None) as world:
+        assert world is manager.default
+        with manager.generations(world, 5):
+            with manager.generations(world, 5):
+                assert world.inflight_generations == 10
+    assert world.rejected == 0
+
+
+def test_sessions_read_the_template_but_keep_their_own_writes(make_manager,
+                                                              session_template):
+    seeded = RAGEngine(session_template)
+    seeded.store_memory("baker", "The oven broke at dawn.", "observation")
+    seeded.close()
+
+    manager = make_manager(rag_factory=RAGEngine)
+    with manager.use("match-1") as first, manager.use("match-2") as second:
+        first.rag_engine.store_memory("baker", "A stranger stole bread.", "observation")
+
+        seen_first = {m['event_description']
+                      for m in first.rag_engine.retrieve_memories("", "baker")}
+        seen_second = {m['event_description']
+                       for m in second.rag_engine.retrieve_memories("", "baker")}
+
+    assert seen_first == {"The oven broke at dawn.", "A stranger stole bread."}
+    assert seen_second == {"The oven broke at dawn."}
+    manager.stop()
+
+
+class SlowSavingGameMaster:
+    """Blocks in get_state until released, like a large world being written out"""
+
+    saving = threading.Event()
+    release = threading.Event()
+
+    def __init__(self):
+        self.event_history = []
+
+    def get_state(self):
+        self.saving.set()
+        assert self.release.wait(5.0)
+        return {'saved': True}
+
+    def load_state(self, state):
+        self.loaded = state
+
+
+def test_eviction_writes_out_the_session_without_holding_up_others(make_manager):
+    SlowSavingGameMaster.saving.clear()
+    SlowSavingGameMaster.release.clear()
+    manager = make_manager(game_master_factory=SlowSavingGameMaster)
+    with manager.use("match-1"), manager.use("match-2"):
+        pass
+
+    evicting = threading.Thread(target=manager.evict, args=("match-1",))
+    evicting.start()
+    assert SlowSavingGameMaster.saving.wait(5.0)
+
+    # Other sessions and stats are served while match-1 is being saved
+    with manager.use("match-2") as world:
+        assert world.session_id == "match-2"
+    assert manager.get_stats() is not None
+
+    reopened = []
+    reopening = threading.Thread(target=lambda: reopened.append(manager.acquire("match-1")))
+    reopening.start()
+    reopening.join(0.2)
+    assert not reopened
+
+    SlowSavingGameMaster.release.set()
+    evicting.join(5.0)
+    reopening.join(5.0)
+    assert reopened[0].restored
+    assert reopened[0].game_master.loaded == {'saved': True}
@@ -0,0 +1,273 @@
+"""
+Batched Speech-to-Text Worker
+Transcribes utterances from concurrent players together in one Whisper pass
+"""
+
+import logging
+import math
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from monitoring.metrics import inc, observe, span
+from voice.stt_whisper import WhisperSTT, decode_audio, resample
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class STTRequest:
+    """One utterance waiting for the STT worker"""
+    samples: np.ndarray
+    language: Optional[str] = "en"
+    session_id: Optional[str] = None
+    future: Future = field(default_factory=Future)
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+
+class BatchedSTT:
+    """
+    Batching front-end for WhisperSTT
+
+    Callers submit 16 kHz clips and get a Future. A worker thread takes
+    the next clip as soon as one is queued, waits at most max_wait_ms for
+    up to max_batch_size more, pads each to Whisper's 30 s window and runs
+    the stacked mel spectrograms through the encoder and decoder as one
+    batch, so players who speak at the same time share a model pass
+    instead of queueing behind each other.
+
+    Batched decoding is single-window and without timestamps; clips
+    longer than 30 s go through WhisperSTT's long-form path on their own.
+    With language=None the speaker's cached language is used if known,
+    otherwise Whisper detects it per clip inside the batch and the result
+    is cached for the session.
+
+    transcribe_array() blocks on the future, so a BatchedSTT can stand in
+    for WhisperSTT behind StreamingTranscriber.
+    """
+
+    MAX_CLIP_SAMPLES = 30 * WhisperSTT.SAMPLE_RATE
+
+    def __init__(self, stt: WhisperSTT, max_batch_size: int = 8,
+                 max_wait_ms: float = 20.0):
+        self.stt = stt
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+
+        self._queue: List[STTRequest] = []
+        self._cond = threading.Condition()
+        self._running = False
+        self._worker: Optional[threading.Thread] = None
+
+        self.submitted = 0
+        self.completed = 0
+        self.batches = 0
+        self.largest_batch = 0
+        self.audio_seconds = 0.0
+        self.stt_seconds = 0.0
+
+    def start(self) -> None:
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+
+        self._worker = threading.Thread(target=self._worker_loop, name="stt-worker",
+                                        daemon=True)
+        self._worker.start()
+        logger.info(f"Batched STT started (batch {self.max_batch_size}, "
+                    f"wait {self.max_wait * 1000.0:.0f}ms)")
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop the worker; queued clips are cancelled"""
+        with self._cond:
+            self._running = False
+            pending, self._queue = self._queue, []
+            self._cond.notify_all()
+
+        for request in pending:
+            request.future.cancel()
+
+        if wait and self._worker is not None:
+            self._worker.join()
+        self._worker = None
+
+    def submit(self, samples: np.ndarray, sample_rate: int = 16000,
+               language: Optional[str] = "en",
+               session_id: Optional[str] = None) -> Future:
+        """Queue mono float32 samples; the Future resolves to a transcription dict"""
+        if not self._running:
+            self.start()
+
+        if language is None:
+            language = self.stt.cached_language(session_id)
+        request = STTRequest(samples=resample(samples, sample_rate, WhisperSTT.SAMPLE_RATE),
+                             language=language, session_id=session_id)
+
+        with self._cond:
+            self._queue.append(request)
+            self.submitted += 1
+            self._cond.notify()
+        return request.future
+
+    def transcribe_array(self, samples: np.ndarray, sample_rate: int = 16000,
+                         language: Optional[str] = "en",
+                         session_id: Optional[str] = None, **options) -> dict:
+        """Blocking submit, with the WhisperSTT.transcribe_array signature"""
+        # Batched decoding never produces timestamps, so options are moot
+        return self.submit(samples, sample_rate, language, session_id).result()
+
+    def transcribe_bytes(self, data: bytes, sample_rate: Optional[int] = None,
+                         language: Optional[str] = "en",
+                         session_id: Optional[str] = None) -> dict:
+        samples, rate = decode_audio(data, sample_rate)
+        return self.transcribe_array(samples, rate, language, session_id)
+
+    def _next_batch(self) -> List[STTRequest]:
+        """Block until a clip is queued, then let the batch fill briefly"""
+        with self._cond:
+            while self._running and not self._queue:
+                self._cond.wait()
+
+            if not self._running:
+                return []
+
+            deadline = time.monotonic() + self.max_wait
+            while len(self._queue) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+            batch = self._queue[:self.max_batch_size]
+            del self._queue[:self.max_batch_size]
+            return batch
+
+    def _worker_loop(self) -> None:
+        while True:
+            batch = self._next_batch()
+            if not batch:
+                if not self._running:
+                    return
+                continue
+
+            live = [r for r in batch if r.future.set_running_or_notify_cancel()]
+            now = time.monotonic()
+            for request in live:
+                observe("spector_stage_seconds", now - request.enqueued_at,
+                        stage="stt_queue_wait")
+
+            start = time.perf_counter()
+            try:
+                self._run_batch(live)
+            except Exception as e:
+                logger.error(f"STT batch failed: {e}")
+                for request in live:
+                    if not request.future.done():
+                        request.future.set_exception(e)
+            elapsed = time.perf_counter() - start
+
+            with self._cond:
+                self.batches += 1
+                self.completed += len(live)
+                self.largest_batch = max(self.largest_batch, len(live))
+                self.audio_seconds += sum(len(r.samples) for r in live) / WhisperSTT.SAMPLE_RATE
+                self.stt_seconds += elapsed
+
+    def _run_batch(self, batch: List[STTRequest]) -> None:
+        if self.stt.use_mock:
+            if self.stt.simulator is not None:
+                # A batch is one model pass over every clip's audio
+                self.stt._simulate(sum(len(r.samples) for r in batch) / WhisperSTT.SAMPLE_RATE)
+            for request in batch:
+                inc("spector_mock_fallbacks_total", component="stt", reason="no_model")
+                request.future.set_result(
+                    self.stt._mock_transcribe("<buffer>", request.language or "en"))
+            return
+
+        short = [r for r in batch if 0 < len(r.samples) <= self.MAX_CLIP_SAMPLES]
+        for request in batch:
+            if not len(request.samples):
+                request.future.set_result({"text": "", "language": request.language,
+                                           "confidence": 0.0, "segments": []})
+            elif len(request.samples) > self.MAX_CLIP_SAMPLES:
+                request.future.set_result(
+                    self.stt._transcribe_samples(request.samples, request.language))
+
+        # DecodingOptions carries one language, so decode per language group
+        groups: Dict[Optional[str], List[STTRequest]] = {}
+        for request in short:
+            groups.setdefault(request.language, []).append(request)
+
+        for language, group in groups.items():
+            try:
+                results = self._decode(group, language)
+            except Exception as e:
+                logger.error(f"Batched decode failed, transcribing clips one by one: {e}")
+                inc("spector_mock_fallbacks_total", component="stt", reason="batch_error")
+                for request in group:
+                    request.future.set_result(
+                        self.stt._transcribe_samples(request.samples, request.language))
+                continue
+
+            for request, result in zip(group, results):
+                self.stt.remember_language(request.session_id, result.language)
+                request.future.set_result({
+                    "text": result.text.strip(),
+                    "language": result.language,
+                    "confidence": round(math.exp(result.avg_logprob), 3),
+                    "segments": []
+                })
+
+    def _decode(self, group: List[STTRequest], language: Optional[str]) -> list:
+        """One encoder/decoder pass over a stack of padded 30 s windows"""
+        import torch
+
+        whisper = self.stt._whisper
+        model = self.stt.model
+        with span("stt_batch"):
+            # Mels are computed per clip: log_mel_spectrogram clamps to the
+            # input's global maximum, which would couple clips in a batch
+            mel = torch.stack([
+                whisper.log_mel_spectrogram(whisper.pad_or_trim(request.samples),
+                                            n_mels=model.dims.n_mels)
+                for request in group
+            ]).to(model.device)
+            options = whisper.DecodingOptions(language=language, without_timestamps=True,
+                                              fp16=(self.stt.device == "cuda"))
+            return whisper.decode(model, mel, options)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'running': self._running,
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': self.max_wait * 1000.0,
+            'queued': len(self._queue),
+            'submitted': self.submitted,
+            'completed': self.completed,
+            'batches': self.batches,
+            'largest_batch': self.largest_batch,
+            'mean_batch_size': self.completed / self.batches if self.batches else 0.0,
+            'real_time_factor': (self.stt_seconds / self.audio_seconds
+                                 if self.audio_seconds else 0.0)
+        }
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+
+    rate = 16000
+    t = np.arange(2 * rate) / rate
+    clips = [(0.3 * np.sin(2 * np.pi * f * t)).astype(np.float32) for f in (180, 220, 260, 300)]
+
+    batched = BatchedSTT(WhisperSTT(), max_batch_size=4, max_wait_ms=50)
+    futures = [batched.submit(clip, language=None, session_id=f"player_{i}")
+               for i, clip in enumerate(clips)]
+    for future in futures:
+        print(future.result())
+    print(batched.get_stats())
+    batched.shutdown()
@@ -0,0 +1,236 @@
+"""
+Streaming Speech-to-Text
+Segments live PCM audio on voice activity and transcribes utterances as
+they happen, with partial hypotheses while the player is still talking
+"""
+
+import logging
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from voice.stt_whisper import VoiceActivityDetector, WhisperSTT, pcm16_to_float32
+
+logger = logging.getLogger(__name__)
+
+
+class AudioRingBuffer:
+    """
+    Fixed-size float32 ring addressed by absolute sample index
+    Samples older than capacity are overwritten; read() returns a copy
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._data = np.zeros(capacity, dtype=np.float32)
+        self.total = 0
+
+    def write(self, samples: np.ndarray) -> None:
+        if len(samples) >= self.capacity:
+            self._data[:] = samples[-self.capacity:]
+            self.total += len(samples)
+            # Re-align so total % capacity indexes the next write
+            self._data = np.roll(self._data, self.total % self.capacity)
+            return
+
+        start = self.total % self.capacity
+        end = start + len(samples)
+        if end <= self.capacity:
+            self._data[start:end] = samples
+        else:
+            split = self.capacity - start
+            self._data[start:] = samples[:split]
+            self._data[:end - self.capacity] = samples[split:]
+        self.total += len(samples)
+
+    @property
+    def oldest(self) -> int:
+        return max(0, self.total - self.capacity)
+
+    def read(self, start: int, end: int) -> np.ndarray:
+        """Samples [start, end) by absolute index, clipped to what is retained"""
+        start = max(start, self.oldest)
+        end = min(end, self.total)
+        if end <= start:
+            return np.zeros(0, dtype=np.float32)
+
+        first = start % self.capacity
+        last = first + (end - start)
+        if last <= self.capacity:
+            return self._data[first:last].copy()
+        return np.concatenate((self._data[first:], self._data[:last - self.capacity]))
+
+
+class StreamingTranscriber:
+    """
+    Incremental transcription of one audio stream (one player)
+
+    feed() accepts 16-bit mono PCM chunks of any size. Voice activity is
+    decided per frame; an utterance starts at the first speech frame (with
+    a little pre-roll) and ends after end_silence_ms of non-speech (on top
+    of the detector's hangover), at which point it is transcribed and a
+    "final" event is returned. Bursts shorter than min_utterance_ms (door
+    slams, coughs) are reported as "discarded" without running Whisper. While
+    an utterance is open, a "partial" hypothesis is produced every
+    partial_interval_ms of new audio so the caller can start retrieval or
+    show captions early. Utterances are force-ended at max_utterance_s.
+
+    stt is a WhisperSTT or, on a multiplayer server, a shared BatchedSTT.
+    """
+
+    def __init__(self, stt: WhisperSTT, sample_rate: int = 16000,
+                 vad: Optional[VoiceActivityDetector] = None,
+                 language: Optional[str] = "en",
+                 session_id: Optional[str] = None,
+                 end_silence_ms: float = 300.0,
+                 min_utterance_ms: float = 250.0,
+                 pre_roll_ms: float = 200.0,
+                 partial_interval_ms: float = 1000.0,
+                 max_utterance_s: float = 15.0,
+                 ring_seconds: float = 30.0):
+        if sample_rate != WhisperSTT.SAMPLE_RATE:
+            raise ValueError(f"Streaming expects {WhisperSTT.SAMPLE_RATE} Hz PCM")
+
+        self.stt = stt
+        self.sample_rate = sample_rate
+        self.vad = vad or VoiceActivityDetector(sample_rate=sample_rate)
+        self.language = language
+        # With language=None, detection runs once per session and is cached
+        self.session_id = session_id
+        self.end_silence = int(sample_rate * end_silence_ms / 1000)
+        self.min_utterance = int(sample_rate * min_utterance_ms / 1000)
+        # Speech decisions include the detector's hangover; not real speech
+        self._hangover = getattr(self.vad, 'hangover_frames', 0) * self.vad.frame_size
+        self.pre_roll = int(sample_rate * pre_roll_ms / 1000)
+        self.partial_interval = (int(sample_rate * partial_interval_ms / 1000)
+                                 if partial_interval_ms else None)
+        self.max_utterance = int(sample_rate * max_utterance_s)
+        self.ring = AudioRingBuffer(int(sample_rate * max(ring_seconds, max_utterance_s + 1)))
+
+        self._pending = np.zeros(0, dtype=np.float32)  # partial VAD frame
+        self._carry = b""                               # odd trailing byte
+        self._vad_pos = 0                # absolute index of next VAD frame
+        self._utterance_start: Optional[int] = None
+        self._speech_onset = 0
+        self._last_speech = 0
+        self._last_partial = 0
+
+        self.utterances = 0
+        self.discarded = 0
+        self.partials = 0
+        self.audio_seconds = 0.0
+        self.stt_seconds = 0.0
+
+    def feed(self, pcm: bytes) -> List[Dict[str, Any]]:
+        """Add a chunk of PCM; returns any partial/final events it completed"""
+        pcm = self._carry + pcm
+        if len(pcm) % 2:
+            self._carry, pcm = pcm[-1:], pcm[:-1]
+        else:
+            self._carry = b""
+
+        samples = pcm16_to_float32(pcm)
+        self.ring.write(samples)
+        self.audio_seconds += len(samples) / self.sample_rate
+
+        frames = np.concatenate((self._pending, samples)) if len(self._pending) else samples
+        decisions = self.vad.process(frames)
+        frame_size = self.vad.frame_size
+        self._pending = frames[len(decisions) * frame_size:].copy()
+
+        events = []
+        for index, speech in enumerate(decisions):
+            frame_end = self._vad_pos + (index + 1) * frame_size
+            if speech:
+                self._last_speech = frame_end
+                if self._utterance_start is None:
+                    self._utterance_start = max(self.ring.oldest,
+                                                frame_end - frame_size - self.pre_roll)
+                    self._speech_onset = frame_end - frame_size
+                    self._last_partial = frame_end
+                    events.append({'type': 'speech_start',
+                                   'time': self._utterance_start / self.sample_rate})
+            elif (self._utterance_start is not None
+                  and frame_end - self._last_speech >= self.end_silence):
+                events.append(self._finish(self._last_speech))
+
+            if (self._utterance_start is not None
+                    and frame_end - self._utterance_start >= self.max_utterance):
+                events.append(self._finish(frame_end))
+        self._vad_pos += len(decisions) * frame_size
+
+        if (self._utterance_start is not None and self.partial_interval
+                and self._vad_pos - self._last_partial >= self.partial_interval):
+            events.append(self._partial())
+
+        return events
+
+    def flush(self) -> List[Dict[str, Any]]:
+        """End of stream: finish any open utterance"""
+        if self._utterance_start is None:
+            return []
+        return [self._finish(self.ring.total)]
+
+    def _transcribe(self, start: int, end: int, **options) -> Dict[str, Any]:
+        began = time.perf_counter()
+        result = self.stt.transcribe_array(self.ring.read(start, end), self.sample_rate,
+                                           language=self.language,
+                                           session_id=self.session_id, **options)
+        self.stt_seconds += time.perf_counter() - began
+        return result
+
+    def _partial(self) -> Dict[str, Any]:
+        self._last_partial = self._vad_pos
+        self.partials += 1
+        # No timestamps: partials only need to be fast and roughly right
+        result = self._transcribe(self._utterance_start, self._vad_pos,
+                                  without_timestamps=True)
+        return {'type': 'partial', 'text': result['text'],
+                'start': self._utterance_start / self.sample_rate,
+                'end': self._vad_pos / self.sample_rate}
+
+    def _finish(self, end: int) -> Dict[str, Any]:
+        start = self._utterance_start
+        self._utterance_start = None
+        if end - self._speech_onset - self._hangover < self.min_utterance:
+            self.discarded += 1
+            return {'type': 'discarded', 'start': start / self.sample_rate,
+                    'end': end / self.sample_rate}
+        self.utterances += 1
+        result = self._transcribe(start, end)
+        return {'type': 'final', 'text': result['text'],
+                'language': result.get('language'),
+                'start': start / self.sample_rate,
+                'end': end / self.sample_rate}
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'utterances': self.utterances,
+            'discarded': self.discarded,
+            'partials': self.partials,
+            'audio_seconds': round(self.audio_seconds, 3),
+            'stt_seconds': round(self.stt_seconds, 3),
+            'real_time_factor': (self.stt_seconds / self.audio_seconds
+                                 if self.audio_seconds else 0.0)
+        }
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+
+    rate = 16000
+    t = np.arange(rate) / rate
+    tone = (0.3 * np.sin(2 * np.pi * 220 * t)).astype(np.float32)
+    noise = (0.003 * np.random.default_rng(0).standard_normal(rate)).astype(np.float32)
+    click = np.concatenate((0.5 * tone[:800], noise[800:]))
+    audio = np.concatenate((noise, click, noise, tone + noise, noise))
+    pcm = (audio * 32767).astype("<i2").tobytes()
+
+    transcriber = StreamingTranscriber(WhisperSTT(), partial_interval_ms=500)
+    for offset in range(0, len(pcm), 3200):  # 100 ms chunks
+        for event in transcriber.feed(pcm[offset:offset + 3200]):
+            print(event)
+    for event in transcriber.flush():
+        print(event)
+    print(transcriber.get_stats())
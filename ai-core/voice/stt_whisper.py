@@ -3,9 +3,17 @@ Whisper Speech-to-Text Integration
 Actual implementation using OpenAI Whisper
 """
 
+import io
 import logging
+import threading
+import wave
+from collections import OrderedDict
 from pathlib import Path
-from typing import Optional, Dict
+from typing import Optional, Dict, List, Tuple
+
+import numpy as np
+
+from monitoring.metrics import inc, span
 
 logger = logging.getLogger(__name__)
 
@@ -14,18 +22,37 @@ class WhisperSTT:
     """
     Speech-to-Text using OpenAI Whisper
     Falls back gracefully if model not available
+    
+    Audio can be passed as a file path, a float32 array (transcribe_array)
+    or WAV/PCM bytes (transcribe_bytes); the in-memory paths never touch
+    disk. With language=None the language is detected from the first
+    30 s window only, and cached per session_id so a speaker is detected
+    once.
+    
+    Without Whisper, an optional LatencySimulator makes mock
+    transcriptions take the profiled time for the audio's duration.
     """
     
-    def __init__(self, model_size: str = "base", device: str = "cpu"):
+    SAMPLE_RATE = 16000
+    MAX_SESSIONS = 1024
+    
+    def __init__(self, model_size: str = "base", device: str = "cpu",
+                 simulator=None):
         self.model_size = model_size
         self.device = device
         self.model = None
         self.use_mock = True
+        self._whisper = None
+        self.simulator = simulator
+        
+        self._session_languages: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
         
         try:
             import whisper
             logger.info(f"Loading Whisper model: {model_size}")
             self.model = whisper.load_model(model_size, device=device)
+            self._whisper = whisper
             self.use_mock = False
             logger.info("✓ Whisper model loaded")
         except ImportError:
@@ -33,18 +60,27 @@ class WhisperSTT:
         except Exception as e:
             logger.warning(f"Whisper load failed: {e}, using mock")
     
-    def transcribe_audio(self, audio_path: str, language: str = "en") -> dict:
+    def transcribe_audio(self, audio_path: str, language: Optional[str] = "en",
+                         session_id: Optional[str] = None) -> dict:
         """Transcribe audio file to text"""
         
         if self.use_mock:
+            inc("spector_mock_fallbacks_total", component="stt", reason="no_model")
+            if self.simulator is not None:
+                self._simulate(audio_file_seconds(audio_path))
             return self._mock_transcribe(audio_path, language)
         
         try:
-            result = self.model.transcribe(
-                audio_path,
-                language=language,
-                fp16=(self.device == "cuda")
-            )
+            if language is None:
+                audio = self._whisper.load_audio(audio_path)
+                return self.transcribe_array(audio, language=None, session_id=session_id)
+            
+            with span("stt"):
+                result = self.model.transcribe(
+                    audio_path,
+                    language=language,
+                    fp16=(self.device == "cuda")
+                )
             
             return {
                 "text": result["text"].strip(),
@@ -54,8 +90,13 @@ class WhisperSTT:
             }
         except Exception as e:
             logger.error(f"Transcription failed: {e}")
+            inc("spector_mock_fallbacks_total", component="stt", reason="error")
             return self._mock_transcribe(audio_path, language)
     
+    def _simulate(self, audio_seconds: float) -> None:
+        with span("stt", backend="simulated"):
+            self.simulator.transcribe(audio_seconds)
+    
     def _mock_transcribe(self, audio_path: str, language: str) -> dict:
         """Mock transcription for testing"""
         return {
@@ -65,41 +106,329 @@ class WhisperSTT:
             "is_mock": True
         }
     
+    def transcribe_array(self, samples: np.ndarray, sample_rate: int = 16000,
+                         language: Optional[str] = "en",
+                         session_id: Optional[str] = None, **options) -> dict:
+        """Transcribe mono float32 samples held in memory"""
+        samples = resample(samples, sample_rate, self.SAMPLE_RATE)
+        if language is None:
+            language = self.detect_language(samples, session_id=session_id)
+        return self._transcribe_samples(samples, language, **options)
+    
+    def transcribe_bytes(self, data: bytes, sample_rate: Optional[int] = None,
+                         language: Optional[str] = "en",
+                         session_id: Optional[str] = None) -> dict:
+        """
+        Transcribe a WAV file image or raw 16-bit mono PCM from memory
+        sample_rate is only needed for raw PCM (default 16 kHz)
+        """
+        samples, rate = decode_audio(data, sample_rate)
+        return self.transcribe_array(samples, rate, language=language, session_id=session_id)
+    
+    def _transcribe_samples(self, samples: np.ndarray, language: Optional[str] = "en",
+                            **options) -> dict:
+        """Transcribe 16 kHz mono float32 samples already in memory"""
+        if self.use_mock:
+            inc("spector_mock_fallbacks_total", component="stt", reason="no_model")
+            if self.simulator is not None:
+                self._simulate(len(samples) / self.SAMPLE_RATE)
+            return self._mock_transcribe("<buffer>", language)
+        
+        try:
+            with span("stt"):
+                result = self.model.transcribe(
+                    samples,
+                    language=language,
+                    fp16=(self.device == "cuda"),
+                    **options
+                )
+            
+            return {
+                "text": result["text"].strip(),
+                "language": result.get("language", language),
+                "confidence": 0.95,
+                "segments": result.get("segments", [])
+            }
+        except Exception as e:
+            logger.error(f"Transcription failed: {e}")
+            inc("spector_mock_fallbacks_total", component="stt", reason="error")
+            return self._mock_transcribe("<buffer>", language)
+    
     def transcribe_stream(self, audio_buffer: bytes, sample_rate: int = 16000) -> str:
-        """Transcribe audio from byte buffer"""
-        # TODO: Implement streaming support
-        return "Streaming not yet implemented"
+        """
+        Transcribe one buffer of 16-bit mono PCM
+        For live audio use voice.stt_stream.StreamingTranscriber, which
+        segments the stream and transcribes utterances as they finish
+        """
+        if sample_rate != self.SAMPLE_RATE:
+            raise ValueError(f"Expected {self.SAMPLE_RATE} Hz PCM, got {sample_rate} Hz")
+        # Only the span that contains speech is worth Whisper's time
+        samples = VoiceActivityDetector(sample_rate).trim(pcm16_to_float32(audio_buffer))
+        if not len(samples):
+            return ""
+        return self._transcribe_samples(samples)["text"]
     
-    def detect_language(self, audio_path: str) -> str:
-        """Detect language of audio"""
+    def detect_language(self, audio, session_id: Optional[str] = None) -> str:
+        """
+        Detect the spoken language from the first 30 s window's mel
+        spectrogram (one encoder pass, no decoding). audio is a path or
+        16 kHz float32 samples; results are cached per session_id
+        """
+        cached = self.cached_language(session_id)
+        if cached is not None:
+            return cached
+        
         if self.use_mock:
             return "en"
         
         try:
-            audio = self.model.transcribe(audio_path, language=None)
-            return audio.get("language", "en")
-        except:
+            whisper = self._whisper
+            if isinstance(audio, (str, Path)):
+                audio = whisper.load_audio(str(audio))
+            with span("stt_language"):
+                window = whisper.pad_or_trim(np.asarray(audio, dtype=np.float32))
+                mel = whisper.log_mel_spectrogram(
+                    window, n_mels=self.model.dims.n_mels).to(self.model.device)
+                _, probs = self.model.detect_language(mel)
+            language = max(probs, key=probs.get)
+        except Exception as e:
+            logger.warning(f"Language detection failed: {e}")
             return "en"
+        
+        self.remember_language(session_id, language)
+        return language
+    
+    def cached_language(self, session_id: Optional[str]) -> Optional[str]:
+        """Language previously detected for this speaker, if any"""
+        if session_id is None:
+            return None
+        with self._lock:
+            language = self._session_languages.get(session_id)
+            if language is not None:
+                self._session_languages.move_to_end(session_id)
+            return language
+    
+    def remember_language(self, session_id: Optional[str], language: Optional[str]) -> None:
+        if session_id is None or not language:
+            return
+        with self._lock:
+            self._session_languages[session_id] = language
+            self._session_languages.move_to_end(session_id)
+            while len(self._session_languages) > self.MAX_SESSIONS:
+                self._session_languages.popitem(last=False)
+    
+    def forget_session(self, session_id: str) -> None:
+        with self._lock:
+            self._session_languages.pop(session_id, None)
     
     def is_loaded(self) -> bool:
         """Check if real model is loaded"""
         return not self.use_mock
 
 
+def pcm16_to_float32(pcm: bytes) -> np.ndarray:
+    """Little-endian 16-bit PCM to float32 samples in [-1, 1)"""
+    samples = np.frombuffer(pcm, dtype="<i2").astype(np.float32)
+    samples *= 1.0 / 32768.0
+    return samples
+
+
+_PCM_FORMATS = {1: ("u1", 128.0, 128.0), 2: ("<i2", 0.0, 32768.0), 4: ("<i4", 0.0, 2147483648.0)}
+
+
+def decode_audio(data: bytes, sample_rate: Optional[int] = None) -> Tuple[np.ndarray, int]:
+    """
+    WAV image (8/16/32-bit PCM, any channel count) or raw 16-bit mono PCM
+    to mono float32. The PCM payload is viewed in place with frombuffer;
+    the only copy is the float conversion. Returns (samples, sample_rate)
+    """
+    if data[:4] != b"RIFF":
+        return pcm16_to_float32(data), sample_rate or WhisperSTT.SAMPLE_RATE
+    
+    with wave.open(io.BytesIO(data), 'rb') as wav:
+        width = wav.getsampwidth()
+        channels = wav.getnchannels()
+        rate = wav.getframerate()
+        frames = wav.readframes(wav.getnframes())
+    
+    if width not in _PCM_FORMATS:
+        raise ValueError(f"Unsupported WAV sample width: {width * 8} bits")
+    dtype, offset, scale = _PCM_FORMATS[width]
+    
+    samples = np.frombuffer(frames, dtype=dtype).astype(np.float32)
+    if offset:
+        samples -= offset
+    samples *= 1.0 / scale
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1, dtype=np.float32)
+    return samples, rate
+
+
+def resample(samples: np.ndarray, from_rate: int, to_rate: int = 16000) -> np.ndarray:
+    """
+    Linear-interpolation resampling; when downsampling, a box filter the
+    width of the rate ratio is applied first to limit aliasing
+    """
+    samples = np.asarray(samples, dtype=np.float32)
+    if from_rate == to_rate or not len(samples):
+        return samples
+    
+    ratio = from_rate / to_rate
+    if ratio >= 2:
+        width = int(ratio)
+        samples = np.convolve(samples, np.full(width, 1.0 / width, dtype=np.float32),
+                              mode="same")
+    
+    positions = np.arange(int(len(samples) / ratio), dtype=np.float64) * ratio
+    return np.interp(positions, np.arange(len(samples)), samples).astype(np.float32)
+
+
 class VoiceActivityDetector:
-    """Simple voice activity detection"""
+    """
+    Frame-based voice activity detection, vectorized with NumPy
+
+    Features are computed for every frame of a buffer at once:
+    short-time energy, zero-crossing rate and spectral flatness. A frame
+    is a speech candidate when its energy is energy_margin_db above the
+    noise floor; candidates that are both flat-spectrum and high-ZCR
+    (fans, hiss, wind) are rejected. Decisions are held for hangover_ms
+    after the last speech frame so word gaps do not split utterances.
+
+    The noise floor adapts from the frames judged to be non-speech: it
+    drops immediately and rises slowly. State carries across process()
+    calls, so a stream can be fed in arbitrary chunks.
+    """
+    
+    def __init__(self, sample_rate: int = 16000, frame_ms: float = 30.0,
+                 energy_margin_db: float = 10.0, min_energy_db: float = -55.0,
+                 max_zcr: float = 0.35, max_flatness: float = 0.45,
+                 hangover_ms: float = 240.0, min_speech_ms: float = 150.0,
+                 floor_rise: float = 0.02):
+        self.sample_rate = sample_rate
+        self.frame_size = int(sample_rate * frame_ms / 1000)
+        self.energy_margin_db = energy_margin_db
+        self.min_energy_db = min_energy_db
+        self.max_zcr = max_zcr
+        self.max_flatness = max_flatness
+        self.hangover_frames = int(round(hangover_ms / frame_ms))
+        self.min_speech_frames = max(1, int(round(min_speech_ms / frame_ms)))
+        self.floor_rise = floor_rise
+        self._window = np.hanning(self.frame_size).astype(np.float32)
+        self.reset()
+    
+    def reset(self) -> None:
+        """Forget the noise floor and hangover state (new stream)"""
+        self.noise_floor_db: Optional[float] = None
+        self._frame_index = 0
+        self._last_speech = -(1 << 40)
     
-    def __init__(self, threshold: float = 0.5):
-        self.threshold = threshold
+    def features(self, frames: np.ndarray) -> Dict[str, np.ndarray]:
+        """Energy (dBFS), zero-crossing rate and spectral flatness per frame"""
+        energy = np.mean(frames * frames, axis=1)
+        energy_db = 10.0 * np.log10(energy + 1e-10)
+        
+        signs = np.signbit(frames)
+        zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / (self.frame_size - 1)
+        
+        power = np.abs(np.fft.rfft(frames * self._window, axis=1))[:, 1:] ** 2 + 1e-12
+        flatness = np.exp(np.mean(np.log(power), axis=1)) / np.mean(power, axis=1)
+        
+        return {'energy_db': energy_db, 'zcr': zcr, 'flatness': flatness}
+    
+    def process(self, samples: np.ndarray) -> np.ndarray:
+        """Per-frame speech decisions for whole frames of float32 samples"""
+        count = len(samples) // self.frame_size
+        if not count:
+            return np.zeros(0, dtype=bool)
+        frames = samples[:count * self.frame_size].reshape(count, self.frame_size)
+        feats = self.features(frames)
+        energy_db = feats['energy_db']
+        
+        if self.noise_floor_db is None:
+            self.noise_floor_db = float(np.percentile(energy_db, 10))
+        
+        noise_like = (feats['flatness'] > self.max_flatness) & (feats['zcr'] > self.max_zcr)
+        candidate = ((energy_db > self.noise_floor_db + self.energy_margin_db)
+                     & (energy_db > self.min_energy_db)
+                     & ~noise_like)
+        
+        # Hangover: a frame is speech if a candidate occurred within the
+        # last hangover_frames frames (running max of candidate indices)
+        index = np.arange(self._frame_index, self._frame_index + count)
+        marks = np.where(candidate, index, -(1 << 40))
+        last = np.maximum.accumulate(np.maximum(marks, self._last_speech))
+        speech = index - last <= self.hangover_frames
+        self._last_speech = int(last[-1])
+        self._frame_index += count
+        
+        quiet = energy_db[~candidate]
+        if quiet.size:
+            level = float(np.median(quiet))
+            if level < self.noise_floor_db:
+                self.noise_floor_db = level
+            else:
+                alpha = 1.0 - (1.0 - self.floor_rise) ** quiet.size
+                self.noise_floor_db += alpha * (level - self.noise_floor_db)
+        
+        return speech
     
     def is_speech(self, audio_buffer: bytes) -> bool:
         """Detect if audio contains speech"""
-        # Simple energy-based detection
-        return len(audio_buffer) > 1024
+        return bool(self.process(pcm16_to_float32(audio_buffer)).any())
     
-    def get_speech_segments(self, audio_path: str) -> list:
-        """Extract speech segments from audio"""
-        return [(0.0, 2.0)]
+    def get_speech_segments(self, audio, block_seconds: float = 1.0) -> List[Tuple[float, float]]:
+        """
+        (start, end) seconds of each speech region in a WAV path or float32
+        array, in a single pass. Ends are the last speech frame, without the
+        hangover; regions shorter than min_speech_ms are dropped. Resets
+        the detector's stream state
+        """
+        samples = load_wav(audio) if isinstance(audio, (str, Path)) else audio
+        self.reset()
+        
+        # Feed in blocks so the noise floor can track a changing background
+        block = max(1, int(block_seconds * self.sample_rate) // self.frame_size) * self.frame_size
+        decisions = np.concatenate([self.process(samples[i:i + block])
+                                    for i in range(0, len(samples), block)] or
+                                   [np.zeros(0, dtype=bool)])
+        self.reset()
+        
+        edges = np.diff(np.concatenate(([0], decisions.astype(np.int8), [0])))
+        starts = np.flatnonzero(edges == 1)
+        ends = np.flatnonzero(edges == -1)
+        # A region that closed before the audio ended carries hangover_frames
+        # of non-speech after its last speech frame
+        ends = np.where(ends < len(decisions), ends - self.hangover_frames, ends)
+        keep = ends - starts >= self.min_speech_frames
+        
+        seconds = self.frame_size / self.sample_rate
+        return [(round(float(s) * seconds, 3), round(float(e) * seconds, 3))
+                for s, e in zip(starts[keep], ends[keep])]
+    
+    def trim(self, samples: np.ndarray, pad_ms: float = 100.0) -> np.ndarray:
+        """View of samples from the first to the last speech region (padded)"""
+        segments = self.get_speech_segments(samples)
+        if not segments:
+            return samples[:0]
+        pad = pad_ms / 1000.0
+        start = int(max(0.0, segments[0][0] - pad) * self.sample_rate)
+        end = int((segments[-1][1] + pad) * self.sample_rate)
+        return samples[start:end]
+
+
+def audio_file_seconds(path) -> float:
+    """Duration of a WAV file from its header (0 if unreadable)"""
+    try:
+        with wave.open(str(path), 'rb') as wav:
+            return wav.getnframes() / float(wav.getframerate())
+    except (OSError, EOFError, wave.Error):
+        return 0.0
+
+
+def load_wav(path, sample_rate: int = 16000) -> np.ndarray:
+    """Read a PCM WAV file into mono float32 samples at sample_rate"""
+    samples, rate = decode_audio(Path(path).read_bytes())
+    return resample(samples, rate, sample_rate)
 
 
 if __name__ == '__main__':
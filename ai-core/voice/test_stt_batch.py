@@ -0,0 +1,83 @@
+import threading
+
+import pytest
+
+from voice.stt_batch import BatchedSTT
+from voice.stt_whisper import WhisperSTT
+
+
+@pytest.fixture
+def batched():
+    batched = BatchedSTT(WhisperSTT(), max_batch_size=4, max_wait_ms=200)
+    yield batched
+    batched.shutdown()
+
+
+def test_concurrent_utterances_share_one_pass(batched, synthetic_speech):
+    clips = [synthetic_speech(1.0, tones=[(0.2, 0.8)], seed=seed) for seed in range(3)]
+
+    futures = [batched.submit(clip, session_id=f"player_{i}") for i, clip in enumerate(clips)]
+
+    results = [future.result(timeout=5.0) for future in futures]
+    assert [result['text'] for result in results] == ["This is a mock transcription"] * 3
+    stats = batched.get_stats()
+    assert stats['batches'] == 1
+    assert stats['largest_batch'] == 3
+    assert stats['completed'] == 3
+
+
+def test_batches_are_capped_and_clips_resampled(synthetic_speech):
+    batched = BatchedSTT(WhisperSTT(), max_batch_size=2, max_wait_ms=200)
+    seen = []
+    run_batch = batched._run_batch
+
+    def recording(batch):
+        seen.append([len(request.samples) for request in batch])
+        run_batch(batch)
+
+    batched._run_batch = recording
+    try:
+        futures = [batched.submit(synthetic_speech(1.0), sample_rate=48000) for _ in range(5)]
+        for future in futures:
+            future.result(timeout=5.0)
+    finally:
+        batched.shutdown()
+
+    assert max(len(batch) for batch in seen) == 2
+    assert sum(len(batch) for batch in seen) == 5
+    # One second of 48 kHz input is a third of a second at 16 kHz
+    assert {length for batch in seen for length in batch} == {16000 // 3}
+
+
+def test_cached_session_language_is_used_for_the_batch(batched, synthetic_speech):
+    batched.stt.remember_language("player_1", "de")
+
+    result = batched.submit(synthetic_speech(1.0), language=None,
+                            session_id="player_1").result(timeout=5.0)
+
+    assert result['language'] == "de"
+    assert batched.transcribe_array(synthetic_speech(1.0), language="fr")['language'] == "fr"
+
+
+def test_failed_batch_fails_its_futures_and_shutdown_cancels_the_queue(batched,
+                                                                       synthetic_speech):
+    running = threading.Event()
+    release = threading.Event()
+
+    def failing(batch):
+        running.set()
+        release.wait(5.0)
+        raise RuntimeError("CUDA out of memory")
+
+    batched._run_batch = failing
+    batched.max_wait = 0.0
+    first = batched.submit(synthetic_speech(1.0))
+    assert running.wait(5.0)
+    queued = batched.submit(synthetic_speech(1.0))
+
+    batched.shutdown(wait=False)
+    release.set()
+
+    with pytest.raises(RuntimeError, match="out of memory"):
+        first.result(timeout=5.0)
+    assert queued.cancelled()
@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+
+from voice.stt_stream import AudioRingBuffer, StreamingTranscriber
+
+SAMPLE_RATE = 16000
+
+
+class RecordingSTT:
+    """Stands in for WhisperSTT and records every clip it is given"""
+
+    def __init__(self):
+        self.calls = []
+
+    def transcribe_array(self, samples, sample_rate=16000, language="en",
+                         session_id=None, **options):
+        self.calls.append((len(samples), options))
+        return {'text': f"{len(samples)} samples", 'language': language}
+
+
+def feed(transcriber, pcm, chunk_bytes=3201):
+    # An odd chunk size splits samples across chunks
+    events = []
+    for offset in range(0, len(pcm), chunk_bytes):
+        events.extend(transcriber.feed(pcm[offset:offset + chunk_bytes]))
+    return events + transcriber.flush()
+
+
+def test_ring_buffer_wraps_and_keeps_the_newest_samples():
+    ring = AudioRingBuffer(10)
+    ring.write(np.arange(6, dtype=np.float32))
+    ring.write(np.arange(6, 12, dtype=np.float32))
+
+    assert ring.total == 12
+    assert ring.oldest == 2
+    assert ring.read(0, 12).tolist() == list(range(2, 12))
+    assert ring.read(8, 20).tolist() == [8, 9, 10, 11]
+    assert len(ring.read(12, 20)) == 0
+
+    ring.write(np.arange(12, 37, dtype=np.float32))
+    assert ring.oldest == 27
+    assert ring.read(0, 37).tolist() == list(range(27, 37))
+    ring.write(np.arange(37, 40, dtype=np.float32))
+    assert ring.read(30, 40).tolist() == list(range(30, 40))
+
+
+def test_utterance_is_transcribed_once_when_the_speaker_stops(synthetic_speech):
+    stt = RecordingSTT()
+    transcriber = StreamingTranscriber(stt, partial_interval_ms=0)
+
+    events = feed(transcriber, synthetic_speech(3.0, tones=[(1.0, 2.0)], pcm=True))
+
+    assert [event['type'] for event in events] == ['speech_start', 'final']
+    final = events[1]
+    # Pre-roll before the onset; the end is the last speech frame
+    assert final['start'] == pytest.approx(0.8, abs=0.05)
+    assert final['end'] == pytest.approx(2.0, abs=0.3)
+    assert stt.calls == [(int(round((final['end'] - final['start']) * SAMPLE_RATE)), {})]
+    assert transcriber.get_stats()['utterances'] == 1
+
+
+def test_bursts_shorter_than_min_utterance_skip_whisper(synthetic_speech):
+    stt = RecordingSTT()
+    transcriber = StreamingTranscriber(stt, min_utterance_ms=250, partial_interval_ms=0)
+
+    events = feed(transcriber, synthetic_speech(2.0, tones=[(1.0, 1.1)], pcm=True))
+
+    assert [event['type'] for event in events] == ['speech_start', 'discarded']
+    assert stt.calls == []
+    assert transcriber.get_stats()['discarded'] == 1
+
+
+def test_partials_run_while_the_player_is_talking(synthetic_speech):
+    stt = RecordingSTT()
+    transcriber = StreamingTranscriber(stt, partial_interval_ms=500)
+
+    events = feed(transcriber, synthetic_speech(4.0, tones=[(0.5, 3.0)], pcm=True))
+
+    types = [event['type'] for event in events]
+    assert types[0] == 'speech_start' and types[-1] == 'final'
+    partials = [event for event in events if event['type'] == 'partial']
+    assert len(partials) >= 3
+    assert [p['end'] for p in partials] == sorted(p['end'] for p in partials)
+    assert all(p['end'] <= events[-1]['end'] + 0.3 for p in partials)
+    # Partials skip timestamps; the final transcription does not
+    assert [options for _, options in stt.calls] == \
+        [{'without_timestamps': True}] * len(partials) + [{}]
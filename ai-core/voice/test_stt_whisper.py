@@ -0,0 +1,119 @@
+import io
+import wave
+
+import numpy as np
+import pytest
+
+from voice.stt_whisper import VoiceActivityDetector, WhisperSTT, decode_audio, resample
+
+
+def wav_bytes(frames: bytes, rate: int, channels: int = 1, width: int = 2) -> bytes:
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wav:
+        wav.setnchannels(channels)
+        wav.setsampwidth(width)
+        wav.setframerate(rate)
+        wav.writeframes(frames)
+    return buffer.getvalue()
+
+
+def test_segment_boundaries_exclude_hangover(synthetic_speech):
+    audio = synthetic_speech(3.0, tones=[(1.0, 2.0)])
+
+    [(start, end)] = VoiceActivityDetector().get_speech_segments(audio)
+
+    # Within one 30 ms frame of the tone, not 240 ms of hangover past it
+    assert start == pytest.approx(1.0, abs=0.03)
+    assert end == pytest.approx(2.0, abs=0.03)
+
+
+def test_segment_running_to_the_end_keeps_its_end(synthetic_speech):
+    audio = synthetic_speech(1.5, tones=[(1.0, 1.5)])
+
+    [(start, end)] = VoiceActivityDetector().get_speech_segments(audio)
+
+    assert start == pytest.approx(1.0, abs=0.03)
+    assert end == pytest.approx(1.5, abs=0.03)
+
+
+def test_short_gap_does_not_split_an_utterance(synthetic_speech):
+    audio = synthetic_speech(3.0, tones=[(0.5, 1.2), (1.35, 2.0)])
+
+    segments = VoiceActivityDetector().get_speech_segments(audio)
+
+    assert len(segments) == 1
+    assert segments[0][1] == pytest.approx(2.0, abs=0.03)
+
+
+def test_blips_shorter_than_min_speech_are_dropped(synthetic_speech):
+    audio = synthetic_speech(3.0, tones=[(1.0, 1.06)])
+
+    assert VoiceActivityDetector(min_speech_ms=150).get_speech_segments(audio) == []
+
+
+def test_steady_noise_is_not_speech(synthetic_speech):
+    assert VoiceActivityDetector().get_speech_segments(synthetic_speech(3.0, level=0.05)) == []
+
+
+def test_stream_chunks_match_whole_buffer(synthetic_speech):
+    audio = synthetic_speech(3.0, tones=[(1.0, 2.0)])
+    whole = VoiceActivityDetector().process(audio)
+
+    detector = VoiceActivityDetector()
+    chunked = np.concatenate([detector.process(audio[i:i + 4800])
+                              for i in range(0, len(audio), 4800)])
+
+    assert chunked.sum() == pytest.approx(whole.sum(), abs=2)
+
+
+def test_raw_pcm_and_wav_images_decode_to_the_same_samples(synthetic_speech):
+    pcm = synthetic_speech(0.5, tones=[(0.1, 0.4)], pcm=True)
+
+    raw, raw_rate = decode_audio(pcm)
+    wav, wav_rate = decode_audio(wav_bytes(pcm, 16000))
+
+    assert raw_rate == wav_rate == 16000
+    assert np.array_equal(raw, wav)
+    assert raw.dtype == np.float32
+
+
+def test_stereo_and_8_bit_wavs_are_mixed_down_to_mono_floats():
+    stereo = np.array([[1000, -1000], [16384, 16384]], dtype="<i2").tobytes()
+    samples, rate = decode_audio(wav_bytes(stereo, 44100, channels=2))
+    assert rate == 44100
+    assert samples.tolist() == [0.0, 0.5]
+
+    samples, _ = decode_audio(wav_bytes(bytes([128, 255, 0]), 8000, width=1))
+    assert samples.tolist() == pytest.approx([0.0, 127 / 128, -1.0])
+
+
+def test_resampling_keeps_duration_and_pitch():
+    t = np.arange(48000) / 48000
+    tone = np.sin(2 * np.pi * 440.0 * t).astype(np.float32)
+
+    samples = resample(tone, 48000)
+
+    assert len(samples) == 16000
+    spectrum = np.abs(np.fft.rfft(samples))
+    assert np.argmax(spectrum) == pytest.approx(440, abs=1)
+    assert len(resample(tone[:0], 48000)) == 0
+
+
+def test_detected_languages_are_cached_per_session(monkeypatch):
+    stt = WhisperSTT()
+    monkeypatch.setattr(WhisperSTT, "MAX_SESSIONS", 2)
+
+    stt.remember_language("player_1", "de")
+    stt.remember_language("player_2", "fr")
+    assert stt.cached_language("player_1") == "de"
+    stt.remember_language("player_3", "es")
+
+    # player_2 was the least recently used
+    assert stt.cached_language("player_2") is None
+    assert stt.detect_language(np.zeros(16000, dtype=np.float32), session_id="player_1") == "de"
+    assert stt.transcribe_bytes(b"\x00\x00" * 1600, language=None,
+                                session_id="player_3")['language'] == "es"
+
+    stt.forget_session("player_3")
+    assert stt.cached_language("player_3") is None
+    assert stt.cached_language(None) is None
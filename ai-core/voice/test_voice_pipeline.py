@@ -0,0 +1,95 @@
+import asyncio
+from concurrent.futures import Future
+
+from voice.stt_stream import StreamingTranscriber
+from voice.stt_whisper import WhisperSTT
+from voice.tts_piper import PiperTTS
+from voice.voice_pipeline import VoicePipeline, split_sentences
+
+AGENT = {'name': 'Martha Quinn', 'archetype': 'grumpy_baker', 'emotional_state': 'annoyed'}
+
+
+class StubRAG:
+    def get_agent_context(self, agent_id, current_event):
+        return {'agent': dict(AGENT)}
+
+
+class StubSwitcher:
+    """Answers from a list of futures, one per reply"""
+
+    def __init__(self, *futures):
+        self.futures = list(futures)
+        self.calls = []
+
+    def submit_response(self, adapter_name, prompt, **kwargs):
+        self.calls.append((adapter_name, kwargs))
+        return self.futures.pop(0)
+
+
+def answered(text):
+    future = Future()
+    future.set_result(text)
+    return future
+
+
+def converse(switcher, pcm):
+    events, audio = [], []
+
+    async def send_event(event):
+        events.append(event)
+
+    async def send_audio(chunk):
+        audio.append(chunk)
+
+    async def run():
+        pipeline = VoicePipeline("npc_001", StreamingTranscriber(WhisperSTT(),
+                                                                 partial_interval_ms=0),
+                                 StubRAG(), switcher, PiperTTS(), send_event, send_audio)
+        pipeline.start()
+        for offset in range(0, len(pcm), 3200):
+            await pipeline.feed(pcm[offset:offset + 3200])
+        await asyncio.wait_for(pipeline.finish(), 10.0)
+        await pipeline.close()
+        return pipeline
+
+    pipeline = asyncio.run(run())
+    return pipeline, events, audio
+
+
+def test_split_sentences():
+    assert split_sentences("Fresh bread!  Two coins. Mind the step?") == \
+        ["Fresh bread!", "Two coins.", "Mind the step?"]
+    assert split_sentences("   ") == []
+
+
+def test_utterance_is_answered_sentence_by_sentence(synthetic_speech):
+    switcher = StubSwitcher(answered("Fresh bread, two coins. Mind the step!"))
+
+    pipeline, events, audio = converse(switcher, synthetic_speech(3.0, tones=[(0.5, 1.5)],
+                                                                  pcm=True))
+
+    assert [event['type'] for event in events] == \
+        ['speech_start', 'final', 'reply', 'audio', 'audio', 'timing']
+    assert [event['text'] for event in events if event['type'] == 'audio'] == \
+        ["Fresh bread, two coins.", "Mind the step!"]
+    assert len(audio) == 2
+    assert switcher.calls[0][0] == "grumpy_baker.lora"
+    assert {'stt', 'rag', 'llm', 'tts', 'tts_first', 'first_audio'} <= set(events[-1]['ms'])
+    assert pipeline.get_stats()['turns'] == 1
+
+
+def test_speaking_over_a_pending_reply_cancels_it(synthetic_speech):
+    pending = Future()
+    switcher = StubSwitcher(pending, answered("Fine, what is it?"))
+
+    pipeline, events, audio = converse(
+        switcher, synthetic_speech(5.0, tones=[(0.5, 1.5), (2.5, 3.5)], pcm=True))
+
+    types = [event['type'] for event in events]
+    assert types.count('final') == 2
+    barge_in = next(event for event in events if event['type'] == 'barge_in')
+    assert barge_in['turn'] == 1
+    assert pending.cancelled()
+    assert [event['turn'] for event in events if event['type'] == 'audio'] == [2]
+    assert len(audio) == 1
+    assert pipeline.barge_ins == 1
@@ -10,6 +10,8 @@ from typing import Optional
 import wave
 import io
 
+from monitoring.metrics import inc, span
+
 logger = logging.getLogger(__name__)
 
 
@@ -17,13 +19,19 @@ class PiperTTS:
     """
     Text-to-Speech using Piper
     Falls back to mock audio if Piper not available
+    
+    Mock audio is one second of silence, or with a LatencySimulator,
+    silence as long as the text would take to speak, produced in the
+    profiled synthesis time.
     """
     
-    def __init__(self, model_path: str = "models/voice/piper", sample_rate: int = 22050):
+    def __init__(self, model_path: str = "models/voice/piper", sample_rate: int = 22050,
+                 simulator=None):
         self.model_path = Path(model_path)
         self.sample_rate = sample_rate
         self.use_mock = True
         self.piper_bin = None
+        self.simulator = simulator
         
         # Check if piper binary exists
         piper_paths = [
@@ -47,8 +55,15 @@ class PiperTTS:
         """Convert text to speech"""
         
         if self.use_mock:
-            return self._mock_synthesize(text, output_path)
+            inc("spector_mock_fallbacks_total", component="tts", reason="no_model")
+            with span("tts", backend="mock" if self.simulator is None else "simulated"):
+                return self._mock_synthesize(text, output_path)
         
+        with span("tts", backend="piper"):
+            return self._synthesize_piper(text, voice_id, output_path)
+    
+    def _synthesize_piper(self, text: str, voice_id: str,
+                          output_path: Optional[str]) -> bytes:
         try:
             # Run Piper command
             cmd = [
@@ -75,14 +90,21 @@ class PiperTTS:
                 return audio_data
             else:
                 logger.error(f"Piper failed: {error.decode()}")
+                inc("spector_mock_fallbacks_total", component="tts", reason="error")
                 return self._mock_synthesize(text, output_path)
                 
         except Exception as e:
             logger.error(f"Synthesis failed: {e}")
+            inc("spector_mock_fallbacks_total", component="tts", reason="error")
             return self._mock_synthesize(text, output_path)
     
     def _mock_synthesize(self, text: str, output_path: Optional[str] = None) -> bytes:
         """Generate mock WAV audio"""
+        seconds = 1.0
+        if self.simulator is not None and self.use_mock:
+            seconds = self.simulator.speech_seconds(text)
+            self.simulator.synthesize(seconds)
+        
         # Create minimal valid WAV file
         buffer = io.BytesIO()
         
@@ -91,8 +113,8 @@ class PiperTTS:
             wav.setsampwidth(2)  # 16-bit
             wav.setframerate(self.sample_rate)
             
-            # Silent audio (1 second)
-            silence = b'\x00\x00' * self.sample_rate
+            # Silent audio
+            silence = b'\x00\x00' * int(self.sample_rate * seconds)
             wav.writeframes(silence)
         
         audio_bytes = buffer.getvalue()
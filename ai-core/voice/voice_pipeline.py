@@ -0,0 +1,338 @@
+"""
+Voice Conversation Pipeline
+Player speech in, NPC speech out: STT -> RAG -> LLM -> TTS as streaming stages
+"""
+
+import asyncio
+import contextlib
+import logging
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, ContextManager, Dict, List, Optional
+
+from monitoring.metrics import observe
+from orchestration.adapter_catalog import adapter_for
+from voice.stt_stream import StreamingTranscriber
+
+logger = logging.getLogger(__name__)
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+def dialogue_prompt(agent: Dict[str, Any], player_message: str) -> str:
+    """The in-character reply prompt shared by /dialogue and voice sessions"""
+    return f"""You are {agent['name']}.
+Player says: "{player_message}"
+
+Respond naturally in character (1-2 sentences)."""
+
+
+def split_sentences(text: str) -> List[str]:
+    return [s for s in (part.strip() for part in _SENTENCE_END.split(text)) if s]
+
+
+@dataclass
+class VoiceTurn:
+    """One player utterance and the NPC reply it triggers"""
+    id: int
+    text: str
+    speech_end: float                       # perf_counter when the player stopped
+    timings: Dict[str, float] = field(default_factory=dict)
+    first_audio: Optional[float] = None
+    # perf_counter at which the client finishes playing what was sent
+    playing_until: float = 0.0
+    done: bool = False
+    cancelled: bool = False
+
+    def ms(self, since: float) -> float:
+        return round((time.perf_counter() - since) * 1000.0, 1)
+
+
+class VoicePipeline:
+    """
+    One full-duplex voice conversation between a player and an NPC
+
+    Four stages run as concurrent tasks joined by bounded queues:
+
+        audio -> [stt] -> utterances -> [respond] -> sentences -> [tts] -> client
+
+    stt runs StreamingTranscriber on incoming PCM; respond fetches the
+    NPC's context with RAGEngine.get_agent_context and generates the reply
+    through LoRASwitcher; tts synthesizes the reply sentence by sentence,
+    so the first sentence is playing while the rest are synthesized. The
+    player keeps being transcribed the whole time. Full queues push back
+    on the stage before them rather than growing without bound.
+
+    Barge-in: when the player starts speaking while a reply is in flight,
+    the reply is cancelled (a queued generation is withdrawn, pending
+    sentences are dropped) and a "barge_in" event tells the client to
+    stop playback.
+
+    Each turn ends with a "timing" event: stt (end of speech to final
+    transcript, including endpointing silence), rag, llm, tts_first and
+    first_audio (end of speech to the first audio sent), which is the
+    latency the player hears.
+
+    generation_slot() is entered around each reply's generation, e.g. a
+    SessionManager quota; an exception from it fails only that turn.
+    """
+
+    def __init__(self, npc_id: str, transcriber: StreamingTranscriber,
+                 rag_engine, lora_switcher, tts,
+                 send_event: Callable[[Dict[str, Any]], Awaitable[None]],
+                 send_audio: Callable[[bytes], Awaitable[None]],
+                 priority: Optional[str] = None,
+                 budget_ms: Optional[float] = None,
+                 generation_slot: Callable[[], ContextManager] = contextlib.nullcontext,
+                 max_tokens: int = 100,
+                 audio_queue_size: int = 64,
+                 utterance_queue_size: int = 2,
+                 sentence_queue_size: int = 4):
+        self.npc_id = npc_id
+        self.transcriber = transcriber
+        self.rag_engine = rag_engine
+        self.lora_switcher = lora_switcher
+        self.tts = tts
+        self.send_event = send_event
+        self.send_audio = send_audio
+        self.priority = priority
+        self.budget_ms = budget_ms
+        self.generation_slot = generation_slot
+        self.max_tokens = max_tokens
+
+        self._audio: asyncio.Queue = asyncio.Queue(maxsize=audio_queue_size)
+        self._utterances: asyncio.Queue = asyncio.Queue(maxsize=utterance_queue_size)
+        self._sentences: asyncio.Queue = asyncio.Queue(maxsize=sentence_queue_size)
+        self._tasks: List[asyncio.Task] = []
+        self._reply: Optional[asyncio.Task] = None
+        self._turn: Optional[VoiceTurn] = None
+        self._turns = 0
+        self._closed = asyncio.Event()
+        self._closing = False
+
+        self.barge_ins = 0
+
+    def start(self) -> None:
+        self._tasks = [
+            asyncio.create_task(self._stt_stage(), name=f"voice-stt-{self.npc_id}"),
+            asyncio.create_task(self._respond_stage(), name=f"voice-respond-{self.npc_id}"),
+            asyncio.create_task(self._tts_stage(), name=f"voice-tts-{self.npc_id}"),
+        ]
+
+    async def feed(self, pcm: bytes) -> None:
+        """Queue a chunk of 16 kHz mono PCM16 (waits if STT is behind)"""
+        await self._audio.put((pcm, time.perf_counter()))
+
+    async def finish(self) -> None:
+        """End of player audio: flush the transcriber and let replies drain"""
+        await self._audio.put(None)
+        await self._closed.wait()
+
+    async def close(self) -> None:
+        self._closing = True
+        self._cancel_reply()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def _stt_stage(self) -> None:
+        sample_rate = self.transcriber.sample_rate
+        while True:
+            item = await self._audio.get()
+            if item is None:
+                events = await asyncio.to_thread(self.transcriber.flush)
+                received = time.perf_counter()
+            else:
+                pcm, received = item
+                events = await asyncio.to_thread(self.transcriber.feed, pcm)
+
+            for event in events:
+                if event['type'] == 'speech_start' and self._reply_in_flight():
+                    await self._barge_in()
+                elif event['type'] == 'final' and event['text']:
+                    # Map the utterance's stream end time back to wall time
+                    behind = self.transcriber.ring.total / sample_rate - event['end']
+                    self._turns += 1
+                    turn = VoiceTurn(self._turns, event['text'], received - behind)
+                    turn.timings['stt'] = turn.ms(turn.speech_end)
+                    event['turn'] = turn.id
+                    await self._utterances.put(turn)
+                await self.send_event(event)
+
+            if item is None:
+                await self._utterances.put(None)
+                return
+
+    async def _respond_stage(self) -> None:
+        while True:
+            turn = await self._utterances.get()
+            if turn is None:
+                await self._sentences.put(None)
+                return
+
+            self._turn = turn
+            self._reply = asyncio.create_task(self._respond(turn))
+            try:
+                await self._reply
+            except asyncio.CancelledError:
+                # Barge-in cancels only the reply; re-raise if we are closing
+                if not turn.cancelled or self._closing:
+                    raise
+            except Exception as e:
+                turn.done = True
+                logger.error(f"Voice turn {turn.id} failed: {e}")
+                await self.send_event({'type': 'error', 'turn': turn.id, 'detail': str(e)})
+            finally:
+                self._reply = None
+
+    async def _respond(self, turn: VoiceTurn) -> None:
+        started = time.perf_counter()
+        context = await asyncio.to_thread(self.rag_engine.get_agent_context,
+                                          agent_id=self.npc_id, current_event=turn.text)
+        turn.timings['rag'] = turn.ms(started)
+        agent = context['agent']
+
+        started = time.perf_counter()
+        with self.generation_slot():
+            text = await asyncio.wrap_future(self.lora_switcher.submit_response(
+                adapter_for(agent), dialogue_prompt(agent, turn.text),
+                max_tokens=self.max_tokens, priority=self.priority,
+                budget_ms=self.budget_ms, archetype=agent['archetype']))
+        turn.timings['llm'] = turn.ms(started)
+
+        await self.send_event({'type': 'reply', 'turn': turn.id, 'text': text,
+                               'emotional_state': agent.get('emotional_state')})
+        voice_id = agent.get('voice_id', 'default')
+        sentences = split_sentences(text)
+        if not sentences:
+            turn.done = True
+        for index, sentence in enumerate(sentences):
+            await self._sentences.put((turn, index, len(sentences), sentence, voice_id))
+
+    async def _tts_stage(self) -> None:
+        while True:
+            item = await self._sentences.get()
+            if item is None:
+                self._closed.set()
+                return
+
+            turn, index, count, sentence, voice_id = item
+            if turn.cancelled:
+                continue
+
+            started = time.perf_counter()
+            audio = await asyncio.to_thread(self.tts.synthesize, sentence, voice_id)
+            if turn.cancelled:
+                continue
+
+            turn.timings['tts'] = round(turn.timings.get('tts', 0.0) + turn.ms(started), 1)
+            await self.send_event({'type': 'audio', 'turn': turn.id, 'seq': index,
+                                   'text': sentence, 'format': 'wav',
+                                   'sample_rate': self.tts.sample_rate})
+            await self.send_audio(audio)
+            # 16-bit mono WAV: 2 bytes per sample after the 44-byte header
+            duration = max(0, len(audio) - 44) / 2 / self.tts.sample_rate
+            turn.playing_until = max(turn.playing_until, time.perf_counter()) + duration
+
+            if turn.first_audio is None:
+                turn.first_audio = time.perf_counter()
+                turn.timings['tts_first'] = turn.ms(started)
+                turn.timings['first_audio'] = round(
+                    (turn.first_audio - turn.speech_end) * 1000.0, 1)
+            if index == count - 1:
+                turn.done = True
+                await self._report(turn)
+
+    def _reply_in_flight(self) -> bool:
+        """A reply is being generated, synthesized or still playing"""
+        turn = self._turn
+        if turn is None or turn.cancelled:
+            return False
+        return not turn.done or time.perf_counter() < turn.playing_until
+
+    def _cancel_reply(self) -> Optional[VoiceTurn]:
+        turn = self._turn
+        if turn is None or turn.cancelled:
+            return None
+        turn.cancelled = True
+        if self._reply is not None:
+            # Cancelling the wrapped future also withdraws a still-queued generation
+            self._reply.cancel()
+        while not self._sentences.empty():
+            item = self._sentences.get_nowait()
+            if item is None:
+                self._sentences.put_nowait(None)
+                break
+        return turn
+
+    async def _barge_in(self) -> None:
+        turn = self._cancel_reply()
+        if turn is None:
+            return
+        self.barge_ins += 1
+        observe("spector_stage_seconds", (time.perf_counter() - turn.speech_end),
+                stage="voice_barge_in")
+        await self.send_event({'type': 'barge_in', 'turn': turn.id})
+
+    async def _report(self, turn: VoiceTurn) -> None:
+        for stage, ms in turn.timings.items():
+            if stage != 'first_audio':
+                observe("spector_stage_seconds", ms / 1000.0, stage=f"voice_{stage}")
+        if 'first_audio' in turn.timings:
+            observe("spector_voice_latency_seconds", turn.timings['first_audio'] / 1000.0)
+        await self.send_event({'type': 'timing', 'turn': turn.id, 'ms': dict(turn.timings)})
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'npc_id': self.npc_id,
+            'turns': self._turns,
+            'barge_ins': self.barge_ins,
+            'stt': self.transcriber.get_stats()
+        }
+
+
+if __name__ == '__main__':
+    import numpy as np
+    from concurrent.futures import Future
+
+    from voice.stt_whisper import WhisperSTT
+    from voice.tts_piper import PiperTTS
+
+    logging.basicConfig(level=logging.INFO)
+
+    class DemoRAG:
+        def get_agent_context(self, agent_id, current_event):
+            return {'agent': {'name': 'Martha Quinn', 'archetype': 'merchant',
+                              'emotional_state': 'neutral'}}
+
+    class DemoSwitcher:
+        def submit_response(self, adapter_name, prompt, **kwargs):
+            future = Future()
+            future.set_result("Fresh bread, two coins. Mind the step on your way out!")
+            return future
+
+    async def main():
+        rate = 16000
+        t = np.arange(rate) / rate
+        noise = (0.003 * np.random.default_rng(0).standard_normal(rate)).astype(np.float32)
+        speech = (0.3 * np.sin(2 * np.pi * 220 * t)).astype(np.float32) + noise
+        pcm = (np.concatenate((noise, speech, noise)) * 32767).astype("<i2").tobytes()
+
+        async def send_event(event):
+            print(event)
+
+        async def send_audio(audio):
+            print(f"<{len(audio)} bytes of audio>")
+
+        pipeline = VoicePipeline("npc_001", StreamingTranscriber(WhisperSTT()),
+                                 DemoRAG(), DemoSwitcher(), PiperTTS(),
+                                 send_event, send_audio)
+        pipeline.start()
+        for offset in range(0, len(pcm), 3200):
+            await pipeline.feed(pcm[offset:offset + 3200])
+        await pipeline.finish()
+        await pipeline.close()
+        print(pipeline.get_stats())
+
+    asyncio.run(main())
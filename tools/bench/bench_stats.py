@@ -0,0 +1,141 @@
+"""
+Benchmark Statistics
+Percentile summaries, reports and baseline regression gates shared by the bench tools
+"""
+
+import argparse
+import json
+import math
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+AI_CORE = Path(__file__).resolve().parents[2] / "ai-core"
+TOOLS = Path(__file__).resolve().parents[1]
+
+# Sections of a results file that hold {name: stats} latency summaries
+LATENCY_SECTIONS = ("endpoints", "stages", "benchmarks")
+
+
+def percentile(ordered: List[float], q: float) -> float:
+    """Linear-interpolated percentile of an already sorted list"""
+    if not ordered:
+        return 0.0
+    position = (len(ordered) - 1) * q
+    low = math.floor(position)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+
+def summarize(samples_ms: List[float]) -> Dict[str, float]:
+    ordered = sorted(samples_ms)
+    return {
+        'count': len(ordered),
+        'mean': round(sum(ordered) / len(ordered), 3) if ordered else 0.0,
+        'p50': round(percentile(ordered, 0.50), 3),
+        'p95': round(percentile(ordered, 0.95), 3),
+        'p99': round(percentile(ordered, 0.99), 3),
+        'max': round(ordered[-1], 3) if ordered else 0.0
+    }
+
+
+def summarize_groups(groups: Dict[str, List[float]]) -> Dict[str, Dict[str, float]]:
+    return {name: summarize(samples) for name, samples in sorted(groups.items())}
+
+
+def print_table(title: str, section: Dict[str, Dict[str, Any]]) -> None:
+    if not section:
+        return
+    width = max(len(name) for name in section)
+    print(f"\n{title}")
+    print(f"  {'':{width}}  {'count':>7} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10} {'max ms':>10}")
+    for name, stats in section.items():
+        print(f"  {name:{width}}  {stats['count']:>7} {stats['p50']:>10.2f} "
+              f"{stats['p95']:>10.2f} {stats['p99']:>10.2f} {stats['max']:>10.2f}")
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any],
+            tolerance: float = 0.2, min_delta_ms: float = 1.0) -> List[str]:
+    """
+    Regressions of results against baseline: a p50, p95 or p99 more than
+    tolerance (fractional) and min_delta_ms above the baseline's. Series
+    missing from the results are reported too; new series are not
+    """
+    regressions = []
+    for section in LATENCY_SECTIONS:
+        for name, before in baseline.get(section, {}).items():
+            after = results.get(section, {}).get(name)
+            if after is None or not after.get('count'):
+                regressions.append(f"{section}/{name}: no samples (baseline had {before['count']})")
+                continue
+            for key in ('p50', 'p95', 'p99'):
+                limit = before[key] * (1.0 + tolerance)
+                if after[key] > limit and after[key] - before[key] > min_delta_ms:
+                    regressions.append(f"{section}/{name} {key}: {after[key]:.2f}ms vs "
+                                       f"baseline {before[key]:.2f}ms "
+                                       f"(+{(after[key] / before[key] - 1) * 100 if before[key] else math.inf:.0f}%)")
+    return regressions
+
+
+def existing_baseline(value: str) -> Path:
+    """--baseline type: fail before the run, not after it, if there is none"""
+    path = Path(value)
+    if not path.is_file():
+        raise argparse.ArgumentTypeError(
+            f"no baseline at {path}; baselines are machine-specific, so record one "
+            f"on this machine first by running the same command with "
+            f"--save-baseline {path} instead of --baseline")
+    return path
+
+
+def add_arguments(parser) -> None:
+    """Output and baseline options common to every bench tool"""
+    parser.add_argument("--output", type=Path, help="Write results JSON here")
+    parser.add_argument("--baseline", type=existing_baseline,
+                        help="Compare against this results file; exit 1 on regression")
+    parser.add_argument("--save-baseline", type=Path,
+                        help="Write these results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="Allowed fractional slowdown per percentile (default 0.2)")
+    parser.add_argument("--min-delta-ms", type=float, default=1.0,
+                        help="Ignore slowdowns smaller than this (default 1ms)")
+
+
+def finish(results: Dict[str, Any], args) -> int:
+    """Write results, then gate on the baseline; returns the exit code"""
+    for path in (args.output, args.save_baseline):
+        if path is not None:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(json.dumps(results, indent=2) + "\n")
+            print(f"\nWrote {path}")
+
+    if args.baseline is None:
+        return 0
+
+    baseline = json.loads(args.baseline.read_text())
+    regressions = compare(results, baseline, args.tolerance, args.min_delta_ms)
+    if regressions:
+        print(f"\n❌ {len(regressions)} regression(s) against {args.baseline}:")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+    print(f"\n✅ Within {args.tolerance:.0%} of {args.baseline}")
+    return 0
+
+
+def add_import_paths() -> None:
+    """Make ai-core modules and tools/seed_db importable"""
+    for path in (str(AI_CORE), str(TOOLS)):
+        if path not in sys.path:
+            sys.path.insert(0, path)
+
+
+def meta(extra: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    import os
+    import platform
+    return {
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'cpus': os.cpu_count(),
+        **(extra or {})
+    }
@@ -0,0 +1,242 @@
+"""
+Latency Profile Capture
+Times the real LLM, adapter, STT and TTS backends and writes a profile for the mock backends
+"""
+
+import argparse
+import io
+import json
+import logging
+import math
+import random
+import sys
+import time
+import wave
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from bench_stats import AI_CORE, add_import_paths, meta
+
+add_import_paths()
+
+from models.simulator import Distribution, LatencyProfile  # noqa: E402
+
+PLAYER_LINES = [
+    "Did you see who broke the window?",
+    "What's good today?",
+    "I need help, someone is following me.",
+    "Have you heard anything about the fight last night?",
+]
+MEMORY_LINES = [
+    "Saw a stranger loitering by the bakery at dawn.",
+    "The landlord raised the rent again this month.",
+    "Heard shouting from the tavern after midnight.",
+    "A police car parked outside the apartments for an hour.",
+]
+SENTENCES = [
+    "Hello there.",
+    "I don't have time for this nonsense, come back when you are buying bread.",
+    "Someone's going to pay for this damage to my property, and it won't be me.",
+    "Oh no, I really can't deal with this right now. The exam is tomorrow and "
+    "my notes are all over the floor.",
+]
+
+
+def fit_linear(xs: List[float], ys: List[float]) -> Tuple[float, float, float]:
+    """
+    Least-squares y = intercept + slope * x (both clamped at 0), and the
+    spread of y around the fit as a coefficient of variation
+    """
+    n = len(xs)
+    mean_x, mean_y = sum(xs) / n, sum(ys) / n
+    var_x = sum((x - mean_x) ** 2 for x in xs)
+    slope = (sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / var_x
+             if var_x > 0 else 0.0)
+    slope = max(0.0, slope)
+    intercept = max(0.0, mean_y - slope * mean_x)
+    ratios = [y / (intercept + slope * x) for x, y in zip(xs, ys) if intercept + slope * x > 0]
+    cv = (math.sqrt(sum((r - 1.0) ** 2 for r in ratios) / len(ratios)) if ratios else 0.0)
+    return intercept, slope, round(cv, 3)
+
+
+def empirical(samples: List[float]) -> Optional[Distribution]:
+    if not samples:
+        return None
+    return Distribution(kind="empirical", samples=[round(s, 4) for s in samples])
+
+
+def capture_llm(model_path: str, runs: int, agents: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Prompt evaluation per token, decode speed and reply length, per generation"""
+    from models.llm_engine import LLMEngine
+    from voice.voice_pipeline import dialogue_prompt
+
+    engine = LLMEngine(model_path=model_path)
+    if engine.use_mock:
+        print("LLM: no model loaded, skipping")
+        return {}
+
+    rng = random.Random(0)
+    prompt_ms, decode_rates, reply_tokens = [], [], []
+    for run in range(runs):
+        # Vary the context length the way RAG memories do
+        context = "".join(f"- {rng.choice(MEMORY_LINES)}\n" for _ in range(run % 8 * 4))
+        prompt = (f"Relevant memories:\n{context}\n" if context else "") + dialogue_prompt(
+            rng.choice(agents), rng.choice(PLAYER_LINES))
+        prompt_tokens = engine.count_tokens(prompt)
+        # Drop the KV cache so every run evaluates its whole prompt
+        engine.model.reset()
+
+        start = time.perf_counter()
+        first_token_at, tokens = None, 0
+        for _ in engine.model(prompt, max_tokens=150, temperature=0.7,
+                              stop=engine.DEFAULT_STOP, echo=False, stream=True):
+            if first_token_at is None:
+                first_token_at = time.perf_counter()
+            tokens += 1
+        end = time.perf_counter()
+
+        if first_token_at is None:
+            continue
+        prompt_ms.append((first_token_at - start) * 1000.0 / prompt_tokens)
+        if tokens > 1 and end > first_token_at:
+            decode_rates.append((tokens - 1) / (end - first_token_at))
+        reply_tokens.append(tokens)
+        print(f"LLM run {run + 1}/{runs}: {prompt_tokens} prompt tokens, {tokens} generated")
+
+    return {
+        'prompt_ms_per_token': empirical(prompt_ms),
+        'decode_tokens_per_second': empirical(decode_rates),
+        'reply_tokens': empirical(reply_tokens)
+    }
+
+
+def capture_adapters(lora_dir: str, runs: int) -> Dict[str, Any]:
+    """Cold-cache adapter loads against adapter size"""
+    from orchestration.lora_switcher import LoRASwitcher
+
+    switcher = LoRASwitcher(base_model_path="", lora_directory=lora_dir)
+    names = switcher.catalog.list_adapters()
+    if not names:
+        print(f"Adapters: none in {lora_dir}, skipping")
+        return {}
+
+    sizes_mb, load_ms = [], []
+    for run in range(runs):
+        for name in names:
+            switcher.clear_cache()
+            start = time.perf_counter()
+            adapter = switcher.get_adapter(name)
+            load_ms.append((time.perf_counter() - start) * 1000.0)
+            sizes_mb.append(adapter['size_bytes'] / 2 ** 20)
+    print(f"Adapters: {len(load_ms)} loads of {len(names)} adapters")
+
+    intercept, slope, cv = fit_linear(sizes_mb, load_ms)
+    return {
+        'adapter_load_ms': Distribution(mean=round(intercept, 3), cv=cv),
+        'adapter_load_ms_per_mb': Distribution(mean=round(slope, 4), cv=cv) if slope else None
+    }
+
+
+def capture_stt(model_size: str, device: str, runs: int) -> Dict[str, Any]:
+    """Whisper time against clip duration"""
+    import numpy as np
+
+    from voice.stt_whisper import WhisperSTT
+
+    stt = WhisperSTT(model_size=model_size, device=device)
+    if stt.use_mock:
+        print("STT: Whisper not loaded, skipping")
+        return {}
+
+    rng = np.random.default_rng(0)
+    durations, elapsed_ms = [], []
+    for run in range(runs):
+        seconds = (2.0, 5.0, 10.0, 20.0)[run % 4]
+        # Low noise: Whisper's cost depends on the window, not the words
+        samples = (rng.standard_normal(int(seconds * stt.SAMPLE_RATE)) * 0.01).astype(np.float32)
+        start = time.perf_counter()
+        stt.transcribe_array(samples, language="en")
+        elapsed_ms.append((time.perf_counter() - start) * 1000.0)
+        durations.append(seconds)
+        print(f"STT run {run + 1}/{runs}: {seconds:.0f}s clip in {elapsed_ms[-1]:.0f}ms")
+
+    intercept, slope, cv = fit_linear(durations, elapsed_ms)
+    return {
+        'stt_overhead_ms': Distribution(mean=round(intercept, 3), cv=cv),
+        'stt_real_time_factor': Distribution(mean=round(slope / 1000.0, 4), cv=cv)
+    }
+
+
+def capture_tts(model_path: str, runs: int) -> Dict[str, Any]:
+    """Piper time against audio duration, and speaking rate"""
+    from voice.tts_piper import PiperTTS
+
+    tts = PiperTTS(model_path=model_path)
+    if tts.use_mock:
+        print("TTS: Piper not found, skipping")
+        return {}
+
+    durations, elapsed_ms, chars = [], [], 0
+    for run in range(runs):
+        text = SENTENCES[run % len(SENTENCES)]
+        start = time.perf_counter()
+        audio = tts.synthesize(text)
+        elapsed_ms.append((time.perf_counter() - start) * 1000.0)
+        with wave.open(io.BytesIO(audio), 'rb') as wav:
+            durations.append(wav.getnframes() / float(wav.getframerate()))
+        chars += len(text)
+        print(f"TTS run {run + 1}/{runs}: {durations[-1]:.1f}s audio in {elapsed_ms[-1]:.0f}ms")
+
+    intercept, slope, cv = fit_linear(durations, elapsed_ms)
+    return {
+        'tts_overhead_ms': Distribution(mean=round(intercept, 3), cv=cv),
+        'tts_real_time_factor': Distribution(mean=round(slope / 1000.0, 4), cv=cv),
+        'tts_chars_per_second': round(chars / sum(durations), 2) if sum(durations) else 15.0
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Capture a latency profile from real backends")
+    parser.add_argument("--output", type=Path, required=True, help="Profile JSON to write")
+    parser.add_argument("--name", default="captured", help="Profile name")
+    parser.add_argument("--model", help="GGUF model (skips the LLM if unset)")
+    parser.add_argument("--lora-dir", default=str(AI_CORE / "models" / "loras"))
+    parser.add_argument("--whisper-model", default="base")
+    parser.add_argument("--whisper-device", default="cpu")
+    parser.add_argument("--piper-model", default=str(AI_CORE / "models" / "voice" / "piper"))
+    parser.add_argument("--parallel-generations", type=int, default=1,
+                        help="Generations the hardware runs at full speed at once")
+    parser.add_argument("--runs", type=int, default=20, help="Measurements per backend")
+    parser.add_argument("--only", choices=["llm", "adapters", "stt", "tts"], action="append",
+                        help="Capture only these backends")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    groups = args.only or ["llm", "adapters", "stt", "tts"]
+
+    import yaml
+    with open(AI_CORE / "config" / "agents.yaml", 'r') as f:
+        agents = yaml.safe_load(f)['agents']
+
+    entries: Dict[str, Any] = {'name': args.name,
+                               'parallel_generations': args.parallel_generations}
+    if "llm" in groups and args.model:
+        entries.update(capture_llm(args.model, args.runs, agents))
+    if "adapters" in groups:
+        entries.update(capture_adapters(args.lora_dir, max(1, args.runs // 4)))
+    if "stt" in groups:
+        entries.update(capture_stt(args.whisper_model, args.whisper_device, args.runs))
+    if "tts" in groups:
+        entries.update(capture_tts(args.piper_model, args.runs))
+
+    profile = LatencyProfile.from_dict({k: v for k, v in entries.items() if v is not None})
+    data = {**profile.to_dict(), 'captured': meta({'model': args.model, 'runs': args.runs,
+                                                    'whisper_model': args.whisper_model})}
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(json.dumps(data, indent=2) + "\n")
+    print(f"\nWrote {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,315 @@
+"""
+API Load Generator
+Replays Unreal-client traffic (event bursts, dialogue sessions) and reports latency percentiles
+"""
+
+import argparse
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import requests
+import yaml
+
+from bench_stats import (AI_CORE, add_arguments, add_import_paths, finish, meta,
+                         print_table, summarize_groups)
+
+# What UAIAPIClient::SendEvent posts for typical gameplay moments
+EVENT_KINDS = [
+    ("loud_noise", "broke_window", 85, "Player smashed a window with a crowbar"),
+    ("loud_noise", "car_alarm", 70, "A car alarm is blaring in the street"),
+    ("violence", "fistfight", 60, "Two men are fighting outside the tavern"),
+    ("property_damage", "graffiti", 20, "Someone spray-painted the wall"),
+    ("conversation", "argument", 40, "Player is shouting at a shopkeeper"),
+]
+PLAYER_LINES = [
+    "Did you see who broke the window?",
+    "What's good today?",
+    "I need help, someone is following me.",
+    "Why is the door to the building locked?",
+    "Have you heard anything about the fight last night?",
+    "Can I rent the apartment upstairs?",
+]
+
+
+class LoadRecorder:
+    """Thread-safe per-endpoint and per-stage latency samples"""
+
+    def __init__(self, warmup_until: float):
+        self.warmup_until = warmup_until
+        self.endpoints: Dict[str, List[float]] = {}
+        self.stages: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def record(self, endpoint: str, started: float, elapsed_ms: float,
+               trace: Optional[Dict[str, Any]], error: Optional[str]) -> None:
+        if started < self.warmup_until:
+            return
+        with self._lock:
+            if error is not None:
+                self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+                return
+            self.endpoints.setdefault(endpoint, []).append(elapsed_ms)
+            if trace is not None:
+                for child in trace['root'].get('children', []):
+                    self._record_span(child)
+
+    def _record_span(self, node: Dict[str, Any]) -> None:
+        self.stages.setdefault(node['name'], []).append(node['duration_ms'])
+        for child in node.get('children', []):
+            self._record_span(child)
+
+
+class LoadGenerator:
+    """
+    Open-loop event bursts plus closed-loop dialogue sessions
+
+    Bursts arrive as a Poisson process (mean burst_interval_s apart); each
+    is 1..2*burst_size events at one location fired concurrently within
+    burst_spread_ms, like the cluster of SendEvent calls a fight or a
+    smashed window produces. Each dialogue session is a player talking to
+    one NPC: send a line, wait for the reply, think for ~think_ms, repeat.
+    Every request asks for its trace, so per-stage times come from the
+    server's own span tree.
+    """
+
+    def __init__(self, url: str, npc_ids: List[str], locations: List[str],
+                 duration_s: float, warmup_s: float, burst_interval_s: float,
+                 burst_size: int, burst_spread_ms: float, dialogue_sessions: int,
+                 think_ms: float, seed: int = 0, timeout_s: float = 30.0):
+        self.url = url.rstrip('/')
+        self.npc_ids = npc_ids
+        self.locations = locations
+        self.duration_s = duration_s
+        self.burst_interval_s = burst_interval_s
+        self.burst_size = burst_size
+        self.burst_spread_ms = burst_spread_ms
+        self.dialogue_sessions = dialogue_sessions
+        self.think_ms = think_ms
+        self.timeout_s = timeout_s
+        self.rng = random.Random(seed)
+
+        self.started = time.perf_counter()
+        self.deadline = self.started + warmup_s + duration_s
+        self.recorder = LoadRecorder(self.started + warmup_s)
+        self._local = threading.local()
+
+    def _session(self) -> requests.Session:
+        if not hasattr(self._local, 'session'):
+            self._local.session = requests.Session()
+            self._local.session.headers['X-Spector-Trace'] = '1'
+        return self._local.session
+
+    def _post(self, endpoint: str, payload: Dict[str, Any]) -> None:
+        started = time.perf_counter()
+        trace, error = None, None
+        try:
+            response = self._session().post(self.url + endpoint, json=payload,
+                                            timeout=self.timeout_s)
+            if response.status_code != 200:
+                error = f"HTTP {response.status_code}"
+        except requests.RequestException as e:
+            error = str(e)
+        elapsed_ms = (time.perf_counter() - started) * 1000.0
+        if error is None and 'X-Spector-Trace-Id' in response.headers:
+            trace = self._fetch_trace(response.headers['X-Spector-Trace-Id'])
+        self.recorder.record(endpoint, started, elapsed_ms, trace, error)
+
+    def _fetch_trace(self, trace_id: str) -> Optional[Dict[str, Any]]:
+        """The request's span tree; None once the server's trace store dropped it"""
+        try:
+            response = self._session().get(f"{self.url}/admin/traces/{trace_id}",
+                                           timeout=self.timeout_s)
+        except requests.RequestException:
+            return None
+        return response.json() if response.status_code == 200 else None
+
+    def _send_event(self, location: str, delay_s: float) -> None:
+        time.sleep(delay_s)
+        event_type, action, noise, description = self.rng.choice(EVENT_KINDS)
+        self._post("/event", {
+            'event_type': event_type,
+            'action': action,
+            'location': location,
+            'noise_level': noise,
+            'event_description': description
+        })
+
+    def _bursts(self, pool: ThreadPoolExecutor) -> None:
+        rng = random.Random(self.rng.random())
+        while True:
+            time.sleep(rng.expovariate(1.0 / self.burst_interval_s))
+            if time.perf_counter() >= self.deadline:
+                return
+            location = rng.choice(self.locations)
+            for _ in range(rng.randint(1, 2 * self.burst_size - 1)):
+                pool.submit(self._send_event, location,
+                            rng.uniform(0, self.burst_spread_ms / 1000.0))
+
+    def _dialogue(self, index: int) -> None:
+        rng = random.Random(self.rng.random() + index)
+        npc_id = self.npc_ids[index % len(self.npc_ids)]
+        while time.perf_counter() < self.deadline:
+            self._post("/dialogue", {'npc_id': npc_id,
+                                     'player_message': rng.choice(PLAYER_LINES)})
+            time.sleep(rng.expovariate(1000.0 / self.think_ms) if self.think_ms else 0)
+
+    def run(self) -> Dict[str, Any]:
+        threads = [threading.Thread(target=self._dialogue, args=(i,), daemon=True)
+                   for i in range(self.dialogue_sessions)]
+        with ThreadPoolExecutor(max_workers=64, thread_name_prefix="bench-event") as pool:
+            for thread in threads:
+                thread.start()
+            if self.burst_interval_s > 0:
+                self._bursts(pool)
+            for thread in threads:
+                thread.join()
+
+        recorder = self.recorder
+        measured_s = time.perf_counter() - recorder.warmup_until
+        return {
+            'endpoints': summarize_groups(recorder.endpoints),
+            'stages': summarize_groups(recorder.stages),
+            'throughput_rps': {name: round(len(samples) / measured_s, 2)
+                               for name, samples in recorder.endpoints.items()},
+            'errors': dict(recorder.errors)
+        }
+
+
+def write_stub_adapters(agents_path: str, lora_dir: Path) -> None:
+    """Tiny mapped adapter for every agent's lora_adapter, with its archetype's sidecar metadata"""
+    add_import_paths()
+    import numpy as np
+    from models.adapter_format import write_adapter
+    from orchestration.adapter_catalog import adapter_for
+
+    with open(agents_path, 'r') as f:
+        agents = yaml.safe_load(f)['agents']
+    sidecars = AI_CORE / "models" / "loras"
+    for agent in agents:
+        adapter = lora_dir / adapter_for(agent)
+        write_adapter(str(adapter), {'lora_a': np.zeros(16, dtype=np.float32)})
+        sidecar = sidecars / f"{agent['archetype']}.json"
+        if sidecar.exists():
+            shutil.copy(sidecar, adapter.with_suffix('.json'))
+
+
+def spawn_server(port: int, token_ms: float, workers: int, lora_dir: Path,
+                 profile: Optional[Path] = None) -> subprocess.Popen:
+    """Start main_api on the mock backends and wait until it is ready"""
+    env = dict(os.environ, SPECTOR_MOCK_TOKEN_MS=str(token_ms),
+               SPECTOR_LLM_WORKERS=str(workers), SPECTOR_LORA_DIR=str(lora_dir))
+    if profile is not None:
+        env['SPECTOR_LATENCY_PROFILE'] = str(profile.resolve())
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main_api:app", "--port", str(port),
+         "--log-level", "warning"],
+        cwd=AI_CORE, env=env)
+
+    deadline = time.monotonic() + 120
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"API server exited with code {server.returncode}")
+        try:
+            response = requests.get(f"http://127.0.0.1:{port}/ready", timeout=1)
+        except requests.RequestException:
+            time.sleep(0.5)
+            continue
+        if response.status_code == 200:
+            return server
+        failed = {name: status['error'] for name, status in response.json()['services'].items()
+                  if status['eager'] and status['state'] == 'failed'}
+        if failed:
+            server.terminate()
+            raise RuntimeError(f"API services failed to start: {failed} (the server needs "
+                               f"config/settings.json and a database from tools/seed_db.py)")
+        time.sleep(0.5)
+    server.terminate()
+    raise RuntimeError("API server did not become ready")
+
+
+def load_world(agents_path: str):
+    with open(agents_path, 'r') as f:
+        agents = yaml.safe_load(f)['agents']
+    npc_ids = [agent['id'] for agent in agents]
+    locations = sorted({block['location'] for agent in agents
+                        for block in agent.get('schedule') or []})
+    return npc_ids, locations or ['street']
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Load test the Spector API")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--spawn", action="store_true",
+                        help="Start main_api (mock backends) for the run")
+    parser.add_argument("--port", type=int, default=8765, help="Port for --spawn")
+    parser.add_argument("--token-ms", type=float, default=20.0,
+                        help="Mock LLM latency per generated token, with --spawn")
+    parser.add_argument("--profile", type=Path,
+                        help="Latency profile for the mock backends, with --spawn "
+                             "(replaces --token-ms)")
+    parser.add_argument("--llm-workers", type=int, default=1,
+                        help="SPECTOR_LLM_WORKERS, with --spawn")
+    parser.add_argument("--agents", default=str(AI_CORE / "config" / "agents.yaml"),
+                        help="agents.yaml the server uses (NPC ids and locations)")
+    parser.add_argument("--duration", type=float, default=30.0, help="Measured seconds")
+    parser.add_argument("--warmup", type=float, default=3.0, help="Unmeasured seconds first")
+    parser.add_argument("--burst-interval", type=float, default=2.0,
+                        help="Mean seconds between event bursts (0 disables events)")
+    parser.add_argument("--burst-size", type=int, default=3, help="Mean events per burst")
+    parser.add_argument("--burst-spread-ms", type=float, default=200.0)
+    parser.add_argument("--dialogue-sessions", type=int, default=4)
+    parser.add_argument("--think-ms", type=float, default=1500.0,
+                        help="Mean pause between a reply and the next player line")
+    parser.add_argument("--seed", type=int, default=0)
+    add_arguments(parser)
+    args = parser.parse_args(argv)
+
+    npc_ids, locations = load_world(args.agents)
+    server = None
+    url = args.url
+    lora_dir = tempfile.TemporaryDirectory(prefix="spector-bench-loras-")
+    if args.spawn:
+        write_stub_adapters(args.agents, Path(lora_dir.name))
+        server = spawn_server(args.port, args.token_ms, args.llm_workers, Path(lora_dir.name),
+                              args.profile)
+        url = f"http://127.0.0.1:{args.port}"
+
+    try:
+        print(f"Load testing {url} for {args.duration:.0f}s "
+              f"({args.dialogue_sessions} dialogue sessions, bursts every "
+              f"~{args.burst_interval}s)")
+        generator = LoadGenerator(url, npc_ids, locations, args.duration, args.warmup,
+                                  args.burst_interval, args.burst_size,
+                                  args.burst_spread_ms, args.dialogue_sessions,
+                                  args.think_ms, args.seed)
+        results = generator.run()
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+        lora_dir.cleanup()
+
+    results['meta'] = meta({'url': url, 'duration_s': args.duration,
+                            'token_ms': args.token_ms if args.spawn else None,
+                            'profile': str(args.profile) if args.spawn and args.profile else None,
+                            'dialogue_sessions': args.dialogue_sessions,
+                            'burst_interval_s': args.burst_interval,
+                            'burst_size': args.burst_size})
+    print_table("Endpoints (client-observed)", results['endpoints'])
+    print_table("Stages (server spans)", results['stages'])
+    print(f"\nThroughput: {results['throughput_rps']}  Errors: {results['errors'] or 'none'}")
+    return finish(results, args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,147 @@
+"""
+Micro-Benchmarks
+Times the Game Master, RAG and LoRA cache hot paths in-process on synthetic data
+"""
+
+import argparse
+import logging
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+from bench_stats import AI_CORE, add_arguments, add_import_paths, finish, meta, print_table, summarize
+
+add_import_paths()
+
+
+def measure(fn: Callable[[int], object], calls: int, warmup: int = 10) -> List[float]:
+    """Per-call milliseconds of fn(i) for i in range(calls)"""
+    for i in range(warmup):
+        fn(i)
+    samples = []
+    for i in range(calls):
+        started = time.perf_counter()
+        fn(i)
+        samples.append((time.perf_counter() - started) * 1000.0)
+    return samples
+
+
+def bench_game_master(workdir: Path, agents: int, calls: int) -> Dict[str, List[float]]:
+    from orchestration.game_master import GameMaster
+    from seed_db import SyntheticWorld
+
+    world = SyntheticWorld(agents=agents, memories_per_agent=0, objects=0)
+    world_path = workdir / "world.yaml"
+    world.write_yaml(world_path)
+    game_master = GameMaster(config_path=str(AI_CORE / "config" / "settings.example.json"),
+                             agents_path=str(world_path))
+
+    rng = random.Random(0)
+    events = [{'event_type': rng.choice(["loud_noise", "violence", "conversation"]),
+               'location': rng.choice(world.locations), 'noise_level': 80}
+              for _ in range(64)]
+    return {
+        f"get_affected_agents[{agents}]":
+            measure(lambda i: game_master.get_affected_agents(events[i % 64]), calls)
+    }
+
+
+def bench_rag(workdir: Path, agents: int, memories: int, calls: int) -> Dict[str, List[float]]:
+    from orchestration.rag_engine import RAGEngine
+    from seed_db import SyntheticWorld
+
+    db_path = workdir / "bench.db"
+    world = SyntheticWorld(agents=agents, memories_per_agent=memories, objects=0,
+                           relationships_per_agent=0)
+    world.write_sqlite(db_path)
+    rag = RAGEngine(db_path=str(db_path))
+
+    rng = random.Random(0)
+    queries = ["window", "bicycle", "noise", "shouting", "ledger", "tavern"]
+    agent_ids = [agent['id'] for agent in world.agents]
+    total = agents * memories
+    return {
+        f"retrieve_memories[agent,{total}]": measure(
+            lambda i: rag.retrieve_memories(queries[i % len(queries)],
+                                            agent_id=rng.choice(agent_ids)), calls),
+        f"retrieve_memories[global,{total}]": measure(
+            lambda i: rag.retrieve_memories(queries[i % len(queries)]), max(10, calls // 10)),
+    }
+
+
+def bench_lora_cache(workdir: Path, adapters: int, adapter_mb: float,
+                     calls: int) -> Dict[str, List[float]]:
+    import numpy as np
+
+    from models.adapter_format import write_adapter
+    from orchestration.lora_switcher import LoRASwitcher
+
+    lora_dir = workdir / "loras"
+    lora_dir.mkdir()
+    elements = int(adapter_mb * 1024 * 1024 / 4)
+    for index in range(adapters):
+        write_adapter(str(lora_dir / f"npc_{index:03d}.lora"),
+                      {'lora_a': np.zeros(elements, dtype=np.float32)})
+    names = [f"npc_{index:03d}.lora" for index in range(adapters)]
+
+    # Room for half the adapters: a cycling working set misses every time
+    capacity = int(adapters // 2 * elements * 4 * 1.01)
+    switcher = LoRASwitcher(base_model_path="", lora_directory=str(lora_dir),
+                            max_cache_bytes=capacity)
+    hot = names[:adapters // 4]
+    for name in hot:
+        switcher.get_adapter(name)
+
+    def pinned(i):
+        with switcher.use_adapter(hot[i % len(hot)]):
+            pass
+
+    return {
+        "lora_cache[hit]": measure(lambda i: switcher.get_adapter(hot[i % len(hot)]), calls),
+        "lora_cache[pinned_hit]": measure(pinned, calls),
+        "lora_cache[miss_evict]": measure(
+            lambda i: switcher.get_adapter(names[i % adapters]), calls, warmup=adapters),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Spector hot-path micro-benchmarks")
+    parser.add_argument("--calls", type=int, default=1000, help="Timed calls per benchmark")
+    parser.add_argument("--agents", type=int, default=1000)
+    parser.add_argument("--memories", type=int, default=100, help="Memories per agent (RAG)")
+    parser.add_argument("--adapters", type=int, default=32)
+    parser.add_argument("--adapter-mb", type=float, default=4.0)
+    parser.add_argument("--only", choices=["game_master", "rag", "lora_cache"],
+                        action="append", help="Run only these groups")
+    add_arguments(parser)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    groups = args.only or ["game_master", "rag", "lora_cache"]
+
+    samples: Dict[str, List[float]] = {}
+    with tempfile.TemporaryDirectory(prefix="spector-bench-") as tmp:
+        workdir = Path(tmp)
+        if "game_master" in groups:
+            samples.update(bench_game_master(workdir, args.agents, args.calls))
+        if "rag" in groups:
+            samples.update(bench_rag(workdir, args.agents, args.memories, args.calls))
+        if "lora_cache" in groups:
+            samples.update(bench_lora_cache(workdir, args.adapters, args.adapter_mb,
+                                            args.calls))
+
+    results = {
+        'benchmarks': {name: summarize(values) for name, values in samples.items()},
+        'meta': meta({'calls': args.calls, 'agents': args.agents,
+                      'memories_per_agent': args.memories, 'adapters': args.adapters,
+                      'adapter_mb': args.adapter_mb})
+    }
+    print_table("Micro-benchmarks", results['benchmarks'])
+    return finish(results, args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
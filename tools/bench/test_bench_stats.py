@@ -0,0 +1,55 @@
+import argparse
+import json
+
+import pytest
+
+from bench_stats import compare, existing_baseline, finish, percentile, summarize
+
+
+def results(p50, p95=None, p99=None, count=100, section='endpoints', name='/event'):
+    return {section: {name: {'count': count, 'p50': p50, 'p95': p95 or p50,
+                             'p99': p99 or p95 or p50}}}
+
+
+def test_percentiles_interpolate_between_samples():
+    ordered = [10.0, 20.0, 30.0, 40.0]
+    assert percentile(ordered, 0.5) == 25.0
+    assert percentile(ordered, 0.0) == 10.0
+    assert percentile(ordered, 1.0) == 40.0
+    assert percentile([], 0.5) == 0.0
+
+    stats = summarize([40.0, 10.0, 30.0, 20.0])
+    assert stats == {'count': 4, 'mean': 25.0, 'p50': 25.0, 'p95': 38.5,
+                     'p99': 39.7, 'max': 40.0}
+    assert summarize([])['count'] == 0
+
+
+def test_compare_flags_only_real_slowdowns():
+    baseline = results(100.0, 200.0)
+
+    assert compare(results(115.0, 230.0), baseline) == []
+    # Over the tolerance but under min_delta_ms
+    assert compare(results(0.5), results(0.2)) == []
+
+    regressions = compare(results(130.0, 200.0), baseline)
+    assert len(regressions) == 1
+    assert regressions[0].startswith("endpoints//event p50: 130.00ms vs baseline 100.00ms")
+
+    assert compare({}, baseline) == ["endpoints//event: no samples (baseline had 100)"]
+    assert compare(results(1.0, name='/new'), {}) == []
+
+
+def test_finish_writes_results_and_gates_on_the_baseline(tmp_path):
+    baseline_path = tmp_path / "baseline.json"
+    baseline_path.write_text(json.dumps(results(100.0)))
+    args = argparse.Namespace(output=tmp_path / "out" / "results.json", save_baseline=None,
+                              baseline=baseline_path, tolerance=0.2, min_delta_ms=1.0)
+
+    assert finish(results(110.0), args) == 0
+    assert json.loads(args.output.read_text()) == results(110.0)
+    assert finish(results(150.0), args) == 1
+
+
+def test_missing_baseline_fails_before_the_run(tmp_path):
+    with pytest.raises(argparse.ArgumentTypeError, match="--save-baseline"):
+        existing_baseline(str(tmp_path / "missing.json"))
@@ -0,0 +1,20 @@
+from load_test import LoadRecorder
+
+TRACE = {'trace_id': "abc", 'root': {'name': "POST /event", 'duration_ms': 12.0, 'children': [
+    {'name': "process_event", 'duration_ms': 9.0, 'children': [
+        {'name': "rag_retrieve", 'duration_ms': 2.5}]},
+    {'name': "generate_response", 'duration_ms': 3.0}]}}
+
+
+def test_recorder_skips_warmup_and_flattens_span_trees():
+    recorder = LoadRecorder(warmup_until=10.0)
+
+    recorder.record("/event", 9.0, 50.0, TRACE, None)
+    recorder.record("/event", 11.0, 12.5, TRACE, None)
+    recorder.record("/event", 12.0, 30.0, None, "HTTP 503")
+    recorder.record("/dialogue", 12.0, 80.0, None, None)
+
+    assert recorder.endpoints == {'/event': [12.5], '/dialogue': [80.0]}
+    assert recorder.stages == {'process_event': [9.0], 'rag_retrieve': [2.5],
+                               'generate_response': [3.0]}
+    assert recorder.errors == {'/event': 1}
@@ -0,0 +1,11 @@
+"""
+Shared pytest setup for the tools
+Scripts import each other (and ai-core modules) the way they run: from tools/ and tools/bench/
+"""
+
+import sys
+from pathlib import Path
+
+TOOLS = Path(__file__).resolve().parent
+for path in (TOOLS, TOOLS / "bench", TOOLS.parent / "ai-core"):
+    sys.path.insert(0, str(path))
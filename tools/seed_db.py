@@ -3,88 +3,435 @@ Database Seeding Script
 Initializes the SQLite database with schema and sample data
 """
 
-import sqlite3
+import argparse
 import json
-import yaml
+import random
+import re
+import sqlite3
+import sys
+import time
+from datetime import datetime, timedelta
 from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 
+import yaml
 
-def create_database():
-    """Create and initialize the database"""
-    db_path = Path("../ai-core/memory/vector_db/spector.db")
-    schema_path = Path("../ai-core/memory/schema.sql")
-    
-    # Ensure directory exists
+AI_CORE = Path(__file__).resolve().parents[1] / "ai-core"
+DB_PATH = AI_CORE / "memory" / "vector_db" / "spector.db"
+SCHEMA_PATH = AI_CORE / "memory" / "schema.sql"
+AGENTS_PATH = AI_CORE / "config" / "agents.yaml"
+
+_INDEX_STATEMENT = re.compile(r"^CREATE\s+INDEX\b[^;]*;", re.IGNORECASE | re.MULTILINE)
+
+
+def split_schema(schema_sql: str) -> Tuple[str, List[str]]:
+    """Schema without its CREATE INDEX statements, and those statements"""
+    indexes = _INDEX_STATEMENT.findall(schema_sql)
+    return _INDEX_STATEMENT.sub("", schema_sql), indexes
+
+
+def bulk_load(conn: sqlite3.Connection, schema_sql: str,
+              agents: Iterable[tuple] = (), memories: Iterable[tuple] = (),
+              relationships: Iterable[tuple] = (),
+              world_objects: Iterable[tuple] = (),
+              generate: Optional[Callable[[sqlite3.Connection], Dict[str, int]]] = None
+              ) -> Dict[str, int]:
+    """
+    Create the schema and insert every row in one transaction
+
+    Rows are streamed through executemany (iterables are not materialized)
+    with indexes created only after the data is in, so SQLite builds each
+    index once by sorting instead of updating it on every insert. Journal
+    syncs are off for the load and restored afterwards. generate, if given,
+    runs inside the same transaction to add rows with SQL. Returns the
+    number of rows inserted per table.
+    """
+    tables_sql, index_statements = split_schema(schema_sql)
+    conn.executescript(tables_sql)
+
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA cache_size=-262144")  # 256 MiB
+
+    counts = {}
+    try:
+        conn.execute("BEGIN")
+        counts['agents'] = conn.executemany("""
+            INSERT INTO agents (id, name, archetype, lora_adapter,
+                               personality_traits, backstory, voice_id,
+                               current_location, current_activity)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, agents).rowcount
+        counts['episodic_memory'] = conn.executemany("""
+            INSERT INTO episodic_memory
+            (agent_id, timestamp, event_type, event_description, location,
+             other_agents, importance_score, emotional_impact)
+            VALUES (?, COALESCE(?, CURRENT_TIMESTAMP), ?, ?, ?, ?, ?, ?)
+        """, memories).rowcount
+        counts['relationships'] = conn.executemany("""
+            INSERT OR IGNORE INTO relationships
+            (agent_id_1, agent_id_2, relationship_type, trust_level, interaction_count)
+            VALUES (?, ?, ?, ?, ?)
+        """, relationships).rowcount
+        counts['world_objects'] = conn.executemany("""
+            INSERT INTO world_objects
+            (id, name, description, current_location, owner_agent_id, significance_score)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, world_objects).rowcount
+        if generate is not None:
+            for table, count in generate(conn).items():
+                counts[table] = counts.get(table, 0) + count
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+    for statement in index_statements:
+        conn.execute(statement)
+    # Sampled statistics are enough for the planner and scale to 10M rows
+    conn.execute("PRAGMA analysis_limit=1000")
+    conn.execute("ANALYZE")
+    conn.commit()
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return counts
+
+
+def agent_row(agent: Dict[str, Any]) -> tuple:
+    """agents table row for an agents.yaml entry"""
+    schedule = agent.get('schedule') or []
+    return (
+        agent['id'],
+        agent['name'],
+        agent['archetype'],
+        agent['lora_adapter'],
+        json.dumps(agent['personality_traits']),
+        agent['backstory'],
+        agent['voice_id'],
+        schedule[0]['location'] if schedule else 'unknown',
+        schedule[0]['activity'] if schedule else 'idle'
+    )
+
+
+def prepare_path(db_path: Path, overwrite: bool = False) -> None:
+    """Make way for a new database file; an existing one is only replaced on request"""
+    if db_path.exists():
+        if not overwrite:
+            sys.exit(f"{db_path} already exists (pass --overwrite to replace it)")
+        for suffix in ("", "-wal", "-shm"):
+            Path(f"{db_path}{suffix}").unlink(missing_ok=True)
     db_path.parent.mkdir(parents=True, exist_ok=True)
-    
+
+
+def create_database(db_path: Path = DB_PATH, agents_path: Path = AGENTS_PATH,
+                    overwrite: bool = False):
+    """Create and initialize the database"""
+    prepare_path(db_path, overwrite)
+
     print(f"Creating database at: {db_path}")
-    
-    # Connect and execute schema
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    
-    with open(schema_path, 'r') as f:
-        schema_sql = f.read()
-        cursor.executescript(schema_sql)
-    
-    print("✓ Schema created")
-    
+
     # Load agent definitions
-    agents_path = Path("../ai-core/config/agents.yaml")
     with open(agents_path, 'r') as f:
         agents_config = yaml.safe_load(f)
-    
-    # Insert agents
-    for agent in agents_config['agents']:
-        cursor.execute("""
-            INSERT INTO agents (id, name, archetype, lora_adapter, 
-                               personality_traits, backstory, voice_id,
-                               current_location, current_activity)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
-            agent['id'],
-            agent['name'],
-            agent['archetype'],
-            agent['lora_adapter'],
-            json.dumps(agent['personality_traits']),
-            agent['backstory'],
-            agent['voice_id'],
-            agent['schedule'][0]['location'] if agent['schedule'] else 'unknown',
-            agent['schedule'][0]['activity'] if agent['schedule'] else 'idle'
-        ))
-    
-    print(f"✓ Inserted {len(agents_config['agents'])} agents")
-    
+
     # Insert sample memories
     sample_memories = [
-        {
-            'agent_id': 'student_01',
-            'event_type': 'observation',
-            'description': 'Moved into apartment 1A three months ago',
-            'importance': 0.6
-        },
-        {
-            'agent_id': 'baker_01',
-            'event_type': 'emotion',
-            'description': 'Angry about teenagers loitering outside bakery',
-            'importance': 0.7
-        }
+        ('student_01', None, 'observation', 'Moved into apartment 1A three months ago',
+         None, None, 0.6, None),
+        ('baker_01', None, 'emotion', 'Angry about teenagers loitering outside bakery',
+         None, None, 0.7, None)
     ]
-    
-    for mem in sample_memories:
-        cursor.execute("""
-            INSERT INTO episodic_memory 
-            (agent_id, event_type, event_description, importance_score)
-            VALUES (?, ?, ?, ?)
-        """, (mem['agent_id'], mem['event_type'], mem['description'], mem['importance']))
-    
-    print(f"✓ Inserted {len(sample_memories)} sample memories")
-    
-    conn.commit()
+
+    conn = sqlite3.connect(db_path)
+    counts = bulk_load(conn, SCHEMA_PATH.read_text(),
+                       agents=[agent_row(agent) for agent in agents_config['agents']],
+                       memories=sample_memories)
     conn.close()
-    
+
+    print("✓ Schema created")
+    print(f"✓ Inserted {counts['agents']} agents")
+    print(f"✓ Inserted {counts['episodic_memory']} sample memories")
     print("\n✅ Database initialization complete!")
 
 
+# Synthetic worlds reuse the archetypes that have LoRA adapters and voices
+ARCHETYPES = [
+    ("grumpy_baker", "baker.lora", ["irritable", "perfectionist", "early_riser"],
+     "female_elderly_01", "working_bakery"),
+    ("corrupt_cop", "cop.lora", ["cynical", "opportunistic", "street_smart"],
+     "male_middle_aged_01", "patrol"),
+    ("anxious_student", "student.lora", ["nervous", "studious", "conflict_averse"],
+     "female_young_01", "classes"),
+    ("vigilante_landlord", "landlord.lora", ["protective", "aggressive", "paranoid"],
+     "male_older_01", "maintenance"),
+]
+FIRST_NAMES = ["Martha", "Jake", "Emily", "Vincent", "Rosa", "Omar", "Lena", "Tomas",
+               "Priya", "Declan", "Ines", "Marcus", "Yuki", "Hank", "Sofia", "Abdul"]
+LAST_NAMES = ["Quinn", "Martinez", "Chen", "Russo", "Novak", "Okafor", "Murphy",
+              "Haddad", "Larsen", "Silva", "Kowalski", "Tanaka", "Byrne", "Ortiz"]
+LOCATION_KINDS = ["apartment", "bakery", "tavern", "street", "park", "shop", "clinic",
+                  "warehouse", "university", "alley", "station", "market"]
+OBJECT_NAMES = ["crowbar", "ledger", "rolling pin", "radio", "key ring", "envelope",
+                "bicycle", "toolbox", "photograph", "textbook", "wallet", "lockbox"]
+RELATIONSHIP_TYPES = ["neighbor", "friend", "rival", "customer", "coworker", "family"]
+MEMORY_TEMPLATES = [
+    ("observation", "Saw {other} near the {location} late at night"),
+    ("observation", "Noticed the {object} was missing from the {location}"),
+    ("conversation", "Argued with {other} about the noise at the {location}"),
+    ("conversation", "{other} asked about the {object} at the {location}"),
+    ("emotion", "Felt uneasy after hearing shouting outside the {location}"),
+    ("emotion", "Grateful that {other} helped carry the {object}"),
+    ("action", "Locked up the {location} early because of trouble on the street"),
+    ("action", "Hid the {object} somewhere in the {location}"),
+]
+EMOTIONS = ["calm", "angry", "afraid", "curious", "suspicious", "relieved", None]
+
+
+class SyntheticWorld:
+    """
+    Parametric town: agents spread over locations with daily schedules,
+    memories, a relationship graph and world objects
+
+    Agents, relationships and objects are generated in Python. Memories
+    are not: a pool of pre-rendered memories is loaded into a temp table
+    and SQLite expands it to memories_per_agent rows per agent with one
+    INSERT ... SELECT, picking pool rows by an integer hash of (agent,
+    n). Building 10M rows in C rather than binding them one by one from
+    Python is what makes large worlds load in seconds. The same seed
+    always produces the same world.
+    """
+
+    def __init__(self, agents: int = 1000, locations: int = 50,
+                 memories_per_agent: int = 100, relationships_per_agent: int = 6,
+                 objects: int = 500, seed: int = 0, pool_size: int = 16384,
+                 days: int = 30):
+        self.n_agents = agents
+        self.n_locations = locations
+        self.memories_per_agent = memories_per_agent
+        self.relationships_per_agent = min(relationships_per_agent, max(0, agents - 1))
+        self.n_objects = objects
+        self.seed = seed
+        self.pool_size = pool_size
+        self.days = days
+
+        rng = random.Random(seed)
+        self.locations = [f"{LOCATION_KINDS[i % len(LOCATION_KINDS)]}_{i // len(LOCATION_KINDS) + 1}"
+                          for i in range(locations)]
+        self.agents = [self._make_agent(rng, i) for i in range(agents)]
+
+    def _make_agent(self, rng: random.Random, index: int) -> Dict[str, Any]:
+        archetype, adapter, traits, voice, work_activity = ARCHETYPES[index % len(ARCHETYPES)]
+        home, work, leisure = (rng.choice(self.locations) for _ in range(3))
+        start = rng.randrange(4, 12)
+        schedule = [
+            {'time': f"{start:02d}:00-{start + 8:02d}:00", 'activity': work_activity,
+             'location': work},
+            {'time': f"{start + 8:02d}:00-{start + 11:02d}:00", 'activity': "leisure",
+             'location': leisure},
+            {'time': f"{start + 11:02d}:00-{start:02d}:00", 'activity': "home",
+             'location': home},
+        ]
+        return {
+            'id': f"agent_{index:06d}",
+            'name': f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+            'archetype': archetype,
+            'lora_adapter': adapter,
+            'personality_traits': list(traits),
+            'backstory': f"Lives at {home} and spends the day at {work}.",
+            'voice_id': voice,
+            'current_location': work,
+            'schedule': schedule
+        }
+
+    def agent_rows(self) -> Iterator[tuple]:
+        return (agent_row(agent) for agent in self.agents)
+
+    def memory_pool(self) -> List[tuple]:
+        """pool_size (event_type, description, location, other_agents, importance, emotion)"""
+        rng = random.Random(self.seed + 1)
+        pool = []
+        for _ in range(self.pool_size):
+            event_type, template = rng.choice(MEMORY_TEMPLATES)
+            location = rng.choice(self.locations)
+            other = rng.choice(self.agents) if self.agents else None
+            description = template.format(other=other['name'] if other else "someone",
+                                          location=location.replace('_', ' '),
+                                          object=rng.choice(OBJECT_NAMES))
+            other_agents = (json.dumps([other['id']])
+                            if other and '{other}' in template else None)
+            pool.append((event_type, description, location, other_agents,
+                         round(rng.random(), 3), rng.choice(EMOTIONS)))
+        return pool
+
+    def timestamp_pool(self) -> List[tuple]:
+        """pool_size sorted timestamps across the last `days` days"""
+        rng = random.Random(self.seed + 4)
+        start = datetime(2024, 1, 1)
+        minutes = self.days * 24 * 60
+        return [(stamp,) for stamp in sorted(
+            (start + timedelta(minutes=rng.randrange(minutes))).strftime("%Y-%m-%d %H:%M:%S")
+            for _ in range(self.pool_size))]
+
+    def _generate_memories(self, conn: sqlite3.Connection) -> Dict[str, int]:
+        """Expand the memory pool into memories_per_agent rows per agent, in SQL"""
+        if not self.memories_per_agent or not self.agents:
+            return {}
+
+        conn.execute("""
+            CREATE TEMP TABLE memory_pool
+            (event_type, description, location, other_agents, importance, emotion)
+        """)
+        conn.executemany("INSERT INTO temp.memory_pool VALUES (?, ?, ?, ?, ?, ?)",
+                         self.memory_pool())
+        conn.execute("CREATE TEMP TABLE timestamp_pool (stamp)")
+        conn.executemany("INSERT INTO temp.timestamp_pool VALUES (?)", self.timestamp_pool())
+
+        # Consecutive n walk the sorted timestamps, so each agent's
+        # memories are in time order from a per-agent starting point
+        before = conn.total_changes
+        conn.execute("""
+            WITH RECURSIVE n(i) AS (SELECT 0 UNION ALL SELECT i + 1 FROM n WHERE i + 1 < :k)
+            INSERT INTO episodic_memory
+            (agent_id, timestamp, event_type, event_description, location,
+             other_agents, importance_score, emotional_impact)
+            SELECT a.id, t.stamp, p.event_type, p.description, p.location,
+                   p.other_agents, p.importance, p.emotion
+            FROM agents a CROSS JOIN n
+            JOIN temp.memory_pool p
+              ON p.rowid = (a.rowid * 2654435761 + n.i * 40503 + :seed) % :pool + 1
+            JOIN temp.timestamp_pool t
+              ON t.rowid = (a.rowid * 7919 + n.i) % :pool + 1
+        """, {'k': self.memories_per_agent, 'seed': self.seed, 'pool': self.pool_size})
+        # cursor.rowcount is -1 for statements that start with WITH
+        inserted = conn.total_changes - before
+
+        conn.execute("DROP TABLE temp.memory_pool")
+        conn.execute("DROP TABLE temp.timestamp_pool")
+        return {'episodic_memory': inserted}
+
+    def relationship_edges(self) -> Iterator[tuple]:
+        """
+        Each agent links to relationships_per_agent others: half chosen
+        among agents who share its home, the rest anywhere in town
+        """
+        rng = random.Random(self.seed + 2)
+        by_home: Dict[str, List[str]] = {}
+        for agent in self.agents:
+            by_home.setdefault(agent['schedule'][2]['location'], []).append(agent['id'])
+
+        for agent in self.agents:
+            agent_id = agent['id']
+            neighbours = by_home[agent['schedule'][2]['location']]
+            partners = set()
+            local = self.relationships_per_agent // 2
+            attempts = 0
+            while len(partners) < self.relationships_per_agent and attempts < 4 * self.relationships_per_agent:
+                attempts += 1
+                source = neighbours if len(partners) < local and len(neighbours) > 1 else self.agents
+                other = rng.choice(source)
+                other_id = other if isinstance(other, str) else other['id']
+                if other_id != agent_id:
+                    partners.add(other_id)
+            for other_id in partners:
+                # One row per pair, whichever side generated it
+                first, second = sorted((agent_id, other_id))
+                yield (first, second, rng.choice(RELATIONSHIP_TYPES),
+                       round(rng.random(), 3), rng.randrange(50))
+
+    def object_rows(self) -> Iterator[tuple]:
+        rng = random.Random(self.seed + 3)
+        for index in range(self.n_objects):
+            name = rng.choice(OBJECT_NAMES)
+            owner = rng.choice(self.agents)['id'] if self.agents and rng.random() < 0.6 else None
+            yield (f"obj_{index:06d}", name, f"A {name}", rng.choice(self.locations),
+                   owner, round(rng.random(), 3))
+
+    def write_yaml(self, path: Path, base_config: Path = AGENTS_PATH) -> None:
+        """
+        agents.yaml-format world file (usable as GameMaster agents_path),
+        with locations, objects and relationships; memories are SQLite only
+        """
+        with open(base_config, 'r') as f:
+            game_master = yaml.safe_load(f).get('game_master', {})
+
+        world = {
+            'agents': self.agents,
+            'locations': self.locations,
+            'world_objects': [dict(zip(('id', 'name', 'description', 'location',
+                                        'owner', 'significance'), row))
+                              for row in self.object_rows()],
+            'relationships': [dict(zip(('agent_1', 'agent_2', 'type', 'trust'), row[:4]))
+                              for row in self.relationship_edges()],
+            'game_master': game_master
+        }
+        dumper = getattr(yaml, 'CSafeDumper', yaml.SafeDumper)
+        with open(path, 'w') as f:
+            yaml.dump(world, f, Dumper=dumper, sort_keys=False)
+
+    def write_sqlite(self, db_path: Path) -> Dict[str, int]:
+        conn = sqlite3.connect(db_path)
+        try:
+            return bulk_load(conn, SCHEMA_PATH.read_text(),
+                             agents=self.agent_rows(),
+                             relationships=self.relationship_edges(),
+                             world_objects=self.object_rows(),
+                             generate=self._generate_memories)
+        finally:
+            conn.close()
+
+
+def create_synthetic_database(db_path: Path, yaml_path: Optional[Path],
+                              overwrite: bool = False, **world_args) -> None:
+    """Generate a synthetic world and bulk-load it"""
+    prepare_path(db_path, overwrite)
+
+    world = SyntheticWorld(**world_args)
+    print(f"Generating {world.n_agents:,} agents in {world.n_locations:,} locations "
+          f"into {db_path}")
+
+    started = time.perf_counter()
+    counts = world.write_sqlite(db_path)
+    elapsed = time.perf_counter() - started
+    for table, count in counts.items():
+        print(f"✓ {table}: {count:,} rows")
+    total = sum(counts.values())
+    print(f"✓ Loaded {total:,} rows in {elapsed:.1f}s ({total / elapsed:,.0f} rows/s)")
+
+    if yaml_path is not None:
+        world.write_yaml(yaml_path)
+        print(f"✓ World written to {yaml_path}")
+
+    print("\n✅ Synthetic world complete!")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Seed the Spector memory database")
+    parser.add_argument("--db", type=Path, default=None,
+                        help=f"SQLite file (default {DB_PATH}, or synthetic.db next to it)")
+    parser.add_argument("--synthetic", action="store_true",
+                        help="Generate a synthetic world instead of loading agents.yaml")
+    parser.add_argument("--agents", type=int, default=1000)
+    parser.add_argument("--locations", type=int, default=50)
+    parser.add_argument("--memories", type=int, default=100, help="Memories per agent")
+    parser.add_argument("--relationships", type=int, default=6, help="Relationships per agent")
+    parser.add_argument("--objects", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--yaml", type=Path, default=None,
+                        help="Also write the synthetic world in agents.yaml format")
+    parser.add_argument("--overwrite", action="store_true",
+                        help="Replace an existing database")
+    args = parser.parse_args(argv)
+
+    if not args.synthetic:
+        create_database(args.db or DB_PATH, overwrite=args.overwrite)
+        return
+
+    create_synthetic_database(
+        args.db or DB_PATH.with_name("synthetic.db"), args.yaml, args.overwrite,
+        agents=args.agents, locations=args.locations,
+        memories_per_agent=args.memories, relationships_per_agent=args.relationships,
+        objects=args.objects, seed=args.seed
+    )
+
+
 if __name__ == "__main__":
-    create_database()
+    main()
@@ -0,0 +1,61 @@
+import sqlite3
+
+import pytest
+import yaml
+
+from seed_db import AGENTS_PATH, SyntheticWorld, create_database, create_synthetic_database
+
+
+def row_counts(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return {table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                for table in ("agents", "episodic_memory", "relationships", "world_objects")}
+    finally:
+        conn.close()
+
+
+def test_seeding_loads_the_configured_agents(tmp_path):
+    db_path = tmp_path / "vector_db" / "spector.db"
+    agents = yaml.safe_load(AGENTS_PATH.read_text())['agents']
+
+    create_database(db_path)
+
+    assert row_counts(db_path) == {'agents': len(agents), 'episodic_memory': 2,
+                                   'relationships': 0, 'world_objects': 0}
+
+
+def test_existing_database_is_only_replaced_on_request(tmp_path):
+    db_path = tmp_path / "spector.db"
+    create_database(db_path)
+
+    with pytest.raises(SystemExit, match="already exists"):
+        create_database(db_path)
+
+    create_database(db_path, overwrite=True)
+    assert row_counts(db_path)['episodic_memory'] == 2
+
+
+def test_synthetic_world_row_counts_and_indexes(tmp_path):
+    db_path = tmp_path / "synthetic.db"
+
+    create_synthetic_database(db_path, None, agents=40, locations=6, memories_per_agent=5,
+                              relationships_per_agent=3, objects=12, seed=7)
+
+    counts = row_counts(db_path)
+    assert counts['agents'] == 40
+    assert counts['episodic_memory'] == 200
+    assert counts['world_objects'] == 12
+    assert 0 < counts['relationships'] <= 40 * 3
+    conn = sqlite3.connect(db_path)
+    indexes = {name for (name,) in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'index' AND name LIKE 'idx_%'")}
+    conn.close()
+    assert "idx_episodic_memory_agent" in indexes
+
+
+def test_same_seed_same_world():
+    first, second = SyntheticWorld(agents=10, seed=3), SyntheticWorld(agents=10, seed=3)
+    assert first.agents == second.agents
+    assert list(first.relationship_edges()) == list(second.relationship_edges())
+    assert SyntheticWorld(agents=10, seed=4).agents != first.agents